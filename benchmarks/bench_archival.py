@@ -0,0 +1,64 @@
+"""Measure parmatma.db size and hot-table history latency before and after archival.
+
+Usage: python benchmarks/bench_archival.py [users] [entries_per_user]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parmatma_db  # noqa: E402
+
+RESPONSE = ("### Support & Advice\n\n" + "- Take a short walk, drink water and rest well. " * 60 + "\n") * 2
+
+
+def seed(users, entries_per_user):
+    conn = parmatma_db.get_connection()
+    now = time.time()
+    for user_id in range(1, users + 1):
+        rows = []
+        for _ in range(entries_per_user):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now - random.uniform(0, 3 * 365) * 86400))
+            rows.append((user_id, "Feeling tired", random.uniform(-1, 1), RESPONSE, stamp))
+        conn.executemany(
+            "INSERT INTO mental_health_entries (user_id, mood_note, sentiment, response, timestamp) "
+            "VALUES (?, ?, ?, ?, ?)", rows)
+        conn.executemany(
+            "INSERT INTO symptom_entries (user_id, symptoms, response, timestamp) VALUES (?, ?, ?, ?)",
+            [(user_id, "headache", RESPONSE, row[4]) for row in rows])
+    conn.commit()
+    conn.close()
+
+
+def print_report(label, user_id):
+    runs = [parmatma_db.storage_report(user_id)["hot_history_ms"] for _ in range(20)]
+    report = parmatma_db.storage_report()
+    print(f"{label}: file={report['file_bytes'] / 1e6:.1f} MB "
+          f"free={report['freelist_bytes'] / 1e6:.1f} MB "
+          f"hot rows={report['symptom_entries_rows'] + report['mental_health_entries_rows']} "
+          f"archived={report['archived_rows']} "
+          f"history p50={sorted(runs)[len(runs) // 2]:.2f} ms")
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    entries_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        parmatma_db.DB_PATH = os.path.join(tmp, "parmatma.db")
+        parmatma_db.init_db()
+        seed(users, entries_per_user)
+        print_report("before", user_id=1)
+        started = time.perf_counter()
+        archived = parmatma_db.archive_old_entries()
+        print(f"archived {archived} rows in {time.perf_counter() - started:.2f} s")
+        print_report("after archive", user_id=1)
+        while parmatma_db.storage_report()["freelist_bytes"]:
+            parmatma_db.run_incremental_vacuum()
+        print_report("after incremental vacuum", user_id=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Export a large synthetic history and report peak Python memory per format.
+
+Usage: python benchmarks/bench_export.py [entries]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import health_export  # noqa: E402
+import parmatma_db  # noqa: E402
+
+RESPONSE = "Rest, hydrate and see a doctor if symptoms worsen. " * 40
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    formats = ["csv", "jsonl"]
+    try:
+        import pyarrow  # noqa: F401
+        formats.append("parquet")
+    except ImportError:
+        print("pyarrow not installed, skipping parquet")
+    with tempfile.TemporaryDirectory() as tmp:
+        parmatma_db.DB_PATH = os.path.join(tmp, "parmatma.db")
+        parmatma_db.init_db()
+        conn = parmatma_db.get_connection()
+        conn.executemany(
+            "INSERT INTO mental_health_entries (user_id, mood_note, sentiment, response) VALUES (1, ?, ?, ?)",
+            ((f"note {i}", (i % 200) / 100 - 1, RESPONSE) for i in range(entries)))
+        conn.commit()
+        conn.close()
+        for fmt in formats:
+            tracemalloc.start()
+            started = time.perf_counter()
+            export_file = health_export.export_history(
+                parmatma_db.iter_user_history_chunks(1), fmt, parmatma_db.EXPORT_COLUMNS)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = export_file.seek(0, os.SEEK_END)
+            export_file.close()
+            print(f"{fmt:8s} {entries} rows: {size / 1e6:.1f} MB written in {elapsed:.2f} s, "
+                  f"peak traced memory {peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Score a synthetic cohort with the vectorized metrics and with a per-row scalar loop.
+
+Usage: python benchmarks/bench_health_metrics.py [rows] [loop_rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import health_metrics  # noqa: E402
+
+
+def cohort(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "weight": rng.uniform(35, 140, rows),
+        "height": rng.uniform(140, 200, rows),
+        "age": rng.integers(18, 90, rows),
+        "gender": rng.choice(np.array(["Male", "Female", "Other"]), rows),
+        "activity": rng.choice(np.array(list(health_metrics.ACTIVITY_LEVELS)), rows),
+    }
+
+
+def scalar_row(weight, height, age, gender, activity):
+    # The per-call shape the pages used before: one if/elif chain per person.
+    bmi = weight / ((height / 100) ** 2)
+    if bmi < 18.5:
+        category = "Underweight"
+    elif bmi < 25:
+        category = "Normal"
+    elif bmi < 30:
+        category = "Overweight"
+    else:
+        category = "Obese"
+    offset = {"male": 5, "female": -161}.get(gender.casefold(), -78)
+    bmr = 10 * weight + 6.25 * height - 5 * age + offset
+    return bmi, category, bmr, bmr * health_metrics.ACTIVITY_LEVELS[activity]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    loop_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    data = cohort(rows)
+
+    started = time.perf_counter()
+    metrics = health_metrics.compute_metrics(data["weight"], data["height"], data["age"], data["gender"],
+                                             data["activity"])
+    vectorized = time.perf_counter() - started
+
+    columns = [data[name][:loop_rows].tolist() for name in ("weight", "height", "age", "gender", "activity")]
+    started = time.perf_counter()
+    results = [scalar_row(*row) for row in zip(*columns)]
+    looped = (time.perf_counter() - started) * rows / loop_rows
+
+    assert np.allclose([result[3] for result in results], metrics["tdee"][:loop_rows])
+    assert [result[1] for result in results] == metrics["category"][:loop_rows].tolist()
+    print(f"rows: {rows:,}")
+    print(f"vectorized: {vectorized * 1000:9.1f} ms  ({rows / vectorized:,.0f} rows/s)")
+    print(f"scalar loop: {looped * 1000:8.1f} ms  (extrapolated from {loop_rows:,} rows)")
+    print(f"speedup: {looped / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Render hospital maps with plain and clustered markers and report time and payload size.
+
+Usage: python benchmarks/bench_hospital_map.py [repeats]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hospital_map  # noqa: E402
+
+CENTER = (12.9716, 77.5946)
+
+
+def synthetic_hospitals(count, seed=0):
+    rng = random.Random(seed)
+    return [{"name": f"Hospital {i}", "lat": CENTER[0] + rng.uniform(-0.2, 0.2),
+             "lon": CENTER[1] + rng.uniform(-0.2, 0.2)} for i in range(count)]
+
+
+def timed(fn, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - started) / repeats * 1000, result
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'markers':>8} {'variant':>10} {'render ms':>10} {'payload KB':>11}")
+    for count in (10, 100, 1000):
+        hospitals = synthetic_hospitals(count)
+        for variant, cluster in (("plain", False), ("clustered", True)):
+            ms, page = timed(lambda: hospital_map.build_map(hospitals, *CENTER, cluster=cluster).get_root().render(),
+                             repeats)
+            print(f"{count:>8} {variant:>10} {ms:>10.1f} {len(page.encode()) / 1024:>11.1f}")
+        hospital_map.map_html(hospitals, *CENTER)
+        ms, page = timed(lambda: hospital_map.map_html(hospitals, *CENTER), repeats)
+        print(f"{count:>8} {'cached':>10} {ms:>10.3f} {len(page.encode()) / 1024:>11.1f}")
+        ms, svg = timed(lambda: hospital_map.static_map_svg(hospitals, *CENTER), repeats)
+        print(f"{count:>8} {'static':>10} {ms:>10.1f} {len(svg.encode()) / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Time cold and cached weekly meal-plan generation for each diet.
+
+Usage: python benchmarks/bench_meal_planner.py [repeats]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import meal_planner  # noqa: E402
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    targets = meal_planner.daily_targets(72, 168, 34, "Female", "Overweight")
+    print(f"{'diet':>15} {'cold ms':>9} {'cached us':>10} {'avg kcal':>9}")
+    for diet in meal_planner.DIETS:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            meal_planner._plan.cache_clear()
+            week = meal_planner.meal_plan(targets, diet)
+        cold = (time.perf_counter() - started) / repeats * 1000
+        started = time.perf_counter()
+        for _ in range(repeats):
+            meal_planner.meal_plan(targets, diet)
+        cached = (time.perf_counter() - started) / repeats * 1e6
+        kcal = sum(day["totals"]["kcal"] for day in week) / len(week)
+        print(f"{diet:>15} {cold:>9.1f} {cached:>10.1f} {kcal:>9.0f}")
+    print(f"target kcal: {targets['kcal']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Time a bulk profile import from a generated CSV into a scratch SQLite database.
+
+Usage: python benchmarks/bench_profile_import.py [rows] [chunk_rows] [bad_every]
+"""
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parmatma_db  # noqa: E402
+import profile_import  # noqa: E402
+
+
+def write_profiles(path, rows, bad_every):
+    rng = random.Random(7)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Age", "Gender", "Height (cm)", "Weight (kg)"])
+        for i in range(rows):
+            row = [f"Person {i}", rng.randint(5, 90), rng.choice(["Male", "female", "Other", "M"]),
+                   round(rng.uniform(120, 200), 1), round(rng.uniform(25, 140), 1)]
+            if bad_every and i % bad_every == 0:
+                row[rng.randrange(1, 5)] = "n/a"
+            writer.writerow(row)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    chunk_rows = int(sys.argv[2]) if len(sys.argv) > 2 else profile_import.IMPORT_CHUNK_ROWS
+    bad_every = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "profiles.csv")
+        write_profiles(csv_path, rows, bad_every)
+        parmatma_db.DB_PATH = os.path.join(tmp, "parmatma.db")
+        parmatma_db.init_db()
+        started = time.perf_counter()
+        with open(csv_path, "rb") as f:
+            summary = profile_import.import_profiles(f, csv_path, parmatma_db.save_personal_details_batch,
+                                                     chunk_size=chunk_rows)
+        elapsed = time.perf_counter() - started
+        file_mb = os.path.getsize(csv_path) / 1e6
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"rows: {summary['rows']}  imported: {summary['imported']}  rejected: {summary['rejected']}")
+    print(f"file: {file_mb:.1f} MB  chunk: {chunk_rows} rows  peak RSS: {peak_mb:.0f} MB")
+    print(f"time: {elapsed:.2f} s  ({summary['rows'] / elapsed:,.0f} rows/s)")
+    print("categories:", summary["categories"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Concurrent write throughput of parmatma_db for different shard counts.
+
+Usage: python benchmarks/bench_sharding.py [writers] [writes_per_writer]
+Set BENCH_DIR to put the database files on a specific disk (default: system temp dir).
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parmatma_db  # noqa: E402
+
+
+def run(shard_count, writers, writes_per_writer):
+    with tempfile.TemporaryDirectory(dir=os.environ.get("BENCH_DIR")) as tmp:
+        parmatma_db.DB_PATH = os.path.join(tmp, "parmatma.db")
+        parmatma_db.SHARD_COUNT = shard_count
+        parmatma_db._user_shards.clear()
+        parmatma_db.init_db()
+        # Enough users that every shard gets writers even with uneven hashing.
+        user_ids = [parmatma_db.save_personal_details_to_db(
+            {"name": f"user {i}", "age": 30, "gender": "Other", "height": 170.0, "weight": 70.0})
+            for i in range(writers)]
+
+        def write(user_id):
+            for i in range(writes_per_writer):
+                parmatma_db.save_mental_health_entry(user_id, f"note {i}", 0.1, "Take care of yourself.")
+
+        threads = [threading.Thread(target=write, args=(user_id,)) for user_id in user_ids]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    return writers * writes_per_writer / elapsed
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    writes_per_writer = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    for shard_count in (1, 2, 4, 8):
+        print(f"{shard_count} shard(s): {run(shard_count, writers, writes_per_writer):8.0f} writes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Drive hh.py's data layer against the local PostgREST stand-in at realistic concurrency.
+
+Usage: python benchmarks/bench_supabase_store.py [sessions] [reruns_per_session] [latency_ms]
+"""
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import health_report  # noqa: E402
+import supabase_outbox  # noqa: E402
+import supabase_store  # noqa: E402
+from local_postgrest import LocalPostgrestClient  # noqa: E402
+
+RESPONSE = "Possible causes include common cold or flu. Consult a healthcare professional. " * 20
+
+
+def timed(samples, name, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    samples[name].append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def session(index, reruns, samples):
+    now = datetime.datetime.utcnow().isoformat()
+    user_id = timed(samples, "save user", supabase_store.save_record, "users", {
+        "name": f"user {index}", "age": 30, "gender": "Other", "height": 170.0, "weight": 70.0, "created_at": now})
+    for rerun in range(reruns):
+        # Every rerun renders the sidebar; a third of them also save something.
+        user, symptoms, mental, appointments = timed(samples, "history", supabase_store.get_user_history, user_id)
+        if rerun % 3 == 0:
+            timed(samples, "queue write", supabase_outbox.enqueue, "symptom_entries", {
+                "user_id": user_id, "symptoms": f"headache {rerun}", "response": RESPONSE,
+                "created_at": datetime.datetime.utcnow().isoformat()})
+        if symptoms and rerun % 5 == 0:
+            timed(samples, "body", supabase_store.fetch_record_bodies, "symptom_entries", [symptoms[0]["id"]])
+        cursor = supabase_store.next_cursor(symptoms)
+        if cursor and rerun % 7 == 0:
+            timed(samples, "older page", supabase_store.fetch_records, "symptom_entries", user_id,
+                  supabase_store.HISTORY_PAGE_SIZE, cursor)
+        if rerun % 10 == 9:
+            timed(samples, "report", health_report.build_report, user_id, "Markdown")
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    reruns = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 40
+    with tempfile.TemporaryDirectory() as tmp:
+        supabase_store.configure(LocalPostgrestClient(os.path.join(tmp, "supabase.db"), latency_ms=latency_ms,
+                                                      jitter_ms=latency_ms / 2))
+        supabase_outbox.OUTBOX_PATH = os.path.join(tmp, "outbox.db")
+        supabase_outbox.start_outbox_worker()
+        samples = defaultdict(list)
+        threads = [threading.Thread(target=session, args=(i, reruns, samples)) for i in range(sessions)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        while supabase_outbox.pending_count():
+            time.sleep(0.1)
+        drained = time.perf_counter() - started
+    print(f"{sessions} sessions x {reruns} reruns, {latency_ms:.0f} ms simulated round trip: "
+          f"{elapsed:.1f} s, outbox drained at {drained:.1f} s")
+    for name, values in samples.items():
+        values.sort()
+        print(f"  {name:12s} n={len(values):5d} p50={statistics.median(values):8.2f} ms "
+              f"p95={values[int(len(values) * 0.95) - 1]:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
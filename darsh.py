@@ -3,8 +3,10 @@ import datetime
 import requests
 import time
 from textblob import TextBlob
-import folium
-from streamlit_folium import st_folium
+from exercise_catalog import DIFFICULTIES, describe, facet_values, find_exercises
+from gazetteer import canonical_city
+from health_metrics import bmi_and_category
+from location_input import location_input
 
 
 st.set_page_config(page_title="Parmatma - Health & Wellness", page_icon="🧘", layout="centered")
@@ -31,29 +33,29 @@ def google_api_call(model, endpoint, prompt, system_instruction=None):
     return resp.json()
 
 
+BMI_ADVICE = {
+    "Underweight": "Focus on nutrient-dense foods and gain weight healthily.",
+    "Normal": "Maintain your current healthy lifestyle.",
+    "Overweight": "Consider a balanced diet and exercise.",
+    "Obese": "Consult a healthcare provider.",
+    "Invalid": "Height and weight must be positive.",
+}
+
+
 def calculate_bmi(weight_kg, height_cm):
-    if weight_kg <= 0 or height_cm <= 0:
-        return 0, "Invalid", "Height and weight must be positive."
-    bmi = weight_kg / ((height_cm / 100) ** 2)
-    if bmi < 18.5:
-        return bmi, "Underweight", "Focus on nutrient-dense foods and gain weight healthily."
-    elif bmi < 25:
-        return bmi, "Normal", "Maintain your current healthy lifestyle."
-    elif bmi < 30:
-        return bmi, "Overweight", "Consider a balanced diet and exercise."
-    else:
-        return bmi, "Obese", "Consult a healthcare provider."
+    bmi, category = bmi_and_category(weight_kg, height_cm)
+    return bmi, category, BMI_ADVICE[category]
 
 
 def get_platforms_by_location(city):
-    city = city.strip().lower()
+    city = (canonical_city(city) or city).strip().lower()
     metro_platforms = {
         "mumbai": [
             ("Practo", "https://www.practo.com", "Mobile-friendly, video & clinic consults"),
             ("Apollo 24|7", "https://www.apollo247.com", "Telehealth + medicine delivery"),
             ("MFine", "https://www.mfine.co", "AI-driven video consults"),
         ],
-        "bangalore": [
+        "bengaluru": [
             ("Practo", "https://www.practo.com/bangalore", "Top Bangalore doctors"),
             ("MFine", "https://www.mfine.co", "Teleconsult & fast support"),
             ("DocPrime", "https://www.docprime.com", "24/7 video consults"),
@@ -73,59 +75,6 @@ def get_platforms_by_location(city):
     ])
 
 
-def geocode_location(location):
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        "q": location,
-        "format": "json",
-        "limit": 1
-    }
-    headers = {
-        "User-Agent": "ParmatmaHealthApp/1.0 (+https://yourdomain.com/contact)"
-    }
-    response = requests.get(url, params=params, headers=headers)
-    if response.status_code == 200 and response.json():
-        result = response.json()[0]
-        return float(result["lat"]), float(result["lon"])
-    else:
-        return None, None
-
-
-def get_nearby_hospitals(lat, lon, radius=5000):
-    overpass_query = f"""
-    [out:json];
-    node["amenity"="hospital"](around:{radius},{lat},{lon});
-    out body;
-    """
-    overpass_url = "https://overpass-api.de/api/interpreter"
-    response = requests.post(overpass_url, data={"data": overpass_query})
-    if response.status_code == 200:
-        data = response.json()
-        hospitals = []
-        for element in data.get("elements", []):
-            name = element.get("tags", {}).get("name", "Unnamed Hospital")
-            hospital_lat = element.get("lat")
-            hospital_lon = element.get("lon")
-            hospitals.append({
-                "name": name,
-                "lat": hospital_lat,
-                "lon": hospital_lon
-            })
-        return hospitals
-    else:
-        return []
-
-
-def display_hospitals_map(hospitals, center_lat, center_lon):
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=13)
-    for hos in hospitals:
-        folium.Marker(
-            [hos['lat'], hos['lon']],
-            popup=hos['name']
-        ).add_to(m)
-    st_folium(m, width=700, height=450)
-
-
 def home():
     st.title("Welcome to Parmatma 🧘")
     with st.form("profile_form"):
@@ -212,130 +161,15 @@ def exercise_routines():
         "Arms (Biceps & Triceps)", "Legs (Quads, Hamstrings, Calves)"
     ])
 
-    routines = {
-        "male": {
-            "full body": [
-                "Squats - 3 sets of 12 reps",
-                "Push-ups - 3 sets of 15 reps",
-                "Deadlifts - 3 sets of 8 reps",
-                "Plank - 3 sets of 30 seconds"
-            ],
-            "upper body": [
-                "Bench Press - 3 sets of 10 reps",
-                "Pull-ups - 3 sets of 8 reps",
-                "Dumbbell Shoulder Press - 3 sets of 12 reps"
-            ],
-            "lower body": [
-                "Barbell Squats - 4 sets of 10 reps",
-                "Lunges - 3 sets of 12 reps each leg",
-                "Leg Press - 3 sets of 10 reps"
-            ],
-            "core": [
-                "Deadbug - 3 sets of 10 reps",
-                "Russian Twists - 3 sets of 20 reps",
-                "Hanging Leg Raises - 3 sets of 15 reps"
-            ],
-            "cardio": [
-                "Running - 20 minutes",
-                "Cycling - 30 minutes",
-                "Jump Rope - 10 minutes"
-            ],
-            "arms (biceps & triceps)": [
-                "Barbell Bicep Curls - 3 sets of 12 reps",
-                "Tricep Dips - 3 sets of 15 reps",
-                "Hammer Curls - 3 sets of 12 reps"
-            ],
-            "legs (quads, hamstrings, calves)": [
-                "Romanian Deadlifts - 3 sets of 10 reps",
-                "Calf Raises - 4 sets of 20 reps",
-                "Step-ups - 3 sets of 15 reps each leg"
-            ]
-        },
-        "female": {
-            "full body": [
-                "Goblet Squats - 3 sets of 15 reps",
-                "Incline Push-ups - 3 sets of 12 reps",
-                "Hip Bridges - 3 sets of 15 reps",
-                "Plank - 3 sets of 40 seconds"
-            ],
-            "upper body": [
-                "Dumbbell Chest Press - 3 sets of 12 reps",
-                "Lat Pulldown - 3 sets of 10 reps",
-                "Dumbbell Lateral Raises - 3 sets of 15 reps"
-            ],
-            "lower body": [
-                "Step-ups - 3 sets of 12 reps each leg",
-                "Glute Kickbacks - 3 sets of 15 reps",
-                "Bodyweight Lunges - 3 sets of 15 reps each leg"
-            ],
-            "core": [
-                "Deadbug - 3 sets of 15 reps",
-                "Russian Twists - 3 sets of 20 reps",
-                "Leg Raises - 3 sets of 15 reps"
-            ],
-            "cardio": [
-                "Brisk Walking - 30 minutes",
-                "Elliptical Trainer - 20 minutes",
-                "Jump Rope - 10 minutes"
-            ],
-            "arms (biceps & triceps)": [
-                "Dumbbell Bicep Curls - 3 sets of 15 reps",
-                "Overhead Tricep Extensions - 3 sets of 15 reps",
-                "Tricep Kickbacks - 3 sets of 15 reps"
-            ],
-            "legs (quads, hamstrings, calves)": [
-                "Wall Sits - 3 sets of 30 seconds",
-                "Bodyweight Squats - 3 sets of 15 reps",
-                "Calf Raises - 4 sets of 25 reps"
-            ]
-        },
-        "other": {
-            "full body": [
-                "Bodyweight Squats - 3 sets of 12 reps",
-                "Modified Push-ups - 3 sets of 12 reps",
-                "Glute Bridges - 3 sets of 15 reps",
-                "Plank - 3 sets of 30 seconds"
-            ],
-            "upper body": [
-                "Dumbbell Press - 3 sets of 10 reps",
-                "Resistance Band Rows - 3 sets of 12 reps",
-                "Shoulder Taps - 3 sets of 15 reps"
-            ],
-            "lower body": [
-                "Wall Sits - 3 sets of 30 seconds",
-                "Lunges - 3 sets of 10 reps each leg",
-                "Step-ups - 3 sets of 12 reps"
-            ],
-            "core": [
-                "Sit-ups - 3 sets of 15 reps",
-                "Bicycle Crunches - 3 sets of 20 reps",
-                "Leg Raises - 3 sets of 15 reps"
-            ],
-            "cardio": [
-                "Jumping Jacks - 10 minutes",
-                "Walking - 30 minutes",
-                "Stationary Bike - 20 minutes"
-            ],
-            "arms (biceps & triceps)": [
-                "Resistance Band Bicep Curls - 3 sets of 12 reps",
-                "Triceps Dips - 3 sets of 15 reps",
-                "Arm Circles - 3 sets of 30 seconds"
-            ],
-            "legs (quads, hamstrings, calves)": [
-                "Step-ups - 3 sets of 12 reps",
-                "Calf Raises - 4 sets of 20 reps",
-                "Lunges - 3 sets of 15 reps"
-            ]
-        }
-    }
+    equipment = st.multiselect("Equipment available (leave empty for any)", facet_values("equipment"))
+    difficulty = st.multiselect("Difficulty (leave empty for any)", list(DIFFICULTIES))
 
-    gender_key = gender if gender in routines else "other"
-    selected_routine = routines[gender_key].get(body_part.lower(), [])
+    selected_routine = find_exercises(gender, [body_part], equipment=equipment, difficulty=difficulty)
 
     if selected_routine:
         st.write(f"Recommended exercises for {body_part}:")
         for exercise in selected_routine:
-            st.write(f"- {exercise}")
+            st.write(f"- {describe(exercise)}")
     else:
         st.write("No routines available for the selected option.")
 
@@ -394,7 +228,7 @@ def mental_health_chat():
 
 def doctor_appointments():
     st.header("Doctor Appointment Booking")
-    city = st.text_input("Enter your city or area")
+    city = location_input("Enter your city or area", key="doctor_city")
     specialty = st.selectbox("Select Specialization", ["General Physician", "Cardiologist", "Dermatologist", "Pediatrician", "Gynecologist", "Other"])
 
     def fetch_doctor_slots(city, specialty):
@@ -437,7 +271,7 @@ def fetch_ambulance_driver_contact(location):
 
 def emergency_support():
     st.title("Parmatma Emergency Support")
-    location = st.text_input("Enter your city or area for ambulance support")
+    location = location_input("Enter your city or area for ambulance support", key="ambulance_location")
     if st.button("Request Ambulance Driver Contact"):
         if not location.strip():
             st.error("Please enter a valid location.")
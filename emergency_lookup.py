@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+import hospital_index
+from geocoding import geocode_location, normalize_query
+from hospital_ranking import haversine_m, rank_facilities
+from hospital_search import cached_facilities, nearest_hospitals
+
+EMERGENCY_DEADLINE_SECONDS = 2.0
+EMERGENCY_RADIUS_M = 10_000
+EMERGENCY_RESULTS = 10
+# Same name within this distance is one hospital reported by two sources.
+DUPLICATE_DISTANCE_M = 150
+
+GEMINI_MODEL = "gemini-2.5-flash-preview-05-20"
+GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+GEMINI_TIMEOUT_SECONDS = 20
+
+# Sources that miss the deadline keep running, and a repeat of the same search within
+# EMERGENCY_REUSE_SECONDS collects their answers instead of starting the calls again.
+EMERGENCY_REUSE_SECONDS = 120
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="emergency-lookup")
+_recent_lock = threading.Lock()
+_recent = {}
+
+
+def grounded_search(location, api_key):
+    payload = {
+        "contents": [{"parts": [{"text": f"List major emergency hospitals and support options in {location}."}]}],
+        "tools": [{"google_search": {}}],
+        "systemInstruction": {"parts": [
+            {"text": "Reply with local hospital/emergency centers (address/contact). Use markdown."}
+        ]}
+    }
+    response = requests.post(GEMINI_URL, params={"key": api_key}, json=payload, timeout=GEMINI_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    candidates = response.json().get("candidates")
+    return candidates[0]["content"]["parts"][0]["text"] if candidates else None
+
+
+def _submit(key, fn, *args, **kwargs):
+    now = time.monotonic()
+    with _recent_lock:
+        for stale in [stale for stale, (expires_at, _) in _recent.items() if expires_at <= now]:
+            del _recent[stale]
+        entry = _recent.get(key)
+        # A failed call is not reused; the retry gets a fresh attempt.
+        if entry is None or (entry[1].done() and entry[1].exception() is not None):
+            entry = _recent[key] = now + EMERGENCY_REUSE_SECONDS, _executor.submit(fn, *args, **kwargs)
+    return entry[1]
+
+
+def _merge(facility_lists):
+    merged, seen = [], set()
+    for facilities in facility_lists:
+        for facility in facilities:
+            key = facility["osm_type"], facility["osm_id"]
+            if key in seen:
+                continue
+            seen.add(key)
+            name = facility["name"].casefold()
+            if any(other["name"].casefold() == name
+                   and haversine_m(other["lat"], other["lon"], facility["lat"], facility["lon"]) <= DUPLICATE_DISTANCE_M
+                   for other in merged):
+                continue
+            merged.append(facility)
+    return merged
+
+
+def emergency_lookup(location, api_key=None, emergency_only=False, open_24_7=False, k=EMERGENCY_RESULTS,
+                     deadline=EMERGENCY_DEADLINE_SECONDS):
+    until = time.monotonic() + deadline
+    result = {"lat": None, "lon": None, "hospitals": [], "advice": None, "expansions": None,
+              "sources": [], "pending": [], "failed": []}
+    futures = {}
+    query_key = normalize_query(location) or location.strip().casefold()
+    # The LLM does not need coordinates, so it starts alongside geocoding.
+    if api_key:
+        futures["Gemini search"] = _submit(("Gemini search", query_key), grounded_search, location, api_key)
+    geocode_future = _submit(("geocoding", query_key), geocode_location, location)
+    wait([geocode_future], timeout=max(0, until - time.monotonic()))
+    if not geocode_future.done():
+        result["pending"].append("geocoding")
+    elif geocode_future.exception() is not None:
+        result["failed"].append("geocoding")
+    else:
+        result["lat"], result["lon"] = geocode_future.result()
+    lat, lon = result["lat"], result["lon"]
+    if lat is not None:
+        # Local reads are quick, so they run fresh every time.
+        futures["local index"] = _executor.submit(
+            hospital_index.facilities_within, lat, lon, EMERGENCY_RADIUS_M, ("hospital",))
+        futures["cached tiles"] = _executor.submit(cached_facilities, lat, lon, EMERGENCY_RADIUS_M)
+        futures["live search"] = _submit(("live search", lat, lon, k, emergency_only, open_24_7), nearest_hospitals,
+                                         lat, lon, k, emergency_only=emergency_only, open_24_7=open_24_7)
+    wait(futures.values(), timeout=max(0, until - time.monotonic()))
+    facility_lists = []
+    for source, future in futures.items():
+        if not future.done():
+            result["pending"].append(source)
+        elif future.exception() is not None:
+            result["failed"].append(source)
+        else:
+            value = future.result()
+            if source == "Gemini search":
+                result["advice"] = value
+            elif source == "live search":
+                facility_lists.append(value[0])
+                result["expansions"] = value[1]
+            else:
+                facility_lists.append([facility for facility in value if facility["kind"] == "hospital"])
+            result["sources"].append(source)
+    if lat is not None:
+        result["hospitals"] = rank_facilities(_merge(facility_lists), lat, lon, emergency_only=emergency_only,
+                                              open_24_7=open_24_7, limit=k)
+    return result
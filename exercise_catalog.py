@@ -0,0 +1,125 @@
+import csv
+import functools
+import math
+import os
+import threading
+
+EXERCISES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "exercises.csv")
+GENDERS = ("male", "female", "other")
+BODY_PARTS = ("full body", "arms", "chest", "back", "shoulders", "core", "legs", "glutes", "cardio")
+DIFFICULTIES = ("beginner", "intermediate", "advanced")
+# Labels used by the pages that are groups of catalog body parts.
+BODY_PART_ALIASES = {
+    "upper body": ("arms", "chest", "back", "shoulders"),
+    "lower body": ("legs", "glutes"),
+    "arms (biceps & triceps)": ("arms",),
+    "legs (quads, hamstrings, calves)": ("legs",),
+}
+SECONDS_PER_REP = 3
+REST_SECONDS = 60
+
+_load_lock = threading.Lock()
+_exercises = None
+_index = None
+
+
+def _minutes(exercise):
+    if exercise["minutes"]:
+        return exercise["minutes"]
+    sides = 2 if exercise["per_side"] else 1
+    work = exercise["seconds"] if exercise["seconds"] else exercise["reps"] * SECONDS_PER_REP
+    return math.ceil(exercise["sets"] * (work * sides + REST_SECONDS) / 60)
+
+
+def _load():
+    global _exercises, _index
+    with _load_lock:
+        if _exercises is not None:
+            return
+        with open(EXERCISES_PATH, encoding="utf-8", newline="") as f:
+            exercises = [
+                {**row, "body_parts": row["body_parts"].split(";"), "genders": row["genders"].split(";"),
+                 "sets": int(row["sets"] or 0), "reps": int(row["reps"] or 0), "seconds": int(row["seconds"] or 0),
+                 "minutes": int(row["minutes"] or 0), "per_side": row["per_side"] == "yes"}
+                for row in csv.DictReader(f)
+            ]
+        # Inverted index: facet -> value -> ids. A query is a union within each facet and an
+        # intersection across facets.
+        index = {"gender": {}, "body_part": {}, "equipment": {}, "difficulty": {}, "minutes": {}}
+        for i, exercise in enumerate(exercises):
+            exercise["id"] = i
+            exercise["duration_minutes"] = _minutes(exercise)
+            genders = GENDERS if "any" in exercise["genders"] else exercise["genders"]
+            for facet, values in (("gender", genders), ("body_part", exercise["body_parts"]),
+                                  ("equipment", [exercise["equipment"]]), ("difficulty", [exercise["difficulty"]]),
+                                  ("minutes", [exercise["duration_minutes"]])):
+                for value in values:
+                    index[facet].setdefault(value, set()).add(i)
+        _exercises = exercises
+        _index = {facet: {value: frozenset(ids) for value, ids in values.items()} for facet, values in index.items()}
+
+
+def _normalize(values):
+    if values is None:
+        return ()
+    if isinstance(values, str):
+        values = [values]
+    return tuple(sorted({value.strip().casefold() for value in values}))
+
+
+def _body_parts(values):
+    parts = set()
+    for value in values:
+        parts.update(BODY_PART_ALIASES.get(value, (value,)))
+    return tuple(sorted(parts))
+
+
+@functools.lru_cache(maxsize=1024)
+def _search(gender, body_parts, equipment, difficulty, max_minutes):
+    facets = []
+    if gender:
+        facets.append(_index["gender"].get(gender if gender in GENDERS else "other", frozenset()))
+    for facet, values in (("body_part", body_parts), ("equipment", equipment), ("difficulty", difficulty)):
+        if values:
+            facets.append(frozenset().union(*(_index[facet].get(value, frozenset()) for value in values)))
+    if max_minutes is not None:
+        facets.append(frozenset().union(*(ids for minutes, ids in _index["minutes"].items() if minutes <= max_minutes)))
+    if not facets:
+        return tuple(range(len(_exercises)))
+    # Intersect from the smallest set so every step stays small.
+    facets.sort(key=len)
+    ids = facets[0]
+    for other in facets[1:]:
+        ids = ids & other
+        if not ids:
+            break
+    return tuple(sorted(ids))
+
+
+def find_exercises(gender=None, body_parts=None, equipment=None, difficulty=None, max_minutes=None):
+    _load()
+    gender = gender.strip().casefold() if gender else None
+    equipment = _normalize(equipment)
+    if equipment:
+        # Equipment is what the user has available; moves that need none always qualify.
+        equipment = tuple(sorted({*equipment, "bodyweight"}))
+    ids = _search(gender, _body_parts(_normalize(body_parts)), equipment, _normalize(difficulty), max_minutes)
+    return [_exercises[i] for i in ids]
+
+
+def facet_values(facet):
+    _load()
+    return sorted(_index[facet])
+
+
+def prescription(exercise):
+    side = " each side" if exercise["per_side"] else ""
+    if exercise["minutes"]:
+        return f"{exercise['minutes']} minutes"
+    if exercise["seconds"]:
+        return f"{exercise['sets']} sets of {exercise['seconds']} seconds{side}"
+    return f"{exercise['sets']} sets of {exercise['reps']} reps{side}"
+
+
+def describe(exercise):
+    return f"{exercise['name']} - {prescription(exercise)}"
@@ -0,0 +1,154 @@
+import csv
+import functools
+import os
+import re
+import threading
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "india_places.csv")
+AUTOCOMPLETE_LIMIT = 8
+
+_load_lock = threading.Lock()
+_places = None
+_trie = None
+_keys = None
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        # The best-ranked places anywhere below, so a completion is one walk down the prefix.
+        self.top = []
+
+
+def normalize(text):
+    text = re.sub(r"[^\w\s,]", " ", text.casefold())
+    parts = [" ".join(part.split()) for part in text.split(",")]
+    parts = [part for part in parts if part]
+    if len(parts) > 1 and parts[-1] == "india":
+        parts.pop()
+    return ", ".join(parts)
+
+
+def display_name(place):
+    parts = [place["name"], place["city"], place["state"]]
+    # "Saket, Delhi" rather than "Saket, Delhi, Delhi"; "Chandigarh" rather than three of them.
+    return ", ".join(part for i, part in enumerate(parts) if part not in parts[:i])
+
+
+def _insert(root, term, index):
+    node = root
+    for char in term:
+        if index not in node.top:
+            node.top.append(index)
+        node = node.children.setdefault(char, _TrieNode())
+    if index not in node.top:
+        node.top.append(index)
+
+
+def _finish(node, rank):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        node.top = sorted(node.top, key=rank)[:AUTOCOMPLETE_LIMIT]
+        stack.extend(node.children.values())
+
+
+def _load():
+    global _places, _trie, _keys
+    with _load_lock:
+        if _places is not None:
+            return
+        with open(GAZETTEER_PATH, encoding="utf-8", newline="") as f:
+            places = [
+                {**row, "lat": float(row["lat"]), "lon": float(row["lon"]), "population": int(row["population"]),
+                 "aliases": [alias for alias in row["aliases"].split(";") if alias]}
+                for row in csv.DictReader(f)
+            ]
+        names = {i: [normalize(name) for name in [place["name"], *place["aliases"]]] for i, place in enumerate(places)}
+        city_names = {place["name"]: names[i] for i, place in enumerate(places) if place["kind"] == "city"}
+
+        def rank(i):
+            return -places[i]["population"], places[i]["kind"] != "city", places[i]["name"]
+
+        trie, keys = _TrieNode(), {}
+        for i, place in enumerate(places):
+            state = normalize(place["state"])
+            cities = city_names.get(place["city"], [normalize(place["city"])])
+            for name in names[i]:
+                _insert(trie, name, i)
+                # Exact keys for the forms people type: "andheri", "andheri, bombay",
+                # "andheri, mumbai, maharashtra", and the display name itself.
+                candidates = [name, f"{name}, {state}"]
+                if place["kind"] != "city":
+                    candidates += [f"{name}, {city}" for city in cities]
+                    candidates += [f"{name}, {city}, {state}" for city in cities]
+                for key in candidates:
+                    if key not in keys or rank(i) < rank(keys[key]):
+                        keys[key] = i
+        _finish(trie, rank)
+        _places, _trie, _keys = places, trie, keys
+
+
+def _max_edits(query):
+    return 0 if len(query) < 3 else 1 if len(query) <= 5 else 2
+
+
+def _fuzzy(query, max_edits):
+    # Levenshtein walk over the trie: a node matches when the query is within max_edits of the
+    # path so far, so misspelled prefixes still get completions.
+    matches = {}
+    first_row = list(range(len(query) + 1))
+    stack = [(child, char, first_row) for char, child in _trie.children.items()]
+    while stack:
+        node, char, previous = stack.pop()
+        row = [previous[0] + 1]
+        for column in range(1, len(query) + 1):
+            cost = 0 if query[column - 1] == char else 1
+            row.append(min(row[column - 1] + 1, previous[column] + 1, previous[column - 1] + cost))
+        distance = row[-1]
+        if distance <= max_edits:
+            for i in node.top:
+                matches[i] = min(matches.get(i, distance), distance)
+        if min(row) <= max_edits:
+            stack.extend((child, next_char, row) for next_char, child in node.children.items())
+    return matches
+
+
+@functools.lru_cache(maxsize=4096)
+def _complete(query, limit):
+    node = _trie
+    for char in query:
+        node = node.children.get(char)
+        if node is None:
+            break
+    if node is not None:
+        return tuple(node.top[:limit])
+    # No exact prefix: fall back to prefixes a typo or two away.
+    fuzzy = _fuzzy(query, _max_edits(query))
+    return tuple(sorted(fuzzy, key=lambda i: (fuzzy[i], -_places[i]["population"], _places[i]["name"]))[:limit])
+
+
+def _resolve(query):
+    # Exact name or alias keys only. A fuzzy whole-name hit is often a different real place
+    # ("dharwad" is one edit from "dhanbad"), so typos are left to autocomplete suggestions and
+    # the geocoder.
+    return _keys.get(query)
+
+
+def autocomplete(text, limit=AUTOCOMPLETE_LIMIT):
+    _load()
+    query = normalize(text).split(",")[0]
+    return [_places[i] for i in _complete(query, limit)] if query else []
+
+
+def lookup(text):
+    _load()
+    index = _resolve(normalize(text))
+    return _places[index] if index is not None else None
+
+
+def canonical_city(text):
+    place = lookup(text)
+    return place["city"] if place else None
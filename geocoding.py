@@ -0,0 +1,159 @@
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+
+import gazetteer
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {
+    "User-Agent": "ParmatmaHealthApp/1.0 (+https://yourdomain.com/contact)"
+}
+# Nominatim's usage policy allows one request per second per application.
+NOMINATIM_MIN_INTERVAL_SECONDS = 1.0
+NOMINATIM_TIMEOUT_SECONDS = 10
+
+GEOCODE_CACHE_PATH = "geocode_cache.db"
+GEOCODE_TTL_SECONDS = 180 * 24 * 60 * 60
+GEOCODE_NEGATIVE_TTL_SECONDS = 24 * 60 * 60
+
+# Old and alternate spellings map to one cache key, so "Bangalore" and "Bengaluru" share an entry.
+CITY_ALIASES = {
+    "bangalore": "bengaluru",
+    "bombay": "mumbai",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "gurgaon": "gurugram",
+    "poona": "pune",
+    "mysore": "mysuru",
+    "trivandrum": "thiruvananthapuram",
+    "cochin": "kochi",
+    "baroda": "vadodara",
+    "vizag": "visakhapatnam",
+    "pondicherry": "puducherry",
+    "banaras": "varanasi",
+    "benares": "varanasi",
+    "allahabad": "prayagraj",
+    "simla": "shimla",
+    "mangalore": "mangaluru",
+    "belgaum": "belagavi",
+    "hubli": "hubballi",
+}
+
+TOP_CITIES = [
+    "Mumbai", "Delhi", "Bengaluru", "Hyderabad", "Ahmedabad", "Chennai", "Kolkata", "Pune", "Jaipur",
+    "Surat", "Lucknow", "Kanpur", "Nagpur", "Indore", "Thane", "Bhopal", "Visakhapatnam", "Patna",
+    "Vadodara", "Ghaziabad", "Ludhiana", "Agra", "Nashik", "Kochi", "Coimbatore", "Mysuru",
+    "Chandigarh", "Guwahati", "Thiruvananthapuram", "Bhubaneswar",
+]
+
+_limiter_lock = threading.Lock()
+_last_request_at = 0.0
+_local = threading.local()
+
+
+def normalize_query(query):
+    text = re.sub(r"[^\w\s,]", " ", query.casefold())
+    parts = []
+    for part in text.split(","):
+        words = [CITY_ALIASES.get(word, word) for word in part.split()]
+        if words:
+            parts.append(" ".join(words))
+    if len(parts) > 1 and parts[-1] == "india":
+        parts.pop()
+    return ", ".join(parts)
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(GEOCODE_CACHE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+                     CREATE TABLE IF NOT EXISTS geocode_cache
+                     (
+                         query_key TEXT PRIMARY KEY,
+                         lat REAL,
+                         lon REAL,
+                         expires_at REAL NOT NULL
+                     )
+                     """)
+        _local.conn = conn
+    return conn
+
+
+def _cached(query_key):
+    row = _connection().execute(
+        "SELECT lat, lon FROM geocode_cache WHERE query_key = ? AND expires_at > ?", (query_key, time.time())
+    ).fetchone()
+    return row
+
+
+def _store(query_key, lat, lon):
+    ttl = GEOCODE_TTL_SECONDS if lat is not None else GEOCODE_NEGATIVE_TTL_SECONDS
+    conn = _connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO geocode_cache (query_key, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+        (query_key, lat, lon, time.time() + ttl)
+    )
+    conn.commit()
+
+
+def _fetch(query_key):
+    response = requests.get(NOMINATIM_URL, params={"q": query_key, "format": "json", "limit": 1},
+                            headers=NOMINATIM_HEADERS, timeout=NOMINATIM_TIMEOUT_SECONDS)
+    if response.status_code == 200 and response.json():
+        result = response.json()[0]
+        return float(result["lat"]), float(result["lon"])
+    if response.status_code == 200:
+        return None, None
+    # Errors (429, 5xx) are not cached, so the next click retries.
+    response.raise_for_status()
+    return None, None
+
+
+def geocode_location(location):
+    global _last_request_at
+    # Exact names and aliases of known places resolve in-process; anything else, typos included,
+    # goes through the cache and Nominatim.
+    place = gazetteer.lookup(location)
+    if place is not None:
+        return place["lat"], place["lon"]
+    query_key = normalize_query(location)
+    if not query_key:
+        return None, None
+    row = _cached(query_key)
+    if row is not None:
+        return row[0], row[1]
+    # Misses are serialized process-wide at <= 1 request/s; the cache is checked again after
+    # waiting because another session may just have resolved the same query.
+    with _limiter_lock:
+        row = _cached(query_key)
+        if row is not None:
+            return row[0], row[1]
+        wait = _last_request_at + NOMINATIM_MIN_INTERVAL_SECONDS - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            lat, lon = _fetch(query_key)
+        except requests.RequestException:
+            return None, None
+        finally:
+            _last_request_at = time.monotonic()
+    _store(query_key, lat, lon)
+    return lat, lon
+
+
+def warm_up(cities=TOP_CITIES):
+    return {city: geocode_location(city) for city in cities}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["warm-up"]:
+        sys.exit("usage: python geocoding.py warm-up")
+    for city, (lat, lon) in warm_up().items():
+        print(f"{city}: {lat}, {lon}")
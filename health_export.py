@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import tempfile
+
+EXPORT_CHUNK_SIZE = 1000
+# Rows beyond this many bytes of output spill from memory to a temp file on disk.
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_postgrest_chunks(client, table, user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    # Keyset pagination on id: every page is an index range scan, however deep the export goes.
+    last_id = None
+    while True:
+        query = client.table(table).select("*").eq("user_id", user_id).order("id").limit(chunk_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        if not rows:
+            return
+        yield [{"record_type": table, **row} for row in rows]
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def _write_csv(chunks, columns, fileobj):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[name for name, _ in columns], extrasaction="ignore")
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows(chunk)
+        fileobj.write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+    fileobj.write(buffer.getvalue().encode("utf-8"))
+
+
+def _write_jsonl(chunks, fileobj):
+    for chunk in chunks:
+        fileobj.write("".join(json.dumps(row, default=str) + "\n" for row in chunk).encode("utf-8"))
+
+
+def _write_parquet(chunks, columns, fileobj):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for chunk in chunks:
+            # Values keep their storage types except strings, which may come back as dates/times.
+            rows = [{name: (str(row[name]) if kind == "str" and row.get(name) is not None else row.get(name))
+                     for name, kind in columns} for row in chunk]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+
+
+def export_history(chunks, fmt, columns):
+    """Stream row chunks into a spooled temp file and return it rewound.
+
+    `chunks` is an iterable of lists of dicts, `columns` a list of (name, kind)
+    pairs with kind in {"int", "float", "str"}. Only one chunk is held in memory
+    at a time; output beyond EXPORT_SPOOL_BYTES goes to disk.
+    """
+    fileobj = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    if fmt == "csv":
+        _write_csv(chunks, columns, fileobj)
+    elif fmt == "jsonl":
+        _write_jsonl(chunks, fileobj)
+    elif fmt == "parquet":
+        _write_parquet(chunks, columns, fileobj)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    fileobj.seek(0)
+    return fileobj
+
+
+def export_bytes(chunks, fmt, columns):
+    # st.download_button takes bytes or in-memory buffers but not temp files, so the spooled
+    # export is read back once it is complete.
+    with export_history(chunks, fmt, columns) as fileobj:
+        return fileobj.read()
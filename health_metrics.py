@@ -0,0 +1,88 @@
+import numpy as np
+
+# Column-at-a-time body metrics: every function takes scalars or equal-length arrays and
+# returns NumPy results, so a whole cohort is scored in one pass. Invalid rows (non-positive
+# weight or height) come back as NaN with the "Invalid" category instead of raising.
+BMI_CATEGORIES = ("Underweight", "Normal", "Overweight", "Obese")
+# Lower bounds of Normal, Overweight and Obese.
+BMI_THRESHOLDS = (18.5, 25.0, 30.0)
+INVALID_CATEGORY = "Invalid"
+ACTIVITY_LEVELS = {
+    "Sedentary": 1.2,
+    "Lightly active": 1.375,
+    "Moderately active": 1.55,
+    "Very active": 1.725,
+}
+DEFAULT_ACTIVITY = "Lightly active"
+# Mifflin-St Jeor sex constants; "other" and unrecognised values use their midpoint.
+BMR_GENDER_OFFSETS = {"male": 5.0, "female": -161.0, "other": -78.0}
+BMR_OTHER_OFFSET = -78.0
+
+_CATEGORY_LABELS = np.array(BMI_CATEGORIES + (INVALID_CATEGORY,))
+
+
+def _lookup(values, table, default):
+    # Map a column of labels through a dict. The usual spellings are plain array comparisons;
+    # only leftover rows (odd casing, stray spaces, unknown labels) are resolved one distinct
+    # label at a time.
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return values
+    if values.dtype.kind != "U":
+        values = values.astype(str)
+    mapped = np.full(values.shape, np.nan)
+    for label, number in table.items():
+        for spelling in {label, label.capitalize()}:
+            mapped[values == spelling] = number
+    rest = np.isnan(mapped)
+    if rest.any():
+        folded = {label.casefold(): number for label, number in table.items()}
+        labels, inverse = np.unique(values[rest], return_inverse=True)
+        mapped[rest] = np.array([folded.get(label.strip().casefold(), default) for label in labels])[inverse]
+    return mapped
+
+
+def bmi(weight_kg, height_cm):
+    weight = np.asarray(weight_kg, dtype=float)
+    height_m = np.asarray(height_cm, dtype=float) / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = weight / (height_m * height_m)
+    return np.where((weight > 0) & (height_m > 0), values, np.nan)
+
+
+def bmi_category(bmi_values):
+    values = np.asarray(bmi_values, dtype=float)
+    codes = np.searchsorted(BMI_THRESHOLDS, values, side="right")
+    return _CATEGORY_LABELS[np.where(np.isnan(values), len(BMI_CATEGORIES), codes)]
+
+
+def bmr(weight_kg, height_cm, age, gender):
+    offsets = _lookup(gender, BMR_GENDER_OFFSETS, BMR_OTHER_OFFSET)
+    weight = np.asarray(weight_kg, dtype=float)
+    height = np.asarray(height_cm, dtype=float)
+    values = 10 * weight + 6.25 * height - 5 * np.asarray(age, dtype=float) + offsets
+    return np.where((weight > 0) & (height > 0), values, np.nan)
+
+
+def tdee(bmr_values, activity=DEFAULT_ACTIVITY):
+    factors = _lookup(activity, ACTIVITY_LEVELS, ACTIVITY_LEVELS[DEFAULT_ACTIVITY])
+    return np.asarray(bmr_values, dtype=float) * factors
+
+
+def compute_metrics(weight_kg, height_cm, age, gender, activity=DEFAULT_ACTIVITY):
+    bmi_values = bmi(weight_kg, height_cm)
+    bmr_values = bmr(weight_kg, height_cm, age, gender)
+    return {
+        "bmi": bmi_values,
+        "category": bmi_category(bmi_values),
+        "bmr": bmr_values,
+        "tdee": tdee(bmr_values, activity),
+    }
+
+
+def bmi_and_category(weight_kg, height_cm):
+    # Scalar form for the pages: (0, "Invalid") on bad input, as the page helpers always returned.
+    value = float(bmi(weight_kg, height_cm))
+    if np.isnan(value):
+        return 0, INVALID_CATEGORY
+    return value, str(bmi_category(value))
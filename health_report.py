@@ -0,0 +1,146 @@
+import html
+import threading
+from collections import OrderedDict
+
+from supabase_store import HISTORY_TABLES, fetch_user, iter_records_since
+
+REPORT_FORMATS = {
+    "Markdown": ("md", "text/markdown"),
+    "HTML": ("html", "text/html"),
+    "PDF": ("pdf", "application/pdf"),
+    "Text": ("txt", "text/plain"),
+}
+REPORT_CACHE_SIZE = 32
+
+SECTION_TITLES = {
+    "symptom_entries": "Symptoms",
+    "mental_health_chats": "Mental Health Logs",
+    "appointments": "Appointments",
+}
+
+_snapshots_lock = threading.Lock()
+_snapshots = OrderedDict()
+_user_locks = {}
+
+
+def _entry(table, row):
+    if table == "symptom_entries":
+        return f"{row['created_at']}: {row['symptoms']}", row.get('response') or ""
+    if table == "mental_health_chats":
+        return f"{row['created_at']}: You: {row['user_text']}", f"Coach: {row.get('bot_response') or ''}"
+    return f"{row['date']} {row['time']}: {row['specialty']} at {row['location']} ({row['status']})", ""
+
+
+def _render_entry(fmt, title, detail):
+    if fmt == "Markdown":
+        return f"- **{title}**" + (f"\n\n  {detail}" if detail else "")
+    if fmt == "HTML":
+        return f"<li><strong>{html.escape(title)}</strong>" + (f"<p>{html.escape(detail)}</p>" if detail else "") + "</li>"
+    return title + (f"\n    {detail}" if detail else "")
+
+
+def _render_header(fmt, user):
+    name = f"{user['name']} (Age {user['age']}, Gender: {user['gender']})"
+    body = f"Height: {user['height']} cm | Weight: {user['weight']} kg"
+    if fmt == "Markdown":
+        return f"# Health Report: {name}\n\n{body}"
+    if fmt == "HTML":
+        return f"<h1>Health Report: {html.escape(name)}</h1><p>{html.escape(body)}</p>"
+    return f"User: {name}\n{body}"
+
+
+def _assemble(fmt, snapshot):
+    lines = snapshot["lines"].setdefault(fmt, {table: [] for table in HISTORY_TABLES})
+    parts = [_render_header(fmt, snapshot["user"])]
+    for table in HISTORY_TABLES:
+        # Only rows added since this format was last rendered are formatted again.
+        for row in snapshot["rows"][table][len(lines[table]):]:
+            lines[table].append(_render_entry(fmt, *_entry(table, row)))
+        if fmt == "Markdown":
+            parts.append(f"## {SECTION_TITLES[table]}\n\n" + "\n".join(lines[table]))
+        elif fmt == "HTML":
+            parts.append(f"<h2>{SECTION_TITLES[table]}</h2><ul>{''.join(lines[table])}</ul>")
+        else:
+            parts.append(f"{SECTION_TITLES[table]}:\n" + "\n".join(lines[table]))
+    if fmt == "HTML":
+        return "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Health Report</title></head><body>" \
+               + "".join(parts) + "</body></html>"
+    return "\n\n".join(parts) + "\n"
+
+
+def _render_pdf(text):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=10)
+    for line in text.splitlines():
+        # Core PDF fonts are Latin-1 only.
+        pdf.multi_cell(0, 5, line.encode("latin-1", "replace").decode("latin-1") or " ")
+    return bytes(pdf.output())
+
+
+def available_formats():
+    try:
+        import fpdf  # noqa: F401
+    except ImportError:
+        return [fmt for fmt in REPORT_FORMATS if fmt != "PDF"]
+    return list(REPORT_FORMATS)
+
+
+def _row_order(row):
+    return str(row["created_at"]), row["id"]
+
+
+def _user_lock(user_id):
+    with _snapshots_lock:
+        return _user_locks.setdefault(user_id, threading.Lock())
+
+
+def _refresh_snapshot(user_id):
+    with _snapshots_lock:
+        snapshot = _snapshots.get(user_id)
+    snapshot = snapshot or {
+        "rows": {table: [] for table in HISTORY_TABLES},
+        "cursors": {table: None for table in HISTORY_TABLES},
+        "lines": {},
+        "rendered": {},
+    }
+    # The profile can be edited at any time, so it is re-read on every build; it is one row.
+    snapshot["user"] = fetch_user(user_id)
+    for table in HISTORY_TABLES:
+        rows = snapshot["rows"][table]
+        new_rows = [row for chunk in iter_records_since(table, user_id, snapshot["cursors"][table]) for row in chunk]
+        if not new_rows:
+            continue
+        snapshot["cursors"][table] = new_rows[-1]["id"]
+        # Rows synced late by the outbox can be older than ones already shown; the report stays in
+        # created_at order, so that table's rendered lines are rebuilt.
+        late = rows and min(map(_row_order, new_rows)) < _row_order(rows[-1])
+        rows.extend(new_rows)
+        rows.sort(key=_row_order)
+        if late:
+            for lines in snapshot["lines"].values():
+                lines[table] = []
+    with _snapshots_lock:
+        _snapshots[user_id] = snapshot
+        _snapshots.move_to_end(user_id)
+        while len(_snapshots) > REPORT_CACHE_SIZE:
+            evicted, _ = _snapshots.popitem(last=False)
+            _user_locks.pop(evicted, None)
+    return snapshot
+
+
+def build_report(user_id, fmt):
+    # The snapshot's version stamp is the profile plus its per-table last-seen id; a rendered
+    # report is reused until the profile changes or new rows move a cursor.
+    with _user_lock(user_id):
+        snapshot = _refresh_snapshot(user_id)
+        version = (sorted(snapshot["user"].items()), tuple(snapshot["cursors"][table] for table in HISTORY_TABLES))
+        cached = snapshot["rendered"].get(fmt)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        text = _assemble("Text" if fmt == "PDF" else fmt, snapshot)
+        report = _render_pdf(text) if fmt == "PDF" else text
+        snapshot["rendered"][fmt] = (version, report)
+        return report
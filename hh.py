@@ -1,15 +1,47 @@
 import streamlit as st
-from supabase import create_client
 import datetime
 import requests
 from textblob import TextBlob
+from health_export import EXPORT_FORMATS, export_bytes, iter_postgrest_chunks
+from health_metrics import bmi_and_category
+import supabase_outbox
+import supabase_store
+from health_report import REPORT_FORMATS, available_formats, build_report
+from meal_plan_view import meal_plan_section
+from meal_planner import plan_summary
+from profile_import_view import profile_import_section
+from supabase_store import (
+    HISTORY_TABLES, HISTORY_PAGE_SIZE, fetch_record_bodies, fetch_records, get_user_history, history_version,
+    next_cursor,
+)
 
 # --- Setup your keys in .streamlit/secrets.toml ---
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
+# SUPABASE_BACKEND = "local" swaps Supabase for the SQLite-backed local_postgrest stand-in.
+SUPABASE_BACKEND = st.secrets.get("SUPABASE_BACKEND", "supabase")
 GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+@st.cache_resource
+def get_supabase_client():
+    if SUPABASE_BACKEND == "local":
+        from local_postgrest import LocalPostgrestClient
+        return LocalPostgrestClient(
+            st.secrets.get("LOCAL_SUPABASE_PATH", "local_supabase.db"),
+            latency_ms=st.secrets.get("LOCAL_SUPABASE_LATENCY_MS", 0),
+        )
+    from supabase import create_client
+    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+
+supabase = get_supabase_client()
+supabase_store.configure(supabase)
+supabase_outbox.start_outbox_worker()
+
+EXPORT_COLUMNS = [
+    ("record_type", "str"), ("id", "int"), ("user_id", "int"), ("created_at", "str"),
+    ("symptoms", "str"), ("response", "str"), ("user_text", "str"), ("bot_response", "str"),
+    ("sentiment", "float"), ("specialty", "str"), ("location", "str"), ("date", "str"),
+    ("time", "str"), ("status", "str"),
+]
 
 st.set_page_config(page_title="Parmatma - Health & Wellness", page_icon="🧘‍♂️", layout="centered")
 
@@ -25,50 +57,38 @@ def call_gemini_api(prompt, system_instruction=""):
     return response.json()['candidates'][0]['content']['parts'][0]['text']
 
 def save_record(table, data):
-    response = supabase.table(table).insert(data).execute()
-    if response.data and len(response.data) > 0:
-        return response.data[0]["id"]
-    else:
+    # New users need their server id right away; everything else is confirmed once it is on
+    # local disk and reaches Supabase through the outbox worker.
+    if table != "users":
+        return supabase_outbox.enqueue(table, data)
+    record_id = supabase_store.save_record(table, data)
+    if record_id is None:
         st.error(f"Failed to save data to {table}.")
-        return None
+    return record_id
 
-def fetch_records(table, user_id, limit=None):
-    query = supabase.table(table).select("*").eq("user_id", user_id).order("created_at", desc=True)
-    if limit:
-        query = query.limit(limit)
-    response = query.execute()
-    return response.data if response.data else []
+def save_user_batch(records):
+    created_at = datetime.datetime.utcnow().isoformat()
+    # The Supabase users table has no contact column.
+    return supabase_store.save_records("users", [
+        {**{key: value for key, value in details.items() if key != "contact"}, "created_at": created_at}
+        for details in records
+    ])
 
-def fetch_user(user_id):
-    res = supabase.table("users").select("*").eq("id", user_id).single().execute()
-    return res.data
+BMI_ADVICE = {
+    "Underweight": "Focus on nutrient-rich foods and consult a professional.",
+    "Normal": "Maintain balanced diet and regular exercise.",
+    "Overweight": "Consider balanced diet and increased activity.",
+    "Obese": "Seek medical guidance for personalized care.",
+    "Invalid": "Height and weight must be positive numbers.",
+}
 
 def calculate_bmi(weight, height):
-    if height <= 0 or weight <= 0:
-        return 0, "Invalid", "Height and weight must be positive numbers."
-    bmi = weight / ((height / 100) ** 2)
-    if bmi < 18.5:
-        return bmi, "Underweight", "Focus on nutrient-rich foods and consult a professional."
-    elif bmi < 25:
-        return bmi, "Normal", "Maintain balanced diet and regular exercise."
-    elif bmi < 30:
-        return bmi, "Overweight", "Consider balanced diet and increased activity."
-    else:
-        return bmi, "Obese", "Seek medical guidance for personalized care."
-
-def generate_report(user, symptoms, mental, appointments):
-    lines = [f"User: {user['name']} (Age {user['age']}, Gender: {user['gender']})"]
-    lines.append(f"Height: {user['height']} cm | Weight: {user['weight']} kg\n")
-    lines.append("Symptoms:")
-    for s in symptoms[:10]:
-        lines.append(f"{s['created_at']}: {s['symptoms']} → {s['response'][:100]}...")
-    lines.append("\nMental Health Logs:")
-    for m in mental[:10]:
-        lines.append(f"{m['created_at']}: You: {m['user_text']} → Coach: {m['bot_response'][:100]}...")
-    lines.append("\nAppointments:")
-    for a in appointments[:10]:
-        lines.append(f"{a['date']} {a['time']}: {a['specialty']} at {a['location']} ({a['status']})")
-    return "\n".join(lines)
+    bmi, category = bmi_and_category(weight, height)
+    return bmi, category, BMI_ADVICE[category]
+
+def iter_history_chunks(user_id):
+    for table in HISTORY_TABLES:
+        yield from iter_postgrest_chunks(supabase, table, user_id)
 
 # -------- Pages ---------
 
@@ -95,6 +115,8 @@ def page_personal_details():
                 st.session_state.user_info = {"name": name, "age": age, "gender": gender,
                                              "height": height, "weight": weight}
                 st.success(f"Welcome {name}! Your details saved.")
+    with st.expander("Bulk Import Profiles"):
+        profile_import_section(save_user_batch, key="users_import")
 
 def page_bmi_calculator():
     st.header("BMI Calculator")
@@ -114,6 +136,7 @@ def page_nutrition_coach():
         st.info("Enter personal details first.")
         return
     bmi, category, _ = calculate_bmi(user["weight"], user["height"])
+    targets, week = meal_plan_section(user, category, key="nutrition")
     goal = ""
     if category == "Underweight":
         goal = "a weekly meal plan to gain healthy weight"
@@ -121,11 +144,16 @@ def page_nutrition_coach():
         goal = "a balanced weekly meal plan for fat loss"
     else:
         goal = st.text_input("Enter your nutrition goal", "balanced diet")
-    if st.button("Get Nutrition Plan"):
+    if st.button("Get Nutritionist Notes"):
         if not goal.strip():
             st.error("Please enter a goal.")
             return
-        prompt = f"Create {goal}. Reply as professional nutritionist in markdown."
+        if not week or not week[0]["meals"]:
+            st.error("Adjust the restrictions to get a meal plan first.")
+            return
+        prompt = (f"Goal: {goal}. Daily targets: {targets['kcal']} kcal, {targets['protein_g']} g protein. "
+                  f"Weekly meal plan:\n{plan_summary(week)}\nAdd practical notes on preparation and swaps. "
+                  "Do not change the foods or portions. Reply as professional nutritionist in markdown.")
         result = call_gemini_api(prompt)
         st.markdown(result)
 
@@ -227,23 +255,81 @@ def page_emergency_support():
             return
         st.info(f"Searching emergency hospitals near {city}... (Feature to be integrated)")
 
+def load_older_records(table, user_id, cursor, version):
+    rows = fetch_records(table, user_id, limit=HISTORY_PAGE_SIZE, cursor=cursor)
+    older, _, loaded = st.session_state.older_records.get(table, ([], None, None))
+    if loaded != (user_id, version):
+        older = []
+    st.session_state.older_records[table] = (older + rows, next_cursor(rows), (user_id, version))
+
+def with_older_records(table, user_id, first_page):
+    # Older pages live in session state; the first page comes from the shared history cache.
+    # A save drops that cache and shifts the first page, so older pages fetched before it are
+    # discarded and paging starts again from the new first page.
+    if "older_records" not in st.session_state:
+        st.session_state.older_records = {}
+    version = history_version(user_id)
+    older, cursor, loaded = st.session_state.older_records.get(table, ([], None, None))
+    if loaded != (user_id, version):
+        st.session_state.older_records.pop(table, None)
+        return first_page, next_cursor(first_page), version
+    seen = {row['id'] for row in first_page}
+    return first_page + [row for row in older if row['id'] not in seen], cursor, version
+
+def show_record_body(table, record_id, field):
+    expanded = st.session_state.setdefault("expanded_records", set())
+    key = f"{table}-{record_id}"
+    if key in expanded or st.button("Show full response", key=f"body-{key}"):
+        expanded.add(key)
+        st.markdown(fetch_record_bodies(table, [record_id])[record_id][field])
+
+def show_history_section(title, table, user_id, first_page, label, field=None):
+    st.sidebar.subheader(title)
+    rows, cursor, version = with_older_records(table, user_id, first_page)
+    for row in rows:
+        if field:
+            with st.sidebar.expander(label(row)):
+                show_record_body(table, row['id'], field)
+        else:
+            st.sidebar.markdown(f"- {label(row)}")
+    if cursor:
+        st.sidebar.button("Load older", key=f"older-{table}", on_click=load_older_records,
+                          args=(table, user_id, cursor, version))
+
 def show_history_sidebar():
     if "user_id" not in st.session_state:
         return
-    user, symptoms, mental, appointments = get_user_history(st.session_state.user_id)
+    user_id = st.session_state.user_id
+    user, symptoms, mental, appointments = get_user_history(user_id)
     st.sidebar.header(f"Your Health History - {user['name']}")
-    st.sidebar.subheader("Recent Symptoms")
-    for s in symptoms[:5]:
-        st.sidebar.markdown(f"- {s['created_at']}: {s['symptoms'][:50]}...")
-    st.sidebar.subheader("Mental Health Logs")
-    for m in mental[:5]:
-        st.sidebar.markdown(f"- {m['created_at']}: {m['user_text'][:50]}...")
-    st.sidebar.subheader("Appointments")
-    for a in appointments[:5]:
-        st.sidebar.markdown(f"- {a['date']} {a['time']} | {a['specialty']} at {a['location']} ({a['status']})")
-
-    report_text = generate_report(user, symptoms, mental, appointments)
-    st.sidebar.download_button("Download Full Health Report", report_text, "health_report.txt")
+    pending = supabase_outbox.pending_count(user_id)
+    if pending:
+        st.sidebar.caption(f"{pending} new entries are saved locally and still syncing.")
+    parked = len(supabase_outbox.parked_entries(user_id))
+    if parked:
+        st.sidebar.warning(f"{parked} entries could not be synced after repeated attempts and are kept locally.")
+        st.sidebar.button("Retry syncing", key="requeue-parked", on_click=supabase_outbox.requeue_parked,
+                          kwargs={"user_id": user_id})
+    show_history_section("Recent Symptoms", "symptom_entries", user_id, symptoms,
+                         lambda s: f"{s['created_at']}: {s['symptoms'][:50]}...", field="response")
+    show_history_section("Mental Health Logs", "mental_health_chats", user_id, mental,
+                         lambda m: f"{m['created_at']}: {m['user_text'][:50]}...", field="bot_response")
+    show_history_section("Appointments", "appointments", user_id, appointments,
+                         lambda a: f"{a['date']} {a['time']} | {a['specialty']} at {a['location']} ({a['status']})")
+
+    report_format = st.sidebar.selectbox("Report format", available_formats())
+    if st.sidebar.button("Prepare Health Report"):
+        extension, mime = REPORT_FORMATS[report_format]
+        with st.spinner("Building your health report..."):
+            report = build_report(user_id, report_format)
+        st.sidebar.download_button("Download Full Health Report", report, f"health_report.{extension}", mime=mime)
+
+    export_format = st.sidebar.selectbox("Export format", list(EXPORT_FORMATS.keys()))
+    if st.sidebar.button("Prepare History Export"):
+        extension, mime = EXPORT_FORMATS[export_format]
+        with st.spinner("Exporting your history..."):
+            export_file = export_bytes(iter_history_chunks(st.session_state.user_id), extension, EXPORT_COLUMNS)
+        st.sidebar.download_button("Download History Export", export_file, f"health_history.{extension}", mime=mime)
 
 # -------- Navigation ----------
 
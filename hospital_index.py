@@ -0,0 +1,251 @@
+import json
+import math
+import sqlite3
+import threading
+
+from hospital_ranking import rank_facilities
+
+HOSPITAL_INDEX_PATH = "hospital_index.db"
+FACILITY_KINDS = ("hospital", "clinic")
+IMPORT_BATCH_SIZE = 1000
+METERS_PER_DEGREE_LAT = 111_320
+
+_local = threading.local()
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(HOSPITAL_INDEX_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+                     CREATE TABLE IF NOT EXISTS facilities
+                     (
+                         id INTEGER PRIMARY KEY,
+                         osm_type TEXT NOT NULL,
+                         osm_id INTEGER NOT NULL,
+                         kind TEXT NOT NULL,
+                         name TEXT,
+                         lat REAL NOT NULL,
+                         lon REAL NOT NULL,
+                         phone TEXT,
+                         address TEXT,
+                         emergency TEXT,
+                         opening_hours TEXT,
+                         UNIQUE (osm_type, osm_id)
+                     )
+                     """)
+        # R*Tree over points (min == max); facilities.id is the rtree id.
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS facilities_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+        conn.execute("""
+                     CREATE TABLE IF NOT EXISTS replication_state
+                     (
+                         source TEXT PRIMARY KEY,
+                         sequence INTEGER NOT NULL,
+                         updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                     )
+                     """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _address(tags):
+    parts = [" ".join(filter(None, [tags.get("addr:housenumber"), tags.get("addr:street")])),
+             tags.get("addr:suburb"), tags.get("addr:city"), tags.get("addr:postcode")]
+    return ", ".join(part for part in parts if part) or tags.get("addr:full")
+
+
+def facility_kind(tags):
+    kind = tags.get("amenity") or tags.get("healthcare")
+    return kind if kind in FACILITY_KINDS else None
+
+
+def facility_from_element(element, node_coords=None):
+    tags = element.get("tags", {})
+    kind = facility_kind(tags)
+    if kind is None:
+        return None
+    if "lat" in element:
+        lat, lon = element["lat"], element["lon"]
+    elif "center" in element:
+        lat, lon = element["center"]["lat"], element["center"]["lon"]
+    elif element.get("geometry"):
+        points = [point for point in element["geometry"] if point]
+        lat, lon = sum(p["lat"] for p in points) / len(points), sum(p["lon"] for p in points) / len(points)
+    elif node_coords and element.get("nodes"):
+        points = [node_coords[node] for node in element["nodes"] if node in node_coords]
+        if not points:
+            return None
+        lat, lon = sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)
+    else:
+        return None
+    return {
+        "osm_type": element["type"],
+        "osm_id": element["id"],
+        "kind": kind,
+        "name": tags.get("name", "Unnamed Hospital" if kind == "hospital" else "Unnamed Clinic"),
+        "lat": lat,
+        "lon": lon,
+        "phone": tags.get("phone") or tags.get("contact:phone"),
+        "address": _address(tags),
+        "emergency": tags.get("emergency"),
+        "opening_hours": tags.get("opening_hours"),
+    }
+
+
+def _upsert(conn, facility):
+    row = conn.execute(
+        """
+        INSERT INTO facilities (osm_type, osm_id, kind, name, lat, lon, phone, address, emergency, opening_hours)
+        VALUES (:osm_type, :osm_id, :kind, :name, :lat, :lon, :phone, :address, :emergency, :opening_hours)
+        ON CONFLICT (osm_type, osm_id) DO UPDATE SET
+            kind = excluded.kind, name = excluded.name, lat = excluded.lat, lon = excluded.lon,
+            phone = excluded.phone, address = excluded.address, emergency = excluded.emergency,
+            opening_hours = excluded.opening_hours
+        RETURNING id
+        """,
+        facility
+    ).fetchone()
+    conn.execute(
+        "INSERT OR REPLACE INTO facilities_rtree (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)",
+        (row["id"], facility["lat"], facility["lat"], facility["lon"], facility["lon"])
+    )
+
+
+def _delete(conn, osm_type, osm_id):
+    row = conn.execute("DELETE FROM facilities WHERE osm_type = ? AND osm_id = ? RETURNING id",
+                       (osm_type, osm_id)).fetchone()
+    if row is not None:
+        conn.execute("DELETE FROM facilities_rtree WHERE id = ?", (row["id"],))
+
+
+def upsert_facilities(facilities):
+    conn = _connection()
+    for facility in facilities:
+        _upsert(conn, facility)
+    conn.commit()
+    return len(facilities)
+
+
+def apply_changes(changes, source=None, sequence=None):
+    # changes maps (osm_type, osm_id) to a facility dict, or None to remove it. The
+    # replication checkpoint moves in the same transaction, so a crash never skips a diff.
+    conn = _connection()
+    with conn:
+        for (osm_type, osm_id), facility in changes.items():
+            if facility is None:
+                _delete(conn, osm_type, osm_id)
+            else:
+                _upsert(conn, facility)
+        if source is not None:
+            conn.execute(
+                "INSERT INTO replication_state (source, sequence) VALUES (?, ?) "
+                "ON CONFLICT (source) DO UPDATE SET sequence = excluded.sequence, updated_at = CURRENT_TIMESTAMP",
+                (source, sequence)
+            )
+    return len(changes)
+
+
+def replication_sequence(source):
+    row = _connection().execute("SELECT sequence FROM replication_state WHERE source = ?", (source,)).fetchone()
+    return row["sequence"] if row else None
+
+
+def get_facility(osm_type, osm_id):
+    row = _connection().execute("SELECT * FROM facilities WHERE osm_type = ? AND osm_id = ?",
+                                (osm_type, osm_id)).fetchone()
+    return dict(row) if row else None
+
+
+def indexed_keys():
+    return {(row["osm_type"], row["osm_id"]) for row in _connection().execute("SELECT osm_type, osm_id FROM facilities")}
+
+
+def facility_count():
+    return _connection().execute("SELECT COUNT(*) FROM facilities").fetchone()[0]
+
+
+def bounding_box(lat, lon, radius_m):
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def facilities_within(lat, lon, radius_m, kinds=FACILITY_KINDS):
+    south, west, north, east = bounding_box(lat, lon, radius_m)
+    rows = _connection().execute(
+        f"""
+        SELECT f.* FROM facilities_rtree r JOIN facilities f ON f.id = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+          AND f.kind IN ({', '.join('?' for _ in kinds)})
+        """,
+        (south, north, west, east, *kinds)
+    ).fetchall()
+    # The box is a superset of the circle; the ranking pass trims its corners.
+    return rank_facilities([dict(row) for row in rows], lat, lon, radius_m=radius_m)
+
+
+# ------------------ Importers ------------------
+
+def import_osm_json(path):
+    # Overpass JSON ("out center" or "out geom"), or raw OSM JSON whose ways list node ids.
+    with open(path, encoding="utf-8") as f:
+        elements = json.load(f).get("elements", [])
+    node_coords = {e["id"]: (e["lat"], e["lon"]) for e in elements if e.get("type") == "node" and "lat" in e}
+    facilities = [facility for facility in (facility_from_element(e, node_coords) for e in elements) if facility]
+    for start in range(0, len(facilities), IMPORT_BATCH_SIZE):
+        upsert_facilities(facilities[start:start + IMPORT_BATCH_SIZE])
+    return len(facilities)
+
+
+def import_osm_pbf(path):
+    import osmium
+
+    class FacilityHandler(osmium.SimpleHandler):
+        def __init__(self):
+            super().__init__()
+            self.batch = []
+            self.imported = 0
+
+        def _add(self, element):
+            facility = facility_from_element(element)
+            if facility:
+                self.batch.append(facility)
+            if len(self.batch) >= IMPORT_BATCH_SIZE:
+                self.flush()
+
+        def flush(self):
+            self.imported += upsert_facilities(self.batch)
+            self.batch = []
+
+        def node(self, n):
+            tags = {tag.k: tag.v for tag in n.tags}
+            if facility_kind(tags):
+                self._add({"type": "node", "id": n.id, "lat": n.location.lat, "lon": n.location.lon, "tags": tags})
+
+        def area(self, a):
+            # Closed ways and multipolygon relations; the outer ring centroid stands in for the building.
+            tags = {tag.k: tag.v for tag in a.tags}
+            if not facility_kind(tags):
+                return
+            points = [{"lat": n.lat, "lon": n.lon} for ring in a.outer_rings() for n in ring]
+            if points:
+                self._add({"type": "way" if a.from_way() else "relation", "id": a.orig_id(),
+                           "geometry": points, "tags": tags})
+
+    handler = FacilityHandler()
+    handler.apply_file(path, locations=True)
+    handler.flush()
+    return handler.imported
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3 or sys.argv[1] != "import":
+        sys.exit("usage: python hospital_index.py import <extract.osm.pbf|extract.json>")
+    importer = import_osm_pbf if sys.argv[2].endswith(".pbf") else import_osm_json
+    print(f"Imported {importer(sys.argv[2])} facilities into {HOSPITAL_INDEX_PATH}.")
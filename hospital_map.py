@@ -0,0 +1,93 @@
+import hashlib
+import html
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import folium
+import streamlit as st
+import streamlit.components.v1 as components
+from folium.plugins import FastMarkerCluster
+
+from tile_server import TILE_ATTRIBUTION, TILE_URL, start_tile_server
+
+MAP_WIDTH = 700
+MAP_HEIGHT = 450
+MAP_ZOOM = 13
+MAP_CACHE_SIZE = 64
+STATIC_MAP_SIZE = 360
+
+# Markers are shipped as one JSON array and created client-side, instead of one JS block each.
+_CLUSTER_CALLBACK = """
+function (row) {
+    return L.marker(new L.LatLng(row[0], row[1])).bindPopup(row[2]);
+}
+"""
+
+_maps_lock = threading.Lock()
+_maps = OrderedDict()
+
+
+def result_key(hospitals, center_lat, center_lon):
+    payload = [round(center_lat, 5), round(center_lon, 5),
+               [(hos["name"], round(hos["lat"], 6), round(hos["lon"], 6)) for hos in hospitals]]
+    return hashlib.sha1(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def build_map(hospitals, center_lat, center_lon, cluster=True):
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=MAP_ZOOM, tiles=TILE_URL, attr=TILE_ATTRIBUTION)
+    if cluster:
+        # Clustering keeps dense metro results to a handful of visible markers until zoomed in.
+        FastMarkerCluster([[hos['lat'], hos['lon'], html.escape(hos['name'])] for hos in hospitals],
+                          callback=_CLUSTER_CALLBACK).add_to(m)
+        return m
+    for hos in hospitals:
+        folium.Marker(
+            [hos['lat'], hos['lon']],
+            popup=hos['name']
+        ).add_to(m)
+    return m
+
+
+def map_html(hospitals, center_lat, center_lon):
+    key = result_key(hospitals, center_lat, center_lon)
+    with _maps_lock:
+        if key in _maps:
+            _maps.move_to_end(key)
+            return _maps[key]
+    page = build_map(hospitals, center_lat, center_lon).get_root().render()
+    with _maps_lock:
+        _maps[key] = page
+        while len(_maps) > MAP_CACHE_SIZE:
+            _maps.popitem(last=False)
+    return page
+
+
+def static_map_svg(hospitals, center_lat, center_lon, size=STATIC_MAP_SIZE):
+    # Tile-free plan view: the user at the centre, hospitals placed by their offset and scaled
+    # so the farthest one sits near the edge. A few KB even for long result lists.
+    scale_lon = max(math.cos(math.radians(center_lat)), 0.01)
+    offsets = [((hos["lon"] - center_lon) * scale_lon, hos["lat"] - center_lat) for hos in hospitals]
+    extent = max([max(abs(dx), abs(dy)) for dx, dy in offsets] + [1e-4])
+    half = size / 2
+    pixels = half * 0.9 / extent
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+             f'viewBox="0 0 {size} {size}" style="background:#f4f6f8;border-radius:8px">',
+             f'<circle cx="{half}" cy="{half}" r="{half * 0.9:.1f}" fill="none" stroke="#cfd8dc"/>',
+             f'<circle cx="{half}" cy="{half}" r="6" fill="#1e88e5"><title>You are here</title></circle>']
+    for hos, (dx, dy) in zip(hospitals, offsets):
+        parts.append(f'<circle cx="{half + dx * pixels:.1f}" cy="{half - dy * pixels:.1f}" r="5" fill="#e53935">'
+                     f'<title>{html.escape(hos["name"])}</title></circle>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def display_hospitals_map(hospitals, center_lat, center_lon, lightweight=False):
+    if lightweight:
+        st.markdown(static_map_svg(hospitals, center_lat, center_lon), unsafe_allow_html=True)
+        return
+    start_tile_server()
+    # Cached HTML in a static component: reruns re-send the same page instead of rebuilding
+    # the map, and panning does not trigger a rerun.
+    components.html(map_html(hospitals, center_lat, center_lon), width=MAP_WIDTH, height=MAP_HEIGHT)
@@ -0,0 +1,37 @@
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000
+# Straight-line distance understates the road route; 1.3 is a common urban detour factor.
+ROAD_DETOUR_FACTOR = 1.3
+AVERAGE_SPEED_KMH = 25
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    # Works on scalars and on arrays (one origin against many candidates).
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi, dlambda = phi2 - phi1, np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def eta_minutes(distance_m):
+    return distance_m * ROAD_DETOUR_FACTOR / (AVERAGE_SPEED_KMH * 1000 / 60)
+
+
+def rank_facilities(facilities, lat, lon, radius_m=None, emergency_only=False, open_24_7=False, limit=None):
+    if not facilities:
+        return []
+    coords = np.array([(facility["lat"], facility["lon"]) for facility in facilities], dtype=float)
+    distances = haversine_m(lat, lon, coords[:, 0], coords[:, 1])
+    mask = np.ones(len(facilities), dtype=bool)
+    if radius_m is not None:
+        mask &= distances <= radius_m
+    if emergency_only:
+        mask &= np.array([facility.get("emergency") == "yes" for facility in facilities])
+    if open_24_7:
+        mask &= np.array([(facility.get("opening_hours") or "").strip() == "24/7" for facility in facilities])
+    selected = np.flatnonzero(mask)
+    order = selected[np.argsort(distances[selected], kind="stable")][:limit]
+    etas = eta_minutes(distances[order])
+    return [{**facilities[i], "distance_m": float(distances[i]), "eta_minutes": float(eta)}
+            for i, eta in zip(order, etas)]
@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import requests
+
+import hospital_index
+from hospital_ranking import rank_facilities
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OVERPASS_TIMEOUT_SECONDS = 25
+
+# Live Overpass results are cached per geohash tile (precision 5 is roughly 5 x 5 km), so users
+# in the same neighbourhood share one fetch and a radius search is the union of its tiles.
+GEOHASH_PRECISION = 5
+TILE_TTL_SECONDS = 24 * 60 * 60
+TILE_CACHE_SIZE = 4096
+
+# k-nearest searches start small and widen geometrically; 2 km doubling reaches 50 km in five
+# expansions.
+INITIAL_SEARCH_RADIUS_M = 2_000
+SEARCH_RADIUS_GROWTH = 2
+MAX_SEARCH_RADIUS_M = 50_000
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+_tiles_lock = threading.Lock()
+_tiles = OrderedDict()
+# Tile -> Future of the fetch that currently owns it, so overlapping searches share the overlap.
+_inflight = {}
+
+
+# ------------------ Geohash tiles ------------------
+
+def geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, value, bits, even = [], 0, 0, True
+    while len(code) < precision:
+        coord, bounds = (lon, lon_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(_GEOHASH_BASE32[value])
+            value, bits = 0, 0
+    return "".join(code)
+
+
+def tile_bounds(tile):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in tile:
+        value = _GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lon_range if even else lat_range
+            mid = (bounds[0] + bounds[1]) / 2
+            if value >> shift & 1:
+                bounds[0] = mid
+            else:
+                bounds[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def covering_tiles(lat, lon, radius, precision=GEOHASH_PRECISION):
+    south, west, north, east = hospital_index.bounding_box(lat, lon, radius)
+    tile_south, tile_west, tile_north, tile_east = tile_bounds(geohash(south, west, precision))
+    height, width = tile_north - tile_south, tile_east - tile_west
+    rows = int((north - tile_south) // height) + 1
+    cols = int((east - tile_west) // width) + 1
+    return sorted({geohash(tile_south + (i + 0.5) * height, tile_west + (j + 0.5) * width, precision)
+                   for i in range(rows) for j in range(cols)})
+
+
+# ------------------ Overpass tile cache ------------------
+
+def _cached_tiles(tiles):
+    now = time.time()
+    found = {}
+    with _tiles_lock:
+        for tile in tiles:
+            entry = _tiles.get(tile)
+            if entry is not None and entry[0] > now:
+                _tiles.move_to_end(tile)
+                found[tile] = entry[1]
+    return found
+
+
+def _store_tiles(fetched):
+    expires_at = time.time() + TILE_TTL_SECONDS
+    with _tiles_lock:
+        for tile, facilities in fetched.items():
+            _tiles[tile] = (expires_at, facilities)
+            _tiles.move_to_end(tile)
+        while len(_tiles) > TILE_CACHE_SIZE:
+            _tiles.popitem(last=False)
+
+
+def fetch_overpass_tiles(tiles):
+    # nwr + "out center" also returns hospitals mapped as building outlines (ways and
+    # relations), with a centre point for each.
+    boxes = "\n      ".join(
+        'nwr["amenity"~"^(hospital|clinic)$"]({:.6f},{:.6f},{:.6f},{:.6f});'.format(*tile_bounds(tile))
+        for tile in tiles
+    )
+    overpass_query = f"""
+    [out:json][timeout:{OVERPASS_TIMEOUT_SECONDS}];
+    (
+      {boxes}
+    );
+    out center;
+    """
+    try:
+        response = requests.post(OVERPASS_URL, data={"data": overpass_query}, timeout=OVERPASS_TIMEOUT_SECONDS)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    # Every requested tile gets an entry, so empty tiles are cached too.
+    fetched = {tile: [] for tile in tiles}
+    for element in response.json().get("elements", []):
+        facility = hospital_index.facility_from_element(element)
+        if facility:
+            tile = geohash(facility["lat"], facility["lon"], len(tiles[0]))
+            if tile in fetched:
+                fetched[tile].append(facility)
+    return fetched
+
+
+def _claim_tiles(tiles):
+    # Tiles nobody is fetching become ours; the rest are waited on.
+    claimed, waiting = {}, {}
+    with _tiles_lock:
+        for tile in tiles:
+            future = _inflight.get(tile)
+            if future is None:
+                claimed[tile] = _inflight[tile] = Future()
+            else:
+                waiting[tile] = future
+    return claimed, waiting
+
+
+def tile_facilities(tiles):
+    found = _cached_tiles(tiles)
+    claimed, waiting = _claim_tiles([tile for tile in tiles if tile not in found])
+    if claimed:
+        results = {}
+        try:
+            # Another caller may have stored these between the cache check and the claim.
+            results = _cached_tiles(claimed)
+            missing = [tile for tile in claimed if tile not in results]
+            fetched = fetch_overpass_tiles(missing) if missing else None
+            if fetched is not None:
+                _store_tiles(fetched)
+                results.update(fetched)
+        finally:
+            with _tiles_lock:
+                for tile in claimed:
+                    _inflight.pop(tile, None)
+            # A failed fetch resolves to None: waiters go without those tiles and nothing is cached.
+            for tile, future in claimed.items():
+                future.set_result(results.get(tile))
+        found.update(results)
+    for tile, future in waiting.items():
+        facilities = future.result()
+        if facilities is not None:
+            found[tile] = facilities
+    return [facility for tile in tiles for facility in found.get(tile, [])]
+
+
+def cached_facilities(lat, lon, radius):
+    # Cache-only view of the covering tiles; never triggers a fetch.
+    found = _cached_tiles(covering_tiles(lat, lon, radius))
+    return [facility for facilities in found.values() for facility in facilities]
+
+
+def refresh_index(lat, lon, radius=5000):
+    # Optional: copy live OSM data for an area into the offline index.
+    return hospital_index.upsert_facilities(tile_facilities(covering_tiles(lat, lon, radius)))
+
+
+def get_nearby_hospitals(lat, lon, radius=5000, emergency_only=False, open_24_7=False):
+    hospitals = hospital_index.facilities_within(lat, lon, radius, kinds=("hospital",))
+    if not hospitals:
+        # Nothing indexed around here: either the extract does not cover this area or it has
+        # not been imported yet.
+        hospitals = [facility for facility in tile_facilities(covering_tiles(lat, lon, radius))
+                     if facility["kind"] == "hospital"]
+    return rank_facilities(hospitals, lat, lon, radius_m=radius, emergency_only=emergency_only, open_24_7=open_24_7)
+
+
+def nearest_hospitals(lat, lon, k=10, max_radius=MAX_SEARCH_RADIUS_M, emergency_only=False, open_24_7=False):
+    # Everything inside the current radius is known, so once k hospitals are inside it they are
+    # the k nearest. Each expansion only fetches tiles that are not cached yet.
+    radius, expansions = min(INITIAL_SEARCH_RADIUS_M, max_radius), 0
+    while True:
+        hospitals = get_nearby_hospitals(lat, lon, radius, emergency_only=emergency_only, open_24_7=open_24_7)
+        if len(hospitals) >= k or radius >= max_radius:
+            return hospitals[:k], expansions
+        radius = min(radius * SEARCH_RADIUS_GROWTH, max_radius)
+        expansions += 1
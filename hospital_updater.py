@@ -0,0 +1,176 @@
+import gzip
+import io
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+
+import hospital_index
+from hospital_search import OVERPASS_TIMEOUT_SECONDS, OVERPASS_URL
+
+# Keeps the offline hospital index current by applying OSM change files (osmChange .osc) from a
+# replication feed instead of re-importing the extract. Geofabrik publishes daily diffs per
+# region; the checkpoint is the feed's sequence number, stored in hospital_index.db.
+REPLICATION_URL = "https://download.geofabrik.de/asia/india-updates"
+REPLICATION_TIMEOUT_SECONDS = 60
+MAX_DIFFS_PER_RUN = 30
+UPDATE_INTERVAL_SECONDS = 6 * 60 * 60
+
+logger = logging.getLogger(__name__)
+
+_job_lock = threading.Lock()
+_job_started = False
+
+
+def _sequence_path(sequence):
+    digits = f"{sequence:09d}"
+    return f"{digits[:3]}/{digits[3:6]}/{digits[6:]}"
+
+
+def remote_sequence(base_url=REPLICATION_URL):
+    response = requests.get(f"{base_url}/state.txt", timeout=REPLICATION_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    for line in response.text.splitlines():
+        if line.startswith("sequenceNumber="):
+            return int(line.split("=", 1)[1])
+    raise ValueError(f"No sequenceNumber in {base_url}/state.txt")
+
+
+def download_diff(sequence, base_url=REPLICATION_URL):
+    response = requests.get(f"{base_url}/{_sequence_path(sequence)}.osc.gz", timeout=REPLICATION_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return gzip.decompress(response.content)
+
+
+def _resolve_centers(elements):
+    # Ways and relations whose nodes are not in the diff: ask Overpass for their centre.
+    ids = {"way": [], "relation": []}
+    for element in elements:
+        ids[element["type"]].append(str(element["id"]))
+    clauses = "".join(f"{osm_type}(id:{','.join(values)});" for osm_type, values in ids.items() if values)
+    response = requests.post(OVERPASS_URL, data={"data": f"[out:json];({clauses});out center tags;"},
+                             timeout=OVERPASS_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return [facility for facility in map(hospital_index.facility_from_element, response.json().get("elements", []))
+            if facility]
+
+
+def parse_osc(stream, indexed_keys):
+    # Later actions on the same object win, so the result is the object's final state.
+    changes, coords, unplaced = {}, {}, []
+    action = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag in ("create", "modify", "delete"):
+                action = elem.tag
+            continue
+        if elem.tag not in ("node", "way", "relation"):
+            continue
+        key = elem.tag, int(elem.get("id"))
+        if elem.tag == "node" and elem.get("lat") is not None:
+            coords[key[1]] = float(elem.get("lat")), float(elem.get("lon"))
+        if action == "delete":
+            if key in indexed_keys or key in changes:
+                changes[key] = None
+        else:
+            tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+            element = {"type": key[0], "id": key[1], "tags": tags}
+            if elem.tag == "node":
+                element["lat"], element["lon"] = coords[key[1]]
+            elif elem.tag == "way":
+                element["nodes"] = [int(nd.get("ref")) for nd in elem.iter("nd")]
+            if hospital_index.facility_kind(tags):
+                changes[key] = element
+            elif key in indexed_keys or key in changes:
+                # Lost its hospital/clinic tags.
+                changes[key] = None
+        elem.clear()
+    for key, element in changes.items():
+        if element is None:
+            continue
+        facility = hospital_index.facility_from_element(element, coords)
+        if facility is None:
+            existing = hospital_index.get_facility(*key)
+            if existing is not None:
+                # Tag-only edit of an indexed building: keep its known centre.
+                facility = hospital_index.facility_from_element(
+                    {**element, "center": {"lat": existing["lat"], "lon": existing["lon"]}})
+            else:
+                unplaced.append(element)
+        changes[key] = facility
+    for key in [(element["type"], element["id"]) for element in unplaced]:
+        del changes[key]
+    return changes, unplaced
+
+
+def apply_osc(data, source=None, sequence=None, indexed_keys=None):
+    indexed_keys = hospital_index.indexed_keys() if indexed_keys is None else indexed_keys
+    changes, unplaced = parse_osc(io.BytesIO(data), indexed_keys)
+    if unplaced:
+        for facility in _resolve_centers(unplaced):
+            changes[facility["osm_type"], facility["osm_id"]] = facility
+    hospital_index.apply_changes(changes, source=source, sequence=sequence)
+    return changes
+
+
+def init_checkpoint(sequence=None, base_url=REPLICATION_URL):
+    # Call right after importing the extract, with the extract's replication sequence (or the
+    # feed's current one if the extract was downloaded just now).
+    sequence = remote_sequence(base_url) if sequence is None else sequence
+    hospital_index.apply_changes({}, source=base_url, sequence=sequence)
+    return sequence
+
+
+def update(base_url=REPLICATION_URL, max_diffs=MAX_DIFFS_PER_RUN):
+    local = hospital_index.replication_sequence(base_url)
+    if local is None:
+        return 0
+    target = min(remote_sequence(base_url), local + max_diffs)
+    indexed_keys = hospital_index.indexed_keys()
+    applied = 0
+    for sequence in range(local + 1, target + 1):
+        changes = apply_osc(download_diff(sequence, base_url), source=base_url, sequence=sequence,
+                            indexed_keys=indexed_keys)
+        for key, facility in changes.items():
+            if facility is None:
+                indexed_keys.discard(key)
+            else:
+                indexed_keys.add(key)
+        applied += 1
+    return applied
+
+
+def _update_loop():
+    while True:
+        try:
+            update()
+        except Exception:
+            # Each diff commits with its checkpoint, so the next run resumes after the last one applied.
+            logger.exception("Hospital index update failed; retrying in %s s", UPDATE_INTERVAL_SECONDS)
+        time.sleep(UPDATE_INTERVAL_SECONDS)
+
+
+def start_update_job():
+    global _job_started
+    with _job_lock:
+        if _job_started:
+            return
+        _job_started = True
+    threading.Thread(target=_update_loop, name="hospital-updater", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "init":
+        print(f"Checkpoint set to sequence {init_checkpoint(int(sys.argv[2]) if len(sys.argv) > 2 else None)}.")
+    elif sys.argv[1:] == ["update"]:
+        print(f"Applied {update()} diffs.")
+    elif len(sys.argv) == 3 and sys.argv[1] == "apply":
+        with open(sys.argv[2], "rb") as f:
+            data = f.read()
+        print(f"Applied {len(apply_osc(gzip.decompress(data) if sys.argv[2].endswith('.gz') else data))} changes.")
+    else:
+        sys.exit("usage: python hospital_updater.py init [sequence] | update | apply <changes.osc[.gz]>")
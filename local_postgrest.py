@@ -0,0 +1,245 @@
+"""SQLite-backed stand-in for the subset of the Supabase/PostgREST client that hh.py uses.
+
+Selected with SUPABASE_BACKEND = "local" in secrets.toml. Tables and columns are created on
+first insert, and every execute() can sleep for a configurable round-trip latency, so the
+data paths can be load-tested offline.
+"""
+import datetime
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+
+_OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class LocalPostgrestError(Exception):
+    pass
+
+
+class LocalResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _quote(name):
+    if not _IDENTIFIER.match(name):
+        raise LocalPostgrestError(f"Invalid identifier: {name!r}")
+    return f'"{name}"'
+
+
+def _split_top_level(text):
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _parse_logic(text, joiner):
+    # PostgREST logic trees, e.g. 'created_at.lt."x",and(created_at.eq."x",id.lt.5)'.
+    clauses, params = [], []
+    for part in _split_top_level(text):
+        if part.startswith(("and(", "or(")):
+            nested_joiner, inner = part.split("(", 1)
+            sql, nested_params = _parse_logic(inner[:-1], f" {nested_joiner.upper()} ")
+            clauses.append(f"({sql})")
+            params.extend(nested_params)
+            continue
+        column, operator, value = part.split(".", 2)
+        if operator not in _OPERATORS:
+            raise LocalPostgrestError(f"Unsupported operator in or_(): {operator}")
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        clauses.append(f"{_quote(column)} {_OPERATORS[operator]} ?")
+        params.append(_coerce(value))
+    return joiner.join(clauses), params
+
+
+def _coerce(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+class LocalQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._action = "select"
+        self._columns = "*"
+        self._count = None
+        self._rows = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._filters = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._single = False
+
+    def select(self, columns="*", count=None):
+        self._columns, self._count = columns, count
+        return self
+
+    def insert(self, rows):
+        self._action, self._rows = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.insert(rows)
+        self._on_conflict, self._ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def _filter(self, column, operator, value):
+        self._filters.append(f"{_quote(column)} {operator} ?")
+        self._params.append(value)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column, values):
+        values = list(values)
+        self._filters.append(f"{_quote(column)} IN ({', '.join('?' for _ in values)})" if values else "0")
+        self._params.extend(values)
+        return self
+
+    def or_(self, filters):
+        sql, params = _parse_logic(filters, " OR ")
+        self._filters.append(f"({sql})")
+        self._params.extend(params)
+        return self
+
+    def order(self, column, desc=False):
+        self._order.append(f"{_quote(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size):
+        self._limit = int(size)
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def execute(self):
+        self._client._simulate_latency()
+        with self._client._lock:
+            conn = self._client._connection()
+            if self._action == "insert":
+                data = self._client._insert(conn, self._table, self._rows, self._on_conflict, self._ignore_duplicates)
+                return LocalResponse(data)
+            data = self._client._select(conn, self._table, self._columns, self._filters, self._params,
+                                        self._order, self._limit)
+        if self._single:
+            if len(data) != 1:
+                raise LocalPostgrestError(f"single() expected 1 row from {self._table}, got {len(data)}")
+            return LocalResponse(data[0])
+        return LocalResponse(data, count=len(data) if self._count else None)
+
+
+class LocalPostgrestClient:
+    def __init__(self, path="local_supabase.db", latency_ms=0, jitter_ms=0):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # One writer at a time, like a single PostgREST connection; reads are short anyway.
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    def _simulate_latency(self):
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._local.conn = conn
+        return conn
+
+    def _columns(self, conn, table):
+        return [row["name"] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+    def _ensure_columns(self, conn, table, names):
+        existing = self._columns(conn, table)
+        if not existing:
+            conn.execute(f"CREATE TABLE {_quote(table)} (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT)")
+            existing = ["id", "created_at"]
+        for name in names:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(name)}")
+                existing.append(name)
+
+    def _insert(self, conn, table, rows, on_conflict, ignore_duplicates):
+        now = datetime.datetime.utcnow().isoformat()
+        rows = [{"created_at": now, **row} for row in rows]
+        self._ensure_columns(conn, table, {name for row in rows for name in row})
+        if on_conflict:
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(f'uq_{table}_{on_conflict}')} "
+                         f"ON {_quote(table)} ({_quote(on_conflict)})")
+        verb = "INSERT OR IGNORE" if ignore_duplicates else "INSERT OR REPLACE" if on_conflict else "INSERT"
+        inserted = []
+        for row in rows:
+            columns = list(row)
+            cursor = conn.execute(
+                f"{verb} INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [json.dumps(v) if isinstance(v, (dict, list)) else v for v in row.values()]
+            )
+            if cursor.rowcount:
+                inserted.append({**row, "id": cursor.lastrowid})
+        conn.commit()
+        return inserted
+
+    def _select(self, conn, table, columns, filters, params, order, limit):
+        if not self._columns(conn, table):
+            return []
+        projection = "*" if columns.strip() == "*" else ", ".join(_quote(c.strip()) for c in columns.split(","))
+        sql = f"SELECT {projection} FROM {_quote(table)}"
+        if filters:
+            sql += " WHERE " + " AND ".join(filters)
+        if order:
+            sql += " ORDER BY " + ", ".join(order)
+        if limit is not None:
+            sql += f" LIMIT {limit}"
+        return [dict(row) for row in conn.execute(sql, params)]
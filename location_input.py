@@ -0,0 +1,16 @@
+import streamlit as st
+
+from gazetteer import autocomplete, display_name
+
+
+def location_input(label, key):
+    text = st.text_input(label, key=key)
+    if not text.strip():
+        return text
+    suggestions = [display_name(place) for place in autocomplete(text)]
+    if not suggestions or suggestions[0].casefold() == text.strip().casefold():
+        return text
+    # Suggestions may be near-misses for a different place, so the text as typed stays the default.
+    typed = f'Use "{text.strip()}" as typed'
+    choice = st.selectbox("Matching places", [typed] + suggestions, index=0, key=f"{key}_suggestion")
+    return text if choice == typed else choice
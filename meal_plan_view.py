@@ -0,0 +1,37 @@
+import streamlit as st
+
+from health_metrics import ACTIVITY_LEVELS
+from meal_planner import DIETS, EXCLUSIONS, daily_targets, meal_plan
+
+
+def meal_plan_section(profile, bmi_category, key):
+    col1, col2 = st.columns(2)
+    with col1:
+        diet = st.selectbox("Diet", [diet.capitalize() for diet in DIETS], index=1, key=f"{key}_diet")
+    with col2:
+        activity = st.selectbox("Activity level", list(ACTIVITY_LEVELS), index=1, key=f"{key}_activity")
+    exclusions = st.multiselect("Avoid", list(EXCLUSIONS), key=f"{key}_exclusions")
+
+    targets = daily_targets(profile["weight"], profile["height"], profile["age"], profile["gender"], bmi_category,
+                            activity)
+    st.markdown("### Daily Targets")
+    cols = st.columns(4)
+    cols[0].metric("Calories", f"{targets['kcal']} kcal")
+    cols[1].metric("Protein", f"{targets['protein_g']} g")
+    cols[2].metric("Carbs", f"{targets['carbs_g']} g")
+    cols[3].metric("Fat", f"{targets['fat_g']} g")
+
+    week = meal_plan(targets, diet.casefold(), exclusions)
+    st.markdown("### Your Weekly Meal Plan")
+    if not week or not week[0]["meals"]:
+        st.warning("No foods fit these restrictions. Try avoiding fewer ingredients.")
+        return targets, week
+    for day in week:
+        totals = day["totals"]
+        with st.expander(f"{day['day']} - {totals['kcal']} kcal, {totals['protein_g']} g protein",
+                         expanded=day is week[0]):
+            for meal in day["meals"]:
+                st.markdown(f"**{meal['meal']}** ({meal['kcal']} kcal)")
+                for item in meal["items"]:
+                    st.markdown(f"- {item['name']} - {item['servings']:g} x {item['serving']}")
+    return targets, week
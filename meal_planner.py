@@ -0,0 +1,145 @@
+import csv
+import functools
+import itertools
+import os
+import threading
+
+import numpy as np
+
+from health_metrics import BMI_THRESHOLDS, DEFAULT_ACTIVITY, bmr, tdee
+
+FOODS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "foods.csv")
+NUTRIENTS = ("kcal", "protein_g", "carbs_g", "fat_g")
+# Each diet also allows everything in the diets before it.
+DIETS = ("vegan", "vegetarian", "eggetarian", "non-vegetarian")
+EXCLUSIONS = ("gluten", "dairy", "nuts", "soy", "fish")
+# Daily calorie change from maintenance, and protein per kg of reference body weight.
+BMI_GOALS = {
+    "Underweight": {"kcal": 300, "protein_per_kg": 1.5},
+    "Normal": {"kcal": 0, "protein_per_kg": 1.2},
+    "Overweight": {"kcal": -500, "protein_per_kg": 1.6},
+    "Obese": {"kcal": -500, "protein_per_kg": 1.6},
+}
+MIN_DAILY_KCAL = 1200
+FAT_SHARE = 0.28
+# Each slot draws one food per role group; the share is the slot's part of the daily targets.
+MEALS = (
+    ("Breakfast", 0.25, (("breakfast",), ("side",))),
+    ("Lunch", 0.35, (("staple",), ("protein",), ("vegetable",))),
+    ("Snack", 0.10, (("snack", "side"),)),
+    ("Dinner", 0.30, (("staple",), ("protein",), ("vegetable",))),
+)
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MIN_SERVINGS = 0.5
+SERVING_STEP = 0.5
+# Portions beyond these stop looking like a meal (three glasses of milk, four bowls of dal).
+MAX_SERVINGS = {"breakfast": 2, "side": 2, "staple": 4, "protein": 2, "vegetable": 2, "snack": 2}
+# Calories matter most, then protein; carbs and fat fill in.
+NUTRIENT_WEIGHTS = np.array([3.0, 2.0, 1.0, 1.0])
+# Added to a combination's error for every earlier use of one of its foods this week.
+VARIETY_PENALTY = 0.1
+
+_load_lock = threading.Lock()
+_foods = None
+_matrix = None
+_max_servings = None
+
+
+def _load():
+    global _foods, _matrix, _max_servings
+    with _load_lock:
+        if _foods is not None:
+            return
+        with open(FOODS_PATH, encoding="utf-8", newline="") as f:
+            foods = [
+                {**row, **{column: float(row[column]) for column in (*NUTRIENTS, "fiber_g")},
+                 "contains": [item for item in row["contains"].split(";") if item]}
+                for row in csv.DictReader(f)
+            ]
+        _matrix = np.array([[food[column] for column in NUTRIENTS] for food in foods])
+        _max_servings = np.array([MAX_SERVINGS[food["role"]] for food in foods], dtype=float)
+        _foods = foods
+
+
+def daily_targets(weight_kg, height_cm, age, gender, bmi_category, activity=DEFAULT_ACTIVITY):
+    goal = BMI_GOALS.get(bmi_category, BMI_GOALS["Normal"])
+    maintenance = float(tdee(bmr(weight_kg, height_cm, age, gender), activity))
+    kcal = max(MIN_DAILY_KCAL, maintenance + goal["kcal"])
+    # Protein is sized for the weight at the top of the Normal range when above it.
+    reference_kg = min(weight_kg, BMI_THRESHOLDS[1] * (height_cm / 100) ** 2)
+    protein = goal["protein_per_kg"] * reference_kg
+    fat = kcal * FAT_SHARE / 9
+    carbs = max(0.0, (kcal - protein * 4 - fat * 9) / 4)
+    return {"kcal": round(kcal), "protein_g": round(protein), "carbs_g": round(carbs), "fat_g": round(fat),
+            "tdee": round(maintenance)}
+
+
+def _allowed(diet, exclusions):
+    allowed_diets = DIETS[:DIETS.index(diet) + 1]
+    return [i for i, food in enumerate(_foods)
+            if food["diet"] in allowed_diets and not set(food["contains"]) & set(exclusions)]
+
+
+def _fit(combos, target):
+    # Best servings for every candidate combination at once: weighted least squares on
+    # target-relative nutrients, batched through np.linalg.solve, then snapped to the serving grid.
+    scale = NUTRIENT_WEIGHTS / target
+    a = _matrix[combos].transpose(0, 2, 1) * scale[None, :, None]
+    b = np.broadcast_to(target * scale, a.shape[:2])
+    at = a.transpose(0, 2, 1)
+    gram = at @ a + 1e-6 * np.eye(combos.shape[1])
+    servings = np.linalg.solve(gram, (at @ b[..., None]))[..., 0]
+    servings = np.clip(np.round(servings / SERVING_STEP) * SERVING_STEP, MIN_SERVINGS, _max_servings[combos])
+    residual = (a @ servings[..., None])[..., 0] - b
+    return servings, np.einsum("ij,ij->i", residual, residual)
+
+
+@functools.lru_cache(maxsize=256)
+def _plan(targets, diet, exclusions, days):
+    _load()
+    allowed = _allowed(diet, exclusions)
+    daily = np.array([value for _, value in targets], dtype=float)
+    slots = []
+    for meal, share, groups in MEALS:
+        choices = [[i for i in allowed if _foods[i]["role"] in roles] for roles in groups]
+        if not all(choices):
+            continue
+        combos = np.array(list(itertools.product(*choices)))
+        servings, error = _fit(combos, daily * share)
+        slots.append((meal, combos, servings, error))
+    used = np.zeros(len(_foods))
+    week = []
+    for day in WEEKDAYS[:days]:
+        meals, totals = [], np.zeros(len(NUTRIENTS) + 1)
+        for meal, combos, servings, error in slots:
+            best = int(np.argmin(error + VARIETY_PENALTY * used[combos].sum(axis=1)))
+            used[combos[best]] += 1
+            items = []
+            for index, amount in zip(combos[best], servings[best]):
+                food = _foods[index]
+                item = {"name": food["name"], "serving": food["serving"], "servings": float(amount)}
+                item.update({column: round(food[column] * amount, 1) for column in (*NUTRIENTS, "fiber_g")})
+                items.append(item)
+            meal_totals = np.array([sum(item[column] for item in items) for column in (*NUTRIENTS, "fiber_g")])
+            totals += meal_totals
+            meals.append({"meal": meal, "items": items, "kcal": round(meal_totals[0])})
+        week.append({"day": day, "meals": meals,
+                     "totals": {column: round(float(value)) for column, value in zip((*NUTRIENTS, "fiber_g"), totals)}})
+    return week
+
+
+def meal_plan(targets, diet="vegetarian", exclusions=(), days=len(WEEKDAYS)):
+    # Cached per target and constraint set; the returned structure is shared, so callers must
+    # not mutate it.
+    key = tuple((nutrient, targets[nutrient]) for nutrient in NUTRIENTS)
+    return _plan(key, diet, tuple(sorted(exclusions)), days)
+
+
+def plan_summary(week):
+    lines = []
+    for day in week:
+        lines.append(f"{day['day']} ({day['totals']['kcal']} kcal, {day['totals']['protein_g']} g protein):")
+        for meal in day["meals"]:
+            foods = ", ".join(f"{item['name']} x{item['servings']:g}" for item in meal["items"])
+            lines.append(f"  {meal['meal']}: {foods}")
+    return "\n".join(lines)
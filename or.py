@@ -3,8 +3,21 @@ import datetime
 import pandas as pd
 import requests
 import time
-import sqlite3
 from textblob import TextBlob
+from emergency_lookup import emergency_lookup
+from health_export import EXPORT_FORMATS, export_bytes
+from health_metrics import bmi_and_category
+from hospital_updater import start_update_job
+from location_input import location_input
+from meal_plan_view import meal_plan_section
+from meal_planner import plan_summary
+from parmatma_db import (
+    init_db, save_personal_details_to_db, save_personal_details_batch, save_symptom_entry, save_mental_health_entry,
+    load_user_history, load_sentiment_trend, start_duplicate_review_job, start_archival_job,
+    iter_user_history_chunks, make_user_key, EXPORT_COLUMNS,
+)
+from profile_import_view import profile_import_section
+from workout_program_view import workout_program_section
 
 st.set_page_config(
     page_title="Parmatma - Health & Wellness Tracker",
@@ -12,138 +25,10 @@ st.set_page_config(
     layout="centered"
 )
 
-# ------------------ Database Setup ------------------
-
-DB_PATH = "parmatma.db"
-
-
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def init_db():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS users
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       name
-                       TEXT,
-                       age
-                       INTEGER,
-                       gender
-                       TEXT,
-                       height
-                       REAL,
-                       weight
-                       REAL,
-                       timestamp
-                       DATETIME
-                       DEFAULT
-                       CURRENT_TIMESTAMP
-                   )
-                   """)
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS symptom_entries
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       user_id
-                       INTEGER,
-                       symptoms
-                       TEXT,
-                       response
-                       TEXT,
-                       timestamp
-                       DATETIME
-                       DEFAULT
-                       CURRENT_TIMESTAMP
-                   )
-                   """)
-    cursor.execute("""
-                   CREATE TABLE IF NOT EXISTS mental_health_entries
-                   (
-                       id
-                       INTEGER
-                       PRIMARY
-                       KEY
-                       AUTOINCREMENT,
-                       user_id
-                       INTEGER,
-                       mood_note
-                       TEXT,
-                       sentiment
-                       REAL,
-                       response
-                       TEXT,
-                       timestamp
-                       DATETIME
-                       DEFAULT
-                       CURRENT_TIMESTAMP
-                   )
-                   """)
-    conn.commit()
-    conn.close()
-
-
 init_db()
-
-
-def save_personal_details_to_db(details):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO users (name, age, gender, height, weight) VALUES (?, ?, ?, ?, ?)",
-        (details['name'], details['age'], details['gender'], details['height'], details['weight'])
-    )
-    conn.commit()
-    user_id = cursor.lastrowid
-    conn.close()
-    return user_id
-
-
-def save_symptom_entry(user_id, symptoms, response):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO symptom_entries (user_id, symptoms, response) VALUES (?, ?, ?)",
-        (user_id, symptoms, response)
-    )
-    conn.commit()
-    conn.close()
-
-
-def save_mental_health_entry(user_id, mood_note, sentiment, response):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO mental_health_entries (user_id, mood_note, sentiment, response) VALUES (?, ?, ?, ?)",
-        (user_id, mood_note, sentiment, response)
-    )
-    conn.commit()
-    conn.close()
-
-
-def load_user_history(user_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM symptom_entries WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
-    symptoms = cursor.fetchall()
-    cursor.execute("SELECT * FROM mental_health_entries WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
-    mental = cursor.fetchall()
-    conn.close()
-    return symptoms, mental
-
+start_duplicate_review_job()
+start_archival_job()
+start_update_job()
 
 # ------------------ Helper Functions ------------------
 
@@ -171,19 +56,18 @@ def google_api_call(model, endpoint, payload):
     raise Exception("Max retries exceeded for API call.")
 
 
+BMI_ADVICE = {
+    "Underweight": "Focus on nutrient-dense foods and consult a professional for healthy weight gain.",
+    "Normal": "Maintain balanced diet and regular exercise.",
+    "Overweight": "Consider a balanced diet and increase activity.",
+    "Obese": "Consult a professional for personalized weight management.",
+    "Invalid": "Height and weight must be positive numbers.",
+}
+
+
 def calculate_bmi_and_category(weight_kg, height_cm):
-    if height_cm <= 0 or weight_kg <= 0:
-        return 0, "Invalid", "Height and weight must be positive numbers."
-    bmi = weight_kg / ((height_cm / 100) ** 2)
-    if bmi < 18.5:
-        category, advice = "Underweight", "Focus on nutrient-dense foods and consult a professional for healthy weight gain."
-    elif 18.5 <= bmi < 25:
-        category, advice = "Normal", "Maintain balanced diet and regular exercise."
-    elif 25 <= bmi < 30:
-        category, advice = "Overweight", "Consider a balanced diet and increase activity."
-    else:
-        category, advice = "Obese", "Consult a professional for personalized weight management."
-    return bmi, category, advice
+    bmi, category = bmi_and_category(weight_kg, height_cm)
+    return bmi, category, BMI_ADVICE[category]
 
 
 # Mock free symptom checker (replace with real API integration)
@@ -210,6 +94,7 @@ def home_page():
                 gender = st.selectbox("Gender", ["Male", "Female", "Other"])
             height = st.number_input("Height (cm)", min_value=100.0, max_value=250.0, format="%.2f")
             weight = st.number_input("Weight (kg)", min_value=20.0, max_value=200.0, format="%.2f")
+            contact = st.text_input("Email or phone (optional)", help="Lets you find your profile again later.")
             submitted = st.form_submit_button("Submit Details")
             if submitted:
                 if not name:
@@ -219,14 +104,24 @@ def home_page():
                 else:
                     details = {
                         'name': name, 'age': age, 'gender': gender,
-                        'height': height, 'weight': weight
+                        'height': height, 'weight': weight, 'contact': contact
                     }
-                    user_id = save_personal_details_to_db(details)
+                    # Without a contact, only an edit of this session's own profile updates a row; a
+                    # different name or contact is someone else using the same browser.
+                    previous = st.session_state.get('personal')
+                    same_person = (previous is not None
+                                   and previous['name'].strip().casefold() == name.strip().casefold()
+                                   and make_user_key(previous.get('contact')) == make_user_key(contact))
+                    user_id = save_personal_details_to_db(details,
+                                                          st.session_state.get('user_id') if same_person else None)
                     st.session_state['user_id'] = user_id
                     st.session_state['personal'] = details
                     bmi, category, advice = calculate_bmi_and_category(weight, height)
                     st.session_state['bmi_category'] = category
                     st.success(f"Hello {name}! Details saved and stored. You can now use all features.")
+        with st.expander("Bulk Import Profiles"):
+            profile_import_section(save_personal_details_batch, key="home_import",
+                                   limits={"age": (5, 120), "height": (100.0, 250.0), "weight": (20.0, 200.0)})
 
 
 def bmi_calculator_page():
@@ -256,6 +151,7 @@ def nutrition_coach_page():
 
     bmi_category = st.session_state.get('bmi_category', "Unknown")
     st.markdown(f"**Detected BMI Category:** {bmi_category}")
+    targets, week = meal_plan_section(personal, bmi_category, key="nutrition")
 
     if bmi_category == "Underweight":
         base_goal = "weekly meal plan for healthy weight gain"
@@ -265,17 +161,16 @@ def nutrition_coach_page():
         base_goal = st.text_input("Enter your nutrition/diet goal:",
                                   placeholder="e.g., 'Balanced weekly diet plan'")
 
-    if st.button("Get Nutrition Plan"):
-        if bmi_category in ["Underweight", "Overweight", "Obese"]:
-            user_goal = base_goal
-        else:
-            if not base_goal:
-                st.error("Please enter your nutrition or diet goal.")
-                return
-            user_goal = base_goal
-
-        with st.spinner("Preparing weekly nutrition plan..."):
-            user_prompt = f"Create a detailed weekly nutrition plan for: {user_goal}. Use markdown and provide actionable advice."
+    if st.button("Get Nutritionist Notes"):
+        if not week or not week[0]['meals']:
+            st.error("Adjust the restrictions to get a meal plan first.")
+            return
+        user_goal = base_goal or "balanced weekly diet plan"
+        with st.spinner("Writing nutritionist notes..."):
+            user_prompt = (f"Goal: {user_goal}. Daily targets: {targets['kcal']} kcal, {targets['protein_g']} g "
+                           f"protein. Here is the user's weekly meal plan:\n{plan_summary(week)}\n"
+                           "Add practical notes on preparation, swaps and why it suits the goal. "
+                           "Do not change the foods or portions.")
             payload = {
                 "contents": [{"parts": [{"text": user_prompt}]}],
                 "systemInstruction": {"parts": [
@@ -289,10 +184,10 @@ def nutrition_coach_page():
             )
             if response and response.get('candidates'):
                 generated_text = response['candidates'][0]['content']['parts'][0]['text']
-                st.subheader("Your Weekly Nutrition Plan")
+                st.subheader("Nutritionist Notes")
                 st.write(generated_text)
             else:
-                st.error("Failed to generate nutrition plan.")
+                st.error("Failed to generate nutritionist notes.")
 
 
 def exercise_routines_page():
@@ -302,48 +197,9 @@ def exercise_routines_page():
         st.info("Enter personal details in Home first.")
         return
 
-    gender = personal.get('gender', "Other")
-    body_parts = st.multiselect("Select body parts to train:",
-                                ["Arms", "Legs", "Core", "Back", "Chest", "Full Body"])
-    fitness_goal = st.text_input("Your fitness goal:",
-                                 placeholder="e.g., 'Strength training routine for beginners.'")
-
-    if st.button("Get Exercise Routine"):
-        if not fitness_goal:
-            st.error("Enter your fitness goal.")
-            return
-        if not body_parts:
-            st.error("Select at least one body part to train.")
-            return
-        with st.spinner("Generating exercise plan..."):
-            body_parts_text = ", ".join(body_parts)
-            user_prompt = (f"Create a list of 5 engaging exercises to train {body_parts_text} for a {gender} user. "
-                           f"Include a timer suggestion to complete each exercise.")
-            payload = {
-                "contents": [{"parts": [{"text": user_prompt}]}],
-                "systemInstruction": {"parts": [
-                    {"text": "Reply as a professional trainer. Use markdown."}
-                ]}
-            }
-            response = google_api_call(
-                model="gemini-2.5-flash-preview-05-20",
-                endpoint="generateContent",
-                payload=payload
-            )
-            if response and response.get('candidates'):
-                exercises_text = response['candidates'][0]['content']['parts'][0]['text']
-                st.markdown("### Your Exercise Routine")
-                st.markdown(exercises_text)
-
-                st.markdown("### Fitness Timer")
-                for i in range(5):
-                    if st.button(f"Start Exercise {i + 1} Timer (30 sec)"):
-                        for sec in range(30, 0, -1):
-                            st.write(f"Time left: {sec} seconds")
-                            time.sleep(1)
-                        st.write("Done! Take a short break.")
-            else:
-                st.error("Failed to generate routine.")
+    bmi_category = st.session_state.get('bmi_category') or calculate_bmi_and_category(
+        personal['weight'], personal['height'])[1]
+    workout_program_section(personal, bmi_category, google_api_call, key="exercise")
 
 
 def symptom_checker_page():
@@ -408,7 +264,19 @@ def mental_health_page():
                     st.experimental_rerun()
     st.markdown("---")
     st.subheader("Past Entries and Sentiment Trend")
-    if st.session_state.journal_entries:
+    user_id = st.session_state.get('user_id')
+    if user_id:
+        granularity = st.radio("Trend granularity", ["Daily", "Weekly"], horizontal=True)
+        trend = load_sentiment_trend(user_id, period="day" if granularity == "Daily" else "week")
+        if trend:
+            df = pd.DataFrame(trend).set_index('bucket')
+            st.line_chart(df[['mean', 'ewma']])
+            latest = trend[-1]
+            st.caption(f"Latest {granularity.lower()} bucket: {latest['count']} entries, "
+                       f"range {latest['min']:.2f} to {latest['max']:.2f}")
+        else:
+            st.info("No entries yet.")
+    elif st.session_state.journal_entries:
         df = pd.DataFrame(st.session_state.journal_entries)
         st.line_chart(df['sentiment'])
         for entry in reversed(st.session_state.journal_entries):
@@ -421,7 +289,7 @@ def mental_health_page():
 def doctor_appointments_page():
     st.header("Doctor Appointments & Telemedicine 🏥")
     st.write("Use symptom checker, get advice, and book appointments.")
-    location = st.text_input("Your city or locality for nearby doctors:")
+    location = location_input("Your city or locality for nearby doctors:", key="doctor_location")
     specialty = st.selectbox("Specialty", ["General", "Cardiologist", "Dermatologist", "Dentist", "Other"])
     if st.button("Find Nearby Doctor"):
         if not location:
@@ -449,30 +317,24 @@ def doctor_appointments_page():
 
 def emergency_support_page():
     st.header("Emergency Medical Support 🚨")
+    st.info("In an emergency call **112** (police, fire, ambulance) or **108** (ambulance) right away.")
     st.write("Find nearby hospitals quickly in an emergency.")
-    city = st.text_input("Enter city or area for emergency hospital search:")
+    city = location_input("Enter city or area for emergency hospital search:", key="emergency_city")
     if st.button("Find Emergency Hospitals"):
         if not city:
             st.error("Enter a city/area.")
             return
         with st.spinner("Finding emergency hospitals..."):
-            user_prompt = f"List major emergency hospitals and support options in {city}."
-            payload = {
-                "contents": [{"parts": [{"text": user_prompt}]}],
-                "tools": [{"google_search": {}}],
-                "systemInstruction": {"parts": [
-                    {"text": "Reply with local hospital/emergency centers (address/contact). Use markdown."}
-                ]}
-            }
-            response = google_api_call(
-                model="gemini-2.5-flash-preview-05-20",
-                endpoint="generateContent",
-                payload=payload
-            )
-            if response and response.get('candidates'):
-                st.write(response['candidates'][0]['content']['parts'][0]['text'])
-            else:
-                st.error("Search failed.")
+            result = emergency_lookup(city, api_key=st.secrets.get("GOOGLE_API_KEY"))
+        for hos in result["hospitals"]:
+            st.write(f"- **{hos['name']}** — {hos['distance_m'] / 1000:.1f} km, "
+                     f"about {hos['eta_minutes']:.0f} min by road")
+        if result["advice"]:
+            st.write(result["advice"])
+        if not result["hospitals"] and not result["advice"]:
+            st.error("Search failed.")
+        if result["pending"]:
+            st.caption(f"Still waiting on: {', '.join(result['pending'])}. Search again in a moment for fuller results.")
 
 
 # -------------------------- Sidebar History -------------------------
@@ -499,6 +361,14 @@ def show_history_sidebar():
         st.sidebar.markdown(f"Response: {entry['response'][:100]}...")
         st.sidebar.markdown("---")
 
+    st.sidebar.subheader("Export History")
+    export_format = st.sidebar.selectbox("Format", list(EXPORT_FORMATS.keys()))
+    if st.sidebar.button("Prepare Export"):
+        extension, mime = EXPORT_FORMATS[export_format]
+        with st.spinner("Exporting your history..."):
+            export_file = export_bytes(iter_user_history_chunks(user_id), extension, EXPORT_COLUMNS)
+        st.sidebar.download_button("Download Export", export_file, f"parmatma_history.{extension}", mime=mime)
+
 
 # -------------------------- Main Navigation -------------------------
 
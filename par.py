@@ -3,6 +3,10 @@ import datetime
 import pandas as pd
 import requests
 import time
+from health_metrics import bmi_and_category
+from meal_plan_view import meal_plan_section
+from meal_planner import plan_summary
+from workout_program_view import workout_program_section
 
 st.set_page_config(
     page_title="Parmatma - Health & Wellness Tracker",
@@ -27,19 +31,17 @@ def google_api_call(model, endpoint, payload):
         except Exception as e: raise e
     raise Exception("Max retries exceeded for API call.")
 
+BMI_ADVICE = {
+    "Underweight": "Focus on nutrient-dense foods and consult a professional for healthy weight gain.",
+    "Normal": "Maintain balanced diet and regular exercise.",
+    "Overweight": "Consider a balanced diet and increase activity.",
+    "Obese": "Consult a professional for personalized weight management.",
+    "Invalid": "Height and weight must be positive numbers.",
+}
+
 def calculate_bmi_and_category(weight_kg, height_cm):
-    if height_cm <= 0 or weight_kg <= 0:
-        return 0, "Invalid", "Height and weight must be positive numbers."
-    bmi = weight_kg / ((height_cm / 100) ** 2)
-    if bmi < 18.5:
-        category, advice = "Underweight", "Focus on nutrient-dense foods and consult a professional for healthy weight gain."
-    elif 18.5 <= bmi < 25:
-        category, advice = "Normal", "Maintain balanced diet and regular exercise."
-    elif 25 <= bmi < 30:
-        category, advice = "Overweight", "Consider a balanced diet and increase activity."
-    else:
-        category, advice = "Obese", "Consult a professional for personalized weight management."
-    return bmi, category, advice
+    bmi, category = bmi_and_category(weight_kg, height_cm)
+    return bmi, category, BMI_ADVICE[category]
 
 # ----------------------------- Features -----------------------------
 
@@ -87,12 +89,22 @@ def bmi_calculator_page():
 
 def nutrition_coach_page():
     st.header("Nutrition Coach & Diet Plans 🍏")
+    personal = st.session_state.get('personal')
+    if not personal:
+        st.info("Enter personal details in Home first.")
+        return
+    bmi_category = st.session_state.get('bmi_category', "Unknown")
+    targets, week = meal_plan_section(personal, bmi_category, key="nutrition")
     goal = st.text_input("Your nutrition/diet goal:",
         placeholder="e.g., 'Weekly meal plan for fat loss.'")
-    if st.button("Get Nutrition Plan"):
+    if st.button("Get Nutritionist Notes"):
         if not goal: st.error("Please enter your goal."); return
-        with st.spinner("Preparing plan..."):
-            user_prompt = f"Nutrition plan for: {goal}. Detailed, safe, actionable advice with sources."
+        if not week or not week[0]['meals']: st.error("Adjust the restrictions to get a meal plan first."); return
+        with st.spinner("Writing nutritionist notes..."):
+            user_prompt = (f"Goal: {goal}. Daily targets: {targets['kcal']} kcal, {targets['protein_g']} g protein. "
+                           f"Here is the user's weekly meal plan:\n{plan_summary(week)}\n"
+                           "Add safe, actionable notes on preparation, swaps and why it suits the goal, with sources. "
+                           "Do not change the foods or portions.")
             payload = {
                 "contents": [{"parts": [{"text": user_prompt}]}],
                 "tools": [{"google_search": {}}],
@@ -108,7 +120,7 @@ def nutrition_coach_page():
             if response and response.get('candidates'):
                 generated_text = response['candidates'][0]['content']['parts'][0]['text']
                 sources = response['candidates'][0].get('groundingMetadata', {}).get('groundingAttributions', [])
-                st.subheader("Your Nutrition Plan")
+                st.subheader("Nutritionist Notes")
                 st.write(generated_text)
                 if sources:
                     st.subheader("Sources")
@@ -116,31 +128,19 @@ def nutrition_coach_page():
                         if 'web' in s and 'title' in s['web'] and 'uri' in s['web']:
                             st.markdown(f"*{i+1}.* [{s['web']['title']}]({s['web']['uri']})")
             else:
-                st.error("Failed to generate nutrition plan.")
+                st.error("Failed to generate nutritionist notes.")
 
 def exercise_routines_page():
     st.header("Exercise Routines & Fitness Plans 🏃")
-    fitness_goal = st.text_input("Your fitness goal:",
-        placeholder="e.g., 'Strength training routine for beginners.'")
-    if st.button("Get Exercise Routine"):
-        if not fitness_goal: st.error("Enter your fitness goal."); return
-        with st.spinner("Generating exercise plan..."):
-            user_prompt = f"Create an exercise routine for: {fitness_goal}."
-            payload = {
-                "contents": [{"parts": [{"text": user_prompt}]}],
-                "systemInstruction": {"parts": [
-                    {"text": "Reply as a professional trainer. Use markdown format."}
-                ]}
-            }
-            response = google_api_call(
-                model="gemini-2.5-flash-preview-05-20",
-                endpoint="generateContent",
-                payload=payload
-            )
-            if response and response.get('candidates'):
-                st.write(response['candidates'][0]['content']['parts'][0]['text'])
-            else:
-                st.error("Failed to generate routine.")
+    personal = st.session_state.get('personal')
+    if not personal:
+        st.info("Enter personal details in Home first.")
+        return
+
+    bmi_category = st.session_state.get('bmi_category') or calculate_bmi_and_category(
+        personal['weight'], personal['height'])[1]
+    workout_program_section(personal, bmi_category, google_api_call, key="exercise")
+
 
 def symptom_checker_page():
     st.header("Symptom Checker 🩺")
@@ -0,0 +1,1001 @@
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+# ------------------ Database Setup ------------------
+
+DB_PATH = "parmatma.db"
+# Stored in PRAGMA user_version once a file's tables and migrations are in place; bump it with
+# every schema change so init_db() on each page rerun is a single pragma read otherwise.
+SCHEMA_VERSION = 1
+
+# Optional sharding: with PARMATMA_SHARDS > 1 users are hashed across that many database files,
+# each with its own write lock, and DB_PATH only holds the user_id -> shard directory.
+SHARD_COUNT = int(os.environ.get("PARMATMA_SHARDS", "1"))
+
+# Smoothing factor for the per-user sentiment EWMA kept in sentiment_rollups.
+SENTIMENT_EWMA_ALPHA = 0.3
+ROLLUP_PERIODS = ("day", "week")
+USER_MERGE_BATCH_SIZE = 200
+
+# Hot/cold tiering: entries older than ARCHIVE_AFTER_DAYS move to archived_entries as zlib blobs.
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_INTERVAL_SECONDS = 6 * 60 * 60
+INCREMENTAL_VACUUM_PAGES = 2000
+ARCHIVED_TABLES = ("symptom_entries", "mental_health_entries")
+
+EXPORT_COLUMNS = [
+    ("record_type", "str"), ("id", "int"), ("user_id", "int"), ("timestamp", "str"),
+    ("symptoms", "str"), ("mood_note", "str"), ("sentiment", "float"), ("response", "str"),
+]
+
+logger = logging.getLogger(__name__)
+
+_background_jobs_lock = threading.Lock()
+_background_jobs = set()
+_user_shards = {}
+
+
+class PartialSaveError(Exception):
+    # A batch save failed after some rows were committed; `saved_positions` are their indexes in
+    # the input, in order.
+    def __init__(self, error, saved_positions):
+        super().__init__(str(error))
+        self.saved_positions = saved_positions
+
+
+def get_connection(path=None):
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# ------------------ Sharding ------------------
+
+def shard_path(shard):
+    # Shard -1 is the unsharded DB_PATH file, used while adopting legacy data into shards.
+    return DB_PATH if shard < 0 else f"{os.path.splitext(DB_PATH)[0]}_shard{shard}.db"
+
+
+def database_paths(shard_count=None):
+    shard_count = SHARD_COUNT if shard_count is None else shard_count
+    return [DB_PATH] if shard_count <= 1 else [shard_path(shard) for shard in range(shard_count)]
+
+
+def shard_for_key(user_key, shard_count=None):
+    return zlib.crc32(user_key.encode("utf-8")) % (shard_count or SHARD_COUNT)
+
+
+def _user_path(user_id):
+    if SHARD_COUNT <= 1:
+        return DB_PATH
+    shard = _user_shards.get(user_id)
+    if shard is None:
+        conn = get_connection()
+        row = conn.execute("SELECT shard FROM user_shards WHERE user_id = ?", (user_id,)).fetchone()
+        conn.close()
+        # Ids missing from the directory (e.g. a stale session) still route deterministically.
+        shard = row['shard'] if row is not None else user_id % SHARD_COUNT
+        _user_shards[user_id] = shard
+    return shard_path(shard)
+
+
+def _init_directory():
+    conn = get_connection()
+    conn.execute("""
+                 CREATE TABLE IF NOT EXISTS user_shards
+                 (
+                     user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     user_key TEXT NOT NULL UNIQUE,
+                     shard INTEGER NOT NULL
+                 )
+                 """)
+    conn.commit()
+    conn.close()
+
+
+def _register_user(user_key):
+    conn = get_connection()
+    row = conn.execute("SELECT user_id, shard FROM user_shards WHERE user_key = ?", (user_key,)).fetchone()
+    if row is None:
+        conn.execute(
+            "INSERT OR IGNORE INTO user_shards (user_key, shard) VALUES (?, ?)", (user_key, shard_for_key(user_key))
+        )
+        conn.commit()
+        row = conn.execute("SELECT user_id, shard FROM user_shards WHERE user_key = ?", (user_key,)).fetchone()
+    conn.close()
+    _user_shards[row['user_id']] = row['shard']
+    return row['user_id']
+
+
+def _register_users(user_keys):
+    # Batch form of _register_user: one transaction for the new keys, then one lookup per 500 keys.
+    conn = get_connection()
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_shards (user_key, shard) VALUES (?, ?)",
+        [(user_key, shard_for_key(user_key)) for user_key in user_keys]
+    )
+    conn.commit()
+    user_ids = {}
+    keys = list(dict.fromkeys(user_keys))
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        rows = conn.execute(
+            f"SELECT user_key, user_id, shard FROM user_shards WHERE user_key IN ({', '.join('?' * len(batch))})",
+            batch
+        ).fetchall()
+        for row in rows:
+            _user_shards[row['user_id']] = row['shard']
+            user_ids[row['user_key']] = row['user_id']
+    conn.close()
+    return user_ids
+
+
+def _unregister_users(user_keys):
+    # Drops directory rows registered for users whose shard write was rolled back. Only used for
+    # random anonymous keys: nothing else can refer to them, whereas a contact may be reused.
+    conn = get_connection()
+    for start in range(0, len(user_keys), 500):
+        batch = user_keys[start:start + 500]
+        placeholders = ', '.join('?' * len(batch))
+        for row in conn.execute(f"SELECT user_id FROM user_shards WHERE user_key IN ({placeholders})", batch):
+            _user_shards.pop(row['user_id'], None)
+        conn.execute(f"DELETE FROM user_shards WHERE user_key IN ({placeholders})", batch)
+    conn.commit()
+    conn.close()
+
+
+def init_db():
+    if SHARD_COUNT > 1:
+        _init_directory()
+    for path in database_paths():
+        _init_schema(path)
+
+
+def _init_schema(path):
+    conn = get_connection(path)
+    cursor = conn.cursor()
+    if cursor.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        conn.close()
+        return
+    if cursor.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone() is None:
+        # Incremental mode lets the archival job hand freed pages back to the OS in small steps.
+        # It is free before the first table exists; older files switch via enable_incremental_vacuum().
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS users
+                   (
+                       id
+                       INTEGER
+                       PRIMARY
+                       KEY
+                       AUTOINCREMENT,
+                       name
+                       TEXT,
+                       age
+                       INTEGER,
+                       gender
+                       TEXT,
+                       height
+                       REAL,
+                       weight
+                       REAL,
+                       timestamp
+                       DATETIME
+                       DEFAULT
+                       CURRENT_TIMESTAMP
+                   )
+                   """)
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS symptom_entries
+                   (
+                       id
+                       INTEGER
+                       PRIMARY
+                       KEY
+                       AUTOINCREMENT,
+                       user_id
+                       INTEGER,
+                       symptoms
+                       TEXT,
+                       response
+                       TEXT,
+                       timestamp
+                       DATETIME
+                       DEFAULT
+                       CURRENT_TIMESTAMP
+                   )
+                   """)
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS mental_health_entries
+                   (
+                       id
+                       INTEGER
+                       PRIMARY
+                       KEY
+                       AUTOINCREMENT,
+                       user_id
+                       INTEGER,
+                       mood_note
+                       TEXT,
+                       sentiment
+                       REAL,
+                       response
+                       TEXT,
+                       timestamp
+                       DATETIME
+                       DEFAULT
+                       CURRENT_TIMESTAMP
+                   )
+                   """)
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS sentiment_rollups
+                   (
+                       user_id INTEGER NOT NULL,
+                       period TEXT NOT NULL,
+                       bucket TEXT NOT NULL,
+                       count INTEGER NOT NULL,
+                       total REAL NOT NULL,
+                       min REAL NOT NULL,
+                       max REAL NOT NULL,
+                       ewma REAL NOT NULL,
+                       PRIMARY KEY (user_id, period, bucket)
+                   ) WITHOUT ROWID
+                   """)
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS user_measurements
+                   (
+                       id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       user_id INTEGER NOT NULL,
+                       height REAL,
+                       weight REAL,
+                       timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                   )
+                   """)
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS archived_entries
+                   (
+                       id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       source_table TEXT NOT NULL,
+                       source_id INTEGER NOT NULL,
+                       user_id INTEGER,
+                       timestamp DATETIME,
+                       payload BLOB NOT NULL
+                   )
+                   """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_user_measurements_user ON user_measurements (user_id, timestamp)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archived_entries_user "
+        "ON archived_entries (user_id, source_table, timestamp)")
+    for table in ARCHIVED_TABLES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table} (user_id, timestamp)")
+    user_columns = [row['name'] for row in cursor.execute("PRAGMA table_info(users)")]
+    if 'user_key' not in user_columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN user_key TEXT")
+    # user_key holds the normalized contact; rows without one keep NULL and are only ever found by id.
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_user_key ON users (user_key) WHERE user_key IS NOT NULL")
+    # Earlier releases keyed users on "name|gender", which let different people share a row.
+    cursor.execute(
+        "UPDATE users SET user_key = NULL "
+        "WHERE user_key IS NOT NULL AND user_key NOT LIKE '%@%' AND user_key NOT LIKE 'tel:%'")
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS user_merges
+                   (
+                       source_id INTEGER NOT NULL,
+                       target_id INTEGER NOT NULL,
+                       status TEXT NOT NULL DEFAULT 'proposed',
+                       source_row TEXT,
+                       moved_rows TEXT,
+                       updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                       PRIMARY KEY (source_id, target_id)
+                   )
+                   """)
+    conn.commit()
+    if cursor.execute("SELECT 1 FROM sentiment_rollups LIMIT 1").fetchone() is None:
+        # First start after the rollup table was introduced: fold in existing entries once.
+        user_ids = [row[0] for row in cursor.execute(
+            "SELECT DISTINCT user_id FROM mental_health_entries WHERE sentiment IS NOT NULL")]
+        for user_id in user_ids:
+            rebuild_sentiment_rollups(user_id, conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.close()
+
+
+def enable_incremental_vacuum():
+    # One full VACUUM per file that predates incremental mode; it blocks writers for its whole
+    # run, so it is only started from the command line.
+    switched = 0
+    for path in database_paths():
+        conn = get_connection(path)
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            switched += 1
+        conn.close()
+    return switched
+
+
+
+def make_user_key(contact):
+    # Identity is an email address or phone number, never the name: two people called Rahul are
+    # two users. Returns None when no contact was given.
+    contact = str(contact or "").strip()
+    if "@" in contact:
+        return contact.casefold()
+    digits = "".join(ch for ch in contact if ch.isdigit())
+    return f"tel:{digits}" if digits else None
+
+
+def _directory_key(user_key):
+    # The shard directory needs a key for every user; users without a contact get a random one.
+    return user_key or f"anon:{uuid.uuid4().hex}"
+
+
+def _find_user(user_key):
+    conn = get_connection()
+    if SHARD_COUNT > 1:
+        row = conn.execute("SELECT user_id FROM user_shards WHERE user_key = ?", (user_key,)).fetchone()
+    else:
+        row = conn.execute("SELECT id FROM users WHERE user_key = ?", (user_key,)).fetchone()
+    conn.close()
+    return row[0] if row is not None else None
+
+
+def _update_user(user_id, user_key, details):
+    # A row that already belongs to another contact is never re-keyed; that would hand its
+    # profile and history to a different person.
+    conn = get_connection(_user_path(user_id))
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE users SET name = ?, age = ?, gender = ?, height = ?, weight = ?, user_key = COALESCE(?, user_key) "
+        "WHERE id = ? AND (user_key IS NULL OR user_key = ?)",
+        (details['name'], details['age'], details['gender'], details['height'], details['weight'], user_key,
+         user_id, user_key)
+    )
+    updated = cursor.rowcount > 0
+    if updated:
+        _record_measurement(cursor, user_id, details['height'], details['weight'])
+    conn.commit()
+    conn.close()
+    if updated and user_key and SHARD_COUNT > 1:
+        conn = get_connection()
+        conn.execute("UPDATE user_shards SET user_key = ? WHERE user_id = ?", (user_key, user_id))
+        conn.commit()
+        conn.close()
+    return updated
+
+
+def _insert_user(cursor, user_id, user_key, details):
+    # user_id is None unless sharded; a keyed row that already exists is updated in place.
+    cursor.execute(
+        """
+        INSERT INTO users (id, user_key, name, age, gender, height, weight) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_key) WHERE user_key IS NOT NULL DO UPDATE SET
+            name = excluded.name,
+            age = excluded.age,
+            gender = excluded.gender,
+            height = excluded.height,
+            weight = excluded.weight
+        """,
+        (user_id, user_key, details['name'], details['age'], details['gender'], details['height'], details['weight'])
+    )
+    if user_key is not None:
+        cursor.execute("SELECT id FROM users WHERE user_key = ?", (user_key,))
+        return cursor.fetchone()[0]
+    return user_id or cursor.lastrowid
+
+
+def save_personal_details_to_db(details, user_id=None):
+    # The row for the given contact wins; otherwise `user_id` (the row this session already
+    # created) is updated if it has no contact or the same one; otherwise this is a new person.
+    user_key = make_user_key(details.get('contact'))
+    for known_id in (_find_user(user_key) if user_key else None, user_id):
+        if known_id is not None and _update_user(known_id, user_key, details):
+            return known_id
+    # Sharded ids come from the directory so they stay globally unique and survive rebalancing.
+    user_id = _register_user(_directory_key(user_key)) if SHARD_COUNT > 1 else None
+    conn = get_connection(_user_path(user_id) if user_id else None)
+    cursor = conn.cursor()
+    user_id = _insert_user(cursor, user_id, user_key, details)
+    _record_measurement(cursor, user_id, details['height'], details['weight'])
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def save_personal_details_batch(records):
+    # Bulk form of save_personal_details_to_db for imports: one transaction per database file
+    # for the whole batch. Rows with a contact update that user; rows without one are new users.
+    # Returns the user ids in input order.
+    user_keys = [make_user_key(details.get('contact')) for details in records]
+    directory_keys = [_directory_key(user_key) for user_key in user_keys]
+    directory_ids = _register_users(directory_keys) if SHARD_COUNT > 1 else {}
+    groups = {}
+    for position, (user_key, directory_key, details) in enumerate(zip(user_keys, directory_keys, records)):
+        user_id = directory_ids.get(directory_key)
+        path = _user_path(user_id) if user_id else DB_PATH
+        groups.setdefault(path, []).append((position, user_id, user_key, details))
+
+    # Each file commits on its own, so a failing shard does not stop the others; the error then
+    # lists which rows did get saved.
+    user_ids = [None] * len(records)
+    failed, error = [], None
+    for path, group in groups.items():
+        conn = get_connection(path)
+        try:
+            cursor = conn.cursor()
+            for position, user_id, user_key, details in group:
+                user_ids[position] = _insert_user(cursor, user_id, user_key, details)
+                _record_measurement(cursor, user_ids[position], details['height'], details['weight'])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            failed += [position for position, *_ in group]
+            error = error or e
+        finally:
+            conn.close()
+    if error is not None:
+        if directory_ids:
+            _unregister_users([directory_keys[position] for position in failed if user_keys[position] is None])
+        failed = set(failed)
+        saved = [position for position in range(len(records)) if position not in failed]
+        raise PartialSaveError(error, saved) from error
+    return user_ids
+
+
+def _record_measurement(cursor, user_id, height, weight, timestamp=None):
+    cursor.execute(
+        "SELECT height, weight FROM user_measurements WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT 1",
+        (user_id,)
+    )
+    latest = cursor.fetchone()
+    if latest is not None and (latest[0], latest[1]) == (height, weight):
+        return
+    cursor.execute(
+        "INSERT INTO user_measurements (user_id, height, weight, timestamp) "
+        "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+        (user_id, height, weight, timestamp)
+    )
+
+
+def load_user_measurements(user_id):
+    conn = get_connection(_user_path(user_id))
+    rows = conn.execute(
+        "SELECT height, weight, timestamp FROM user_measurements WHERE user_id = ? ORDER BY timestamp, id",
+        (user_id,)
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def save_symptom_entry(user_id, symptoms, response):
+    conn = get_connection(_user_path(user_id))
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO symptom_entries (user_id, symptoms, response) VALUES (?, ?, ?)",
+        (user_id, symptoms, response)
+    )
+    conn.commit()
+    conn.close()
+
+
+def save_mental_health_entry(user_id, mood_note, sentiment, response):
+    conn = get_connection(_user_path(user_id))
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO mental_health_entries (user_id, mood_note, sentiment, response) VALUES (?, ?, ?, ?)",
+        (user_id, mood_note, sentiment, response)
+    )
+    if sentiment is not None:
+        cursor.execute("SELECT timestamp FROM mental_health_entries WHERE id = ?", (cursor.lastrowid,))
+        _apply_sentiment_rollup(cursor, user_id, sentiment, cursor.fetchone()[0])
+    conn.commit()
+    conn.close()
+
+
+# ------------------ Duplicate User Review ------------------
+
+# Tables whose rows follow a user through a merge; the moved ids are logged so it can be undone.
+MERGED_TABLES = ("symptom_entries", "mental_health_entries", "user_measurements", "archived_entries")
+
+
+def find_duplicate_users(batch_size=USER_MERGE_BATCH_SIZE):
+    # Legacy users rows (one per form submit, no contact) are never merged automatically. This
+    # only backfills their measurements and proposes pairs whose name, gender, age and height all
+    # match; merge_users / undo_user_merge / reject_user_merge apply a reviewed decision.
+    return sum(_find_duplicate_users(path, batch_size) for path in database_paths())
+
+
+def _find_duplicate_users(path, batch_size):
+    proposed, last_id = 0, 0
+    while True:
+        conn = get_connection(path)
+        cursor = conn.cursor()
+        rows = cursor.execute(
+            "SELECT id, height, weight, timestamp FROM users WHERE user_key IS NULL AND id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            conn.close()
+            return proposed
+        for row in rows:
+            _record_measurement(cursor, row['id'], row['height'], row['weight'], row['timestamp'])
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO user_merges (source_id, target_id)
+            SELECT u.id, MIN(t.id)
+            FROM users u
+            JOIN users t ON t.id < u.id AND t.user_key IS NULL
+                AND lower(trim(t.name)) = lower(trim(u.name)) AND lower(t.gender) = lower(u.gender)
+                AND t.age IS u.age AND t.height IS u.height
+            WHERE u.user_key IS NULL AND u.id > ? AND u.id <= ?
+            GROUP BY u.id
+            """,
+            (last_id, rows[-1]['id'])
+        )
+        proposed += cursor.rowcount
+        conn.commit()
+        conn.close()
+        last_id = rows[-1]['id']
+
+
+def load_merge_candidates(status="proposed"):
+    candidates = []
+    for path in database_paths():
+        conn = get_connection(path)
+        rows = conn.execute(
+            """
+            SELECT m.source_id, m.target_id, m.status, m.updated_at,
+                   s.name AS source_name, s.age AS source_age, s.timestamp AS source_created,
+                   t.name AS target_name, t.age AS target_age, t.timestamp AS target_created
+            FROM user_merges m
+            LEFT JOIN users s ON s.id = m.source_id
+            LEFT JOIN users t ON t.id = m.target_id
+            WHERE m.status = ?
+            ORDER BY m.target_id, m.source_id
+            """,
+            (status,)
+        ).fetchall()
+        conn.close()
+        candidates += [dict(row) for row in rows]
+    return candidates
+
+
+def merge_users(source_id, target_id):
+    # Moves source_id's history onto target_id and deletes the source row, logging everything
+    # undo_user_merge needs to put it back.
+    path = _user_path(source_id)
+    if _user_path(target_id) != path:
+        raise ValueError("Users on different shards cannot be merged.")
+    conn = get_connection(path)
+    cursor = conn.cursor()
+    source = cursor.execute("SELECT * FROM users WHERE id = ?", (source_id,)).fetchone()
+    if source is None or cursor.execute("SELECT 1 FROM users WHERE id = ?", (target_id,)).fetchone() is None:
+        conn.close()
+        raise ValueError(f"Cannot merge user {source_id} into {target_id}: unknown user.")
+    moved = {}
+    for table in MERGED_TABLES:
+        moved[table] = [row[0] for row in cursor.execute(f"SELECT id FROM {table} WHERE user_id = ?", (source_id,))]
+        cursor.execute(f"UPDATE {table} SET user_id = ? WHERE user_id = ?", (target_id, source_id))
+    cursor.execute("DELETE FROM sentiment_rollups WHERE user_id = ?", (source_id,))
+    cursor.execute("DELETE FROM users WHERE id = ?", (source_id,))
+    cursor.execute(
+        """
+        INSERT INTO user_merges (source_id, target_id, status, source_row, moved_rows) VALUES (?, ?, 'merged', ?, ?)
+        ON CONFLICT (source_id, target_id) DO UPDATE SET
+            status = 'merged',
+            source_row = excluded.source_row,
+            moved_rows = excluded.moved_rows,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (source_id, target_id, json.dumps(dict(source), default=str), json.dumps(moved))
+    )
+    conn.commit()
+    rebuild_sentiment_rollups(target_id, conn)
+    conn.close()
+
+
+def undo_user_merge(source_id, target_id):
+    conn = get_connection(_user_path(source_id))
+    cursor = conn.cursor()
+    merge = cursor.execute(
+        "SELECT source_row, moved_rows FROM user_merges WHERE source_id = ? AND target_id = ? AND status = 'merged'",
+        (source_id, target_id)
+    ).fetchone()
+    if merge is None:
+        conn.close()
+        raise ValueError(f"No applied merge of user {source_id} into {target_id}.")
+    source = json.loads(merge['source_row'])
+    cursor.execute(f"INSERT INTO users ({', '.join(source)}) VALUES ({', '.join('?' for _ in source)})",
+                   tuple(source.values()))
+    for table, row_ids in json.loads(merge['moved_rows']).items():
+        cursor.executemany(f"UPDATE {table} SET user_id = ? WHERE id = ? AND user_id = ?",
+                           [(source_id, row_id, target_id) for row_id in row_ids])
+        if table in ARCHIVED_TABLES:
+            # Entries archived since the merge are found by their original id.
+            cursor.executemany(
+                "UPDATE archived_entries SET user_id = ? WHERE source_table = ? AND source_id = ? AND user_id = ?",
+                [(source_id, table, row_id, target_id) for row_id in row_ids]
+            )
+    cursor.execute(
+        "UPDATE user_merges SET status = 'undone', updated_at = CURRENT_TIMESTAMP "
+        "WHERE source_id = ? AND target_id = ?",
+        (source_id, target_id)
+    )
+    conn.commit()
+    rebuild_sentiment_rollups(source_id, conn)
+    rebuild_sentiment_rollups(target_id, conn)
+    conn.close()
+
+
+def reject_user_merge(source_id, target_id):
+    conn = get_connection(_user_path(source_id))
+    conn.execute(
+        "UPDATE user_merges SET status = 'rejected', updated_at = CURRENT_TIMESTAMP "
+        "WHERE source_id = ? AND target_id = ? AND status = 'proposed'",
+        (source_id, target_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def _start_background_job(name, target):
+    # Streamlit re-runs the page script constantly; this module is imported once per process.
+    with _background_jobs_lock:
+        if name in _background_jobs:
+            return
+        _background_jobs.add(name)
+    threading.Thread(target=target, name=name, daemon=True).start()
+
+
+def start_duplicate_review_job():
+    _start_background_job("parmatma-duplicate-review", find_duplicate_users)
+
+
+# ------------------ Sentiment Rollups ------------------
+
+def _rollup_buckets(timestamp):
+    day = datetime.date.fromisoformat(str(timestamp)[:10])
+    week = day - datetime.timedelta(days=day.weekday())
+    return {"day": day.isoformat(), "week": week.isoformat()}
+
+
+def _apply_sentiment_rollup(cursor, user_id, sentiment, timestamp):
+    # Entries arrive in timestamp order, so the newest bucket of a period holds the running EWMA.
+    for period, bucket in _rollup_buckets(timestamp).items():
+        cursor.execute(
+            "SELECT ewma FROM sentiment_rollups WHERE user_id = ? AND period = ? ORDER BY bucket DESC LIMIT 1",
+            (user_id, period)
+        )
+        row = cursor.fetchone()
+        ewma = sentiment if row is None else SENTIMENT_EWMA_ALPHA * sentiment + (1 - SENTIMENT_EWMA_ALPHA) * row[0]
+        cursor.execute(
+            """
+            INSERT INTO sentiment_rollups (user_id, period, bucket, count, total, min, max, ewma)
+            VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT (user_id, period, bucket) DO UPDATE SET
+                count = count + 1,
+                total = total + excluded.total,
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max),
+                ewma = excluded.ewma
+            """,
+            (user_id, period, bucket, sentiment, sentiment, sentiment, ewma)
+        )
+
+
+def rebuild_sentiment_rollups(user_id, conn=None):
+    own_conn = conn is None
+    conn = conn or get_connection(_user_path(user_id))
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM sentiment_rollups WHERE user_id = ?", (user_id,))
+    rows = [dict(row) for row in conn.execute(
+        "SELECT id, sentiment, timestamp FROM mental_health_entries WHERE user_id = ? AND sentiment IS NOT NULL",
+        (user_id,)
+    )]
+    # Archived entries count too, or any rebuild after archival would drop them from the trend.
+    for row in conn.execute(
+        "SELECT payload FROM archived_entries WHERE user_id = ? AND source_table = 'mental_health_entries'",
+        (user_id,)
+    ):
+        entry = _decompress_row(row['payload'])
+        if entry.get('sentiment') is not None:
+            rows.append(entry)
+    rows.sort(key=lambda entry: (str(entry['timestamp']), entry['id']))
+    for row in rows:
+        _apply_sentiment_rollup(cursor, user_id, row['sentiment'], row['timestamp'])
+    conn.commit()
+    if own_conn:
+        conn.close()
+
+
+def load_sentiment_trend(user_id, period="day", limit=90):
+    if period not in ROLLUP_PERIODS:
+        raise ValueError(f"Unknown rollup period: {period}")
+    conn = get_connection(_user_path(user_id))
+    rows = conn.execute(
+        """
+        SELECT bucket, count, total / count AS mean, min, max, ewma
+        FROM sentiment_rollups
+        WHERE user_id = ? AND period = ?
+        ORDER BY bucket DESC
+        LIMIT ?
+        """,
+        (user_id, period, limit)
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in reversed(rows)]
+
+
+def load_user_history(user_id, include_archived=False):
+    conn = get_connection(_user_path(user_id))
+    cursor = conn.cursor()
+    # Plain dicts either way, so hot and archived rows look the same to callers.
+    cursor.execute("SELECT * FROM symptom_entries WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
+    symptoms = [dict(row) for row in cursor.fetchall()]
+    cursor.execute("SELECT * FROM mental_health_entries WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
+    mental = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    if include_archived:
+        symptoms = symptoms + load_archived_entries(user_id, "symptom_entries")
+        mental = mental + load_archived_entries(user_id, "mental_health_entries")
+    return symptoms, mental
+
+
+# ------------------ Archival ------------------
+
+def _compress_row(row):
+    return zlib.compress(json.dumps(dict(row), default=str).encode("utf-8"), 9)
+
+
+def _decompress_row(payload):
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def archive_old_entries(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    return sum(_archive_old_entries(path, cutoff, batch_size) for path in database_paths())
+
+
+def _archive_old_entries(path, cutoff, batch_size):
+    archived = 0
+    conn = get_connection(path)
+    cursor = conn.cursor()
+    for table in ARCHIVED_TABLES:
+        while True:
+            rows = cursor.execute(
+                f"SELECT * FROM {table} WHERE timestamp < ? ORDER BY id LIMIT ?", (cutoff, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                "INSERT INTO archived_entries (source_table, source_id, user_id, timestamp, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(table, row['id'], row['user_id'], row['timestamp'], _compress_row(row)) for row in rows]
+            )
+            cursor.executemany(f"DELETE FROM {table} WHERE id = ?", [(row['id'],) for row in rows])
+            conn.commit()
+            archived += len(rows)
+    conn.close()
+    return archived
+
+
+def run_incremental_vacuum(pages=INCREMENTAL_VACUUM_PAGES):
+    for path in database_paths():
+        conn = get_connection(path)
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        conn.close()
+
+
+def load_archived_entries(user_id, table):
+    conn = get_connection(_user_path(user_id))
+    rows = conn.execute(
+        "SELECT payload FROM archived_entries WHERE user_id = ? AND source_table = ? ORDER BY timestamp DESC",
+        (user_id, table)
+    ).fetchall()
+    conn.close()
+    return [_decompress_row(row['payload']) for row in rows]
+
+
+def iter_user_history_chunks(user_id, chunk_size=500):
+    # Keyset pagination on id, hot tables first, then the archive decompressed chunk by chunk.
+    conn = get_connection(_user_path(user_id))
+    try:
+        for table in ARCHIVED_TABLES:
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT * FROM {table} WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (user_id, last_id, chunk_size)
+                ).fetchall()
+                if not rows:
+                    break
+                yield [{"record_type": table, **dict(row)} for row in rows]
+                last_id = rows[-1]['id']
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, source_table, payload FROM archived_entries WHERE user_id = ? AND id > ? "
+                "ORDER BY id LIMIT ?",
+                (user_id, last_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                break
+            yield [{"record_type": row['source_table'], **_decompress_row(row['payload'])} for row in rows]
+            last_id = rows[-1]['id']
+    finally:
+        conn.close()
+
+
+def _archive_loop(interval_seconds=ARCHIVE_INTERVAL_SECONDS):
+    while True:
+        try:
+            if archive_old_entries():
+                run_incremental_vacuum()
+        except Exception:
+            # Each batch commits on its own, so the next run picks up where this one failed.
+            logger.exception("Archiving old entries failed; retrying in %s s", interval_seconds)
+        time.sleep(interval_seconds)
+
+
+def start_archival_job():
+    _start_background_job("parmatma-archival", _archive_loop)
+
+
+def storage_report(user_id=None):
+    report = {"file_bytes": 0, "freelist_bytes": 0, "archived_rows": 0}
+    report.update({f"{table}_rows": 0 for table in ARCHIVED_TABLES})
+    for path in database_paths():
+        if not os.path.exists(path):
+            continue
+        conn = get_connection(path)
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        report["file_bytes"] += os.path.getsize(path)
+        report["freelist_bytes"] += conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+        report["archived_rows"] += conn.execute("SELECT COUNT(*) FROM archived_entries").fetchone()[0]
+        for table in ARCHIVED_TABLES:
+            report[f"{table}_rows"] += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        conn.close()
+    if user_id is not None:
+        started = time.perf_counter()
+        load_user_history(user_id)
+        report["hot_history_ms"] = (time.perf_counter() - started) * 1000
+    return report
+
+
+# ------------------ Cross-Shard Scans & Rebalancing ------------------
+
+def _key_columns(conn, table):
+    # Primary-key columns in key order; tables without a declared key page on rowid.
+    columns = sorted((row['pk'], row['name']) for row in conn.execute(f"PRAGMA table_info({table})") if row['pk'])
+    return [name for _, name in columns] or ["rowid"]
+
+
+def iter_all_rows(table, chunk_size=1000):
+    # Analytics scan over every shard (or the single file), keyset-paginated on the primary key,
+    # which also covers WITHOUT ROWID tables such as sentiment_rollups.
+    for shard, path in enumerate(database_paths()):
+        conn = get_connection(path)
+        try:
+            keys = _key_columns(conn, table)
+            aliases = [f"_key{i}" for i in range(len(keys))]
+            select = f"SELECT {', '.join(f'{key} AS {alias}' for key, alias in zip(keys, aliases))}, * FROM {table}"
+            order = f"ORDER BY {', '.join(keys)} LIMIT ?"
+            last_key = None
+            while True:
+                if last_key is None:
+                    rows = conn.execute(f"{select} {order}", (chunk_size,)).fetchall()
+                else:
+                    rows = conn.execute(
+                        f"{select} WHERE ({', '.join(keys)}) > ({', '.join('?' * len(keys))}) {order}",
+                        (*last_key, chunk_size)
+                    ).fetchall()
+                if not rows:
+                    break
+                last_key = tuple(rows[-1][alias] for alias in aliases)
+                yield [{"shard": shard, **{key: row[key] for key in row.keys() if key not in aliases}}
+                       for row in rows]
+        finally:
+            conn.close()
+
+
+def _copy_rows(source, target, table, user_id, keep_ids):
+    rows = source.execute(f"SELECT * FROM {table} WHERE user_id = ?", (user_id,)).fetchall()
+    if not rows:
+        return
+    columns = [key for key in rows[0].keys() if keep_ids or key != "id"]
+    target.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        [tuple(row[column] for column in columns) for row in rows]
+    )
+
+
+def _move_user(user_id, source_path, target_path):
+    source = get_connection(source_path)
+    target = get_connection(target_path)
+    user_tables = MERGED_TABLES + ("sentiment_rollups",)
+    # Clear leftovers from an interrupted move first so the copy is idempotent.
+    target.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    for table in user_tables:
+        target.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+    user = source.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+    if user is not None:
+        columns = user.keys()
+        target.execute(f"INSERT INTO users ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                       tuple(user))
+    for table in user_tables:
+        _copy_rows(source, target, table, user_id, keep_ids=table == "sentiment_rollups")
+    target.commit()
+    source.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    for table in user_tables:
+        source.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+    source.commit()
+    source.close()
+    target.close()
+
+
+def rebalance_shards(new_count):
+    # Offline tool: stop the app, run this, then restart with PARMATMA_SHARDS=new_count.
+    # Data still in an unsharded DB_PATH is adopted into the shards on the first run.
+    _init_directory()
+    for path in database_paths(new_count):
+        _init_schema(path)
+    directory = get_connection()
+    legacy_users = directory.execute("SELECT name FROM sqlite_master WHERE name = 'users'").fetchone()
+    if legacy_users is not None and database_paths(new_count) != [DB_PATH]:
+        directory.execute(
+            "INSERT OR IGNORE INTO user_shards (user_id, user_key, shard) "
+            "SELECT id, COALESCE(user_key, 'id:' || id), -1 FROM users")
+        directory.commit()
+    moved = 0
+    for row in directory.execute("SELECT user_id, user_key, shard FROM user_shards").fetchall():
+        target = shard_for_key(row['user_key'], new_count) if new_count > 1 else -1
+        if target == row['shard']:
+            continue
+        _move_user(row['user_id'], shard_path(row['shard']), shard_path(target))
+        directory.execute("UPDATE user_shards SET shard = ? WHERE user_id = ?", (target, row['user_id']))
+        directory.commit()
+        moved += 1
+    directory.close()
+    _user_shards.clear()
+    return moved
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parmatma database maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate")
+    subparsers.add_parser("rebalance").add_argument("shards", type=int)
+    subparsers.add_parser("duplicates").add_argument("status", nargs="?", default="proposed")
+    for command in ("merge", "undo", "reject"):
+        command_parser = subparsers.add_parser(command)
+        command_parser.add_argument("source_id", type=int)
+        command_parser.add_argument("target_id", type=int)
+    args = parser.parse_args()
+    if args.command == "migrate":
+        init_db()
+        print(f"Switched {enable_incremental_vacuum()} database files to incremental vacuum.")
+    elif args.command == "rebalance":
+        print(f"Moved {rebalance_shards(args.shards)} users.")
+    elif args.command == "duplicates":
+        init_db()
+        print(f"Proposed {find_duplicate_users()} new pairs.")
+        for candidate in load_merge_candidates(args.status):
+            print(f"{candidate['source_id']} -> {candidate['target_id']}: {candidate['source_name']} "
+                  f"(age {candidate['source_age']}, created {candidate['source_created']}, "
+                  f"target created {candidate['target_created']}) [{candidate['status']}]")
+    else:
+        {"merge": merge_users, "undo": undo_user_merge, "reject": reject_user_merge}[args.command](
+            args.source_id, args.target_id)
+        print(f"{args.command}: {args.source_id} -> {args.target_id}")
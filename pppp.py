@@ -3,6 +3,7 @@ import datetime
 import pandas as pd
 import requests
 import time
+from health_metrics import bmi_and_category
 
 st.set_page_config(
     page_title="Parmatma - Health & Wellness Tracker",
@@ -33,19 +34,18 @@ def google_api_call(model, endpoint, payload):
     raise Exception("Max retries exceeded for API call.")
 
 
+BMI_ADVICE = {
+    "Underweight": "Focus on nutrient-dense foods and consult a professional for healthy weight gain.",
+    "Normal": "Maintain balanced diet and regular exercise.",
+    "Overweight": "Consider a balanced diet and increase activity.",
+    "Obese": "Consult a professional for personalized weight management.",
+    "Invalid": "Height and weight must be positive numbers.",
+}
+
+
 def calculate_bmi_and_category(weight_kg, height_cm):
-    if height_cm <= 0 or weight_kg <= 0:
-        return 0, "Invalid", "Height and weight must be positive numbers."
-    bmi = weight_kg / ((height_cm / 100) ** 2)
-    if bmi < 18.5:
-        category, advice = "Underweight", "Focus on nutrient-dense foods and consult a professional for healthy weight gain."
-    elif 18.5 <= bmi < 25:
-        category, advice = "Normal", "Maintain balanced diet and regular exercise."
-    elif 25 <= bmi < 30:
-        category, advice = "Overweight", "Consider a balanced diet and increase activity."
-    else:
-        category, advice = "Obese", "Consult a professional for personalized weight management."
-    return bmi, category, advice
+    bmi, category = bmi_and_category(weight_kg, height_cm)
+    return bmi, category, BMI_ADVICE[category]
 
 
 # ----------------------------- Features -----------------------------
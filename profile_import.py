@@ -0,0 +1,160 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from health_metrics import BMI_CATEGORIES, compute_metrics
+
+PROFILE_COLUMNS = ("name", "age", "gender", "height", "weight")
+# Email or phone; rows that have one update that person instead of creating a new profile.
+OPTIONAL_COLUMNS = ("contact",)
+GENDERS = {"male": "Male", "m": "Male", "female": "Female", "f": "Female", "other": "Other"}
+# Widest bounds any profile form accepts; pages pass their own form's limits.
+PROFILE_LIMITS = {"age": (5, 120), "height": (50.0, 250.0), "weight": (10.0, 300.0)}
+# Rows parsed, validated and written per transaction; only one chunk is in memory at a time.
+IMPORT_CHUNK_ROWS = 5000
+# Rejected rows are all counted, but only this many are kept for the error report.
+MAX_REPORTED_ERRORS = 10000
+FILE_TYPES = ("csv", "xlsx")
+
+
+def available_file_types():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return [file_type for file_type in FILE_TYPES if file_type != "xlsx"]
+    return list(FILE_TYPES)
+
+
+def _normalize_header(name):
+    # "Height (cm)" -> "height"
+    return str(name).split("(")[0].strip().casefold()
+
+
+def _iter_excel_chunks(file, chunk_size):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = ["" if value is None else str(value) for value in header]
+        while True:
+            batch = [row[:len(header)] for row in itertools.islice(rows, chunk_size)]
+            if not batch:
+                return
+            yield pd.DataFrame.from_records(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_profile_chunks(file, filename, chunk_size=IMPORT_CHUNK_ROWS):
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    if extension == "xlsx":
+        chunks = _iter_excel_chunks(file, chunk_size)
+    elif extension == "csv":
+        chunks = pd.read_csv(file, dtype=str, keep_default_na=False, skipinitialspace=True, chunksize=chunk_size)
+    else:
+        raise ValueError(f"Unsupported file type: {filename}")
+    for frame in chunks:
+        frame.columns = [_normalize_header(column) for column in frame.columns]
+        missing = [column for column in PROFILE_COLUMNS if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        for column in OPTIONAL_COLUMNS:
+            if column not in frame.columns:
+                frame[column] = ""
+        yield frame[list(PROFILE_COLUMNS + OPTIONAL_COLUMNS)]
+
+
+def validate_chunk(frame, first_row, limits=PROFILE_LIMITS):
+    # Every check runs over the whole chunk at once; `first_row` is the file line of the chunk's
+    # first row, so errors point at the line to fix.
+    names = frame["name"].fillna("").astype(str).str.strip()
+    genders = frame["gender"].fillna("").astype(str).str.strip().str.casefold().map(GENDERS)
+    numbers = {column: pd.to_numeric(frame[column], errors="coerce") for column in ("age", "height", "weight")}
+    blank = (names == "") & frame[["age", "gender", "height", "weight"]].fillna("").astype(str).apply(
+        lambda column: column.str.strip() == "").all(axis=1)
+
+    (age_min, age_max), (height_min, height_max), (weight_min, weight_max) = (
+        limits["age"], limits["height"], limits["weight"])
+    checks = {
+        "name is empty": names == "",
+        "gender must be Male, Female or Other": genders.isna(),
+        f"age must be a whole number from {age_min} to {age_max}":
+            ~(numbers["age"].between(age_min, age_max) & (numbers["age"] % 1 == 0)),
+        f"height must be {height_min:g}-{height_max:g} cm": ~numbers["height"].between(height_min, height_max),
+        f"weight must be {weight_min:g}-{weight_max:g} kg": ~numbers["weight"].between(weight_min, weight_max),
+    }
+    failed = np.column_stack([mask.to_numpy() for mask in checks.values()]) & ~blank.to_numpy()[:, None]
+    rejected = failed.any(axis=1)
+    messages = list(checks)
+    rows = np.arange(first_row, first_row + len(frame))
+    errors = [
+        {"row": int(row), "name": name, "error": "; ".join(message for message, hit in zip(messages, hits) if hit)}
+        for row, name, hits in zip(rows[rejected], names.to_numpy()[rejected], failed[rejected])
+    ]
+
+    keep = ~rejected & ~blank.to_numpy()
+    valid = pd.DataFrame({
+        "row": rows[keep],
+        "name": names.to_numpy()[keep],
+        "age": numbers["age"].to_numpy()[keep].astype(int),
+        "gender": genders.to_numpy()[keep],
+        "height": numbers["height"].to_numpy()[keep],
+        "weight": numbers["weight"].to_numpy()[keep],
+        "contact": frame["contact"].fillna("").astype(str).str.strip().to_numpy()[keep],
+    })
+    metrics = compute_metrics(valid["weight"], valid["height"], valid["age"], valid["gender"].to_numpy())
+    valid["bmi"] = np.round(metrics["bmi"], 2)
+    valid["category"] = metrics["category"]
+    return valid, errors
+
+
+def _saved_rows(error, count):
+    # What a failed bulk write still stored: the indexes of the saved rows (`saved_positions`), a
+    # count of leading rows (`saved`), or nothing.
+    saved = np.zeros(count, dtype=bool)
+    positions = getattr(error, "saved_positions", None)
+    if positions is None:
+        saved[:getattr(error, "saved", 0)] = True
+    else:
+        saved[list(positions)] = True
+    return saved
+
+
+def import_profiles(file, filename, save_batch, limits=PROFILE_LIMITS, chunk_size=IMPORT_CHUNK_ROWS,
+                    progress=None):
+    # `save_batch` receives a list of profile dicts per chunk and writes them in one go. When the
+    # write fails, the rows it did not save (see _saved_rows) are reported row by row and the
+    # import carries on with the next chunk.
+    summary = {"rows": 0, "imported": 0, "rejected": 0, "errors": [],
+               "categories": dict.fromkeys(BMI_CATEGORIES, 0)}
+    size = getattr(file, "size", None)
+    first_row = 2
+    for frame in iter_profile_chunks(file, filename, chunk_size):
+        valid, errors = validate_chunk(frame, first_row, limits)
+        first_row += len(frame)
+        if len(valid):
+            records = valid[list(PROFILE_COLUMNS + OPTIONAL_COLUMNS)].to_dict("records")
+            saved = np.ones(len(valid), dtype=bool)
+            try:
+                save_batch(records)
+            except Exception as e:
+                saved = _saved_rows(e, len(valid))
+                errors += [{"row": int(row), "name": name, "error": f"not saved: {e}"}
+                           for row, name in zip(valid["row"][~saved], valid["name"][~saved])]
+            summary["imported"] += int(saved.sum())
+            for category, count in valid["category"][saved].value_counts().items():
+                summary["categories"][category] = summary["categories"].get(category, 0) + int(count)
+        summary["rows"] += len(frame)
+        summary["rejected"] += len(errors)
+        summary["errors"] += errors[:MAX_REPORTED_ERRORS - len(summary["errors"])]
+        if progress is not None:
+            # Excel and unsized files only report row counts.
+            fraction = min(1.0, file.tell() / size) if size and filename.lower().endswith(".csv") else None
+            progress(summary, fraction)
+    return summary
@@ -0,0 +1,41 @@
+import pandas as pd
+import streamlit as st
+
+from profile_import import OPTIONAL_COLUMNS, PROFILE_COLUMNS, PROFILE_LIMITS, available_file_types, import_profiles
+
+
+def profile_import_section(save_batch, key, limits=PROFILE_LIMITS):
+    st.caption(f"One profile per row with columns: {', '.join(PROFILE_COLUMNS)} (height in cm, weight in kg), "
+               f"optionally {', '.join(OPTIONAL_COLUMNS)} (email or phone).")
+    upload = st.file_uploader("Profiles file", type=available_file_types(), key=f"{key}_file")
+    if upload is None or not st.button("Import Profiles", key=f"{key}_button"):
+        return None
+
+    bar = st.progress(0.0)
+    status = st.empty()
+
+    def progress(summary, fraction):
+        if fraction is not None:
+            bar.progress(fraction)
+        status.text(f"{summary['rows']} rows read, {summary['imported']} imported, {summary['rejected']} rejected")
+
+    try:
+        summary = import_profiles(upload, upload.name, save_batch, limits, progress=progress)
+    except ValueError as e:
+        st.error(f"Could not import {upload.name}: {e}")
+        return None
+    bar.progress(1.0)
+    st.success(f"Imported {summary['imported']} of {summary['rows']} rows.")
+    cols = st.columns(len(summary["categories"]))
+    for col, (category, count) in zip(cols, summary["categories"].items()):
+        col.metric(category, count)
+
+    if summary["errors"]:
+        shown = len(summary["errors"])
+        st.warning(f"Rejected rows: {summary['rejected']}"
+                   + (f"; the report lists the first {shown}." if shown < summary["rejected"] else "."))
+        report = pd.DataFrame(summary["errors"])
+        st.dataframe(report, hide_index=True)
+        st.download_button("Download Error Report", report.to_csv(index=False), "profile_import_errors.csv",
+                           mime="text/csv", key=f"{key}_errors")
+    return summary
@@ -4,6 +4,10 @@ import pandas as pd
 import requests
 import time
 from textblob import TextBlob
+from health_metrics import bmi_and_category
+from meal_plan_view import meal_plan_section
+from meal_planner import plan_summary
+from workout_program_view import workout_program_section
 
 st.set_page_config(
     page_title="Parmatma - Health & Wellness Tracker",
@@ -34,19 +38,18 @@ def google_api_call(model, endpoint, payload):
     raise Exception("Max retries exceeded for API call.")
 
 
+BMI_ADVICE = {
+    "Underweight": "Focus on nutrient-dense foods and consult a professional for healthy weight gain.",
+    "Normal": "Maintain balanced diet and regular exercise.",
+    "Overweight": "Consider a balanced diet and increase activity.",
+    "Obese": "Consult a professional for personalized weight management.",
+    "Invalid": "Height and weight must be positive numbers.",
+}
+
+
 def calculate_bmi_and_category(weight_kg, height_cm):
-    if height_cm <= 0 or weight_kg <= 0:
-        return 0, "Invalid", "Height and weight must be positive numbers."
-    bmi = weight_kg / ((height_cm / 100) ** 2)
-    if bmi < 18.5:
-        category, advice = "Underweight", "Focus on nutrient-dense foods and consult a professional for healthy weight gain."
-    elif 18.5 <= bmi < 25:
-        category, advice = "Normal", "Maintain balanced diet and regular exercise."
-    elif 25 <= bmi < 30:
-        category, advice = "Overweight", "Consider a balanced diet and increase activity."
-    else:
-        category, advice = "Obese", "Consult a professional for personalized weight management."
-    return bmi, category, advice
+    bmi, category = bmi_and_category(weight_kg, height_cm)
+    return bmi, category, BMI_ADVICE[category]
 
 
 # Mock example of free symptom checker API function (replace with real if available)
@@ -121,6 +124,7 @@ def nutrition_coach_page():
 
     bmi_category = st.session_state.get('bmi_category', "Unknown")
     st.markdown(f"**Detected BMI Category:** {bmi_category}")
+    targets, week = meal_plan_section(personal, bmi_category, key="nutrition")
 
     if bmi_category == "Underweight":
         base_goal = "weekly meal plan for healthy weight gain"
@@ -130,17 +134,16 @@ def nutrition_coach_page():
         base_goal = st.text_input("Enter your nutrition/diet goal:",
                                   placeholder="e.g., 'Balanced weekly diet plan'")
 
-    if st.button("Get Nutrition Plan"):
-        if bmi_category in ["Underweight", "Overweight", "Obese"]:
-            user_goal = base_goal
-        else:
-            if not base_goal:
-                st.error("Please enter your nutrition or diet goal.")
-                return
-            user_goal = base_goal
-
-        with st.spinner("Preparing weekly nutrition plan..."):
-            user_prompt = f"Create a detailed weekly nutrition plan for: {user_goal}. Use markdown and provide actionable advice."
+    if st.button("Get Nutritionist Notes"):
+        if not week or not week[0]['meals']:
+            st.error("Adjust the restrictions to get a meal plan first.")
+            return
+        user_goal = base_goal or "balanced weekly diet plan"
+        with st.spinner("Writing nutritionist notes..."):
+            user_prompt = (f"Goal: {user_goal}. Daily targets: {targets['kcal']} kcal, {targets['protein_g']} g "
+                           f"protein. Here is the user's weekly meal plan:\n{plan_summary(week)}\n"
+                           "Add practical notes on preparation, swaps and why it suits the goal. "
+                           "Do not change the foods or portions.")
             payload = {
                 "contents": [{"parts": [{"text": user_prompt}]}],
                 "systemInstruction": {"parts": [
@@ -154,10 +157,10 @@ def nutrition_coach_page():
             )
             if response and response.get('candidates'):
                 generated_text = response['candidates'][0]['content']['parts'][0]['text']
-                st.subheader("Your Weekly Nutrition Plan")
+                st.subheader("Nutritionist Notes")
                 st.write(generated_text)
             else:
-                st.error("Failed to generate nutrition plan.")
+                st.error("Failed to generate nutritionist notes.")
 
 
 def exercise_routines_page():
@@ -167,49 +170,9 @@ def exercise_routines_page():
         st.info("Enter personal details in Home first.")
         return
 
-    gender = personal.get('gender', "Other")
-    body_parts = st.multiselect("Select body parts to train:",
-                                ["Arms", "Legs", "Core", "Back", "Chest", "Full Body"])
-    fitness_goal = st.text_input("Your fitness goal:",
-                                 placeholder="e.g., 'Strength training routine for beginners.'")
-
-    if st.button("Get Exercise Routine"):
-        if not fitness_goal:
-            st.error("Enter your fitness goal.")
-            return
-        if not body_parts:
-            st.error("Select at least one body part to train.")
-            return
-        with st.spinner("Generating exercise plan..."):
-            body_parts_text = ", ".join(body_parts)
-            user_prompt = (f"Create a list of 5 engaging exercises to train {body_parts_text} for a {gender} user. "
-                           f"Include a timer suggestion to complete each exercise.")
-            payload = {
-                "contents": [{"parts": [{"text": user_prompt}]}],
-                "systemInstruction": {"parts": [
-                    {"text": "Reply as a professional trainer. Use markdown."}
-                ]}
-            }
-            response = google_api_call(
-                model="gemini-2.5-flash-preview-05-20",
-                endpoint="generateContent",
-                payload=payload
-            )
-            if response and response.get('candidates'):
-                exercises_text = response['candidates'][0]['content']['parts'][0]['text']
-                st.markdown("### Your Exercise Routine")
-                st.markdown(exercises_text)
-
-                st.markdown("### Fitness Timer")
-                # Simple per-exercise timer buttons
-                for i in range(5):
-                    if st.button(f"Start Exercise {i + 1} Timer (30 sec)"):
-                        for sec in range(30, 0, -1):
-                            st.write(f"Time left: {sec} seconds")
-                            time.sleep(1)
-                        st.write("Done! Take a short break.")
-            else:
-                st.error("Failed to generate routine.")
+    bmi_category = st.session_state.get('bmi_category') or calculate_bmi_and_category(
+        personal['weight'], personal['height'])[1]
+    workout_program_section(personal, bmi_category, google_api_call, key="exercise")
 
 
 def symptom_checker_page():
@@ -3,8 +3,11 @@ import datetime
 import requests
 import time
 from textblob import TextBlob
-import folium
-from streamlit_folium import st_folium
+from emergency_lookup import emergency_lookup
+from gazetteer import canonical_city
+from health_metrics import bmi_and_category
+from hospital_map import display_hospitals_map
+from location_input import location_input
 
 
 st.set_page_config(page_title="Parmatma - Health & Wellness", page_icon="🧘", layout="centered")
@@ -31,29 +34,29 @@ def google_api_call(model, endpoint, prompt, system_instruction=None):
     return resp.json()
 
 
+BMI_ADVICE = {
+    "Underweight": "Focus on nutrient-dense foods and gain weight healthily.",
+    "Normal": "Maintain your current healthy lifestyle.",
+    "Overweight": "Consider a balanced diet and exercise.",
+    "Obese": "Consult a healthcare provider.",
+    "Invalid": "Height and weight must be positive.",
+}
+
+
 def calculate_bmi(weight_kg, height_cm):
-    if weight_kg <= 0 or height_cm <= 0:
-        return 0, "Invalid", "Height and weight must be positive."
-    bmi = weight_kg / ((height_cm / 100) ** 2)
-    if bmi < 18.5:
-        return bmi, "Underweight", "Focus on nutrient-dense foods and gain weight healthily."
-    elif bmi < 25:
-        return bmi, "Normal", "Maintain your current healthy lifestyle."
-    elif bmi < 30:
-        return bmi, "Overweight", "Consider a balanced diet and exercise."
-    else:
-        return bmi, "Obese", "Consult a healthcare provider."
+    bmi, category = bmi_and_category(weight_kg, height_cm)
+    return bmi, category, BMI_ADVICE[category]
 
 
 def get_platforms_by_location(city):
-    city = city.strip().lower()
+    city = (canonical_city(city) or city).strip().lower()
     metro_platforms = {
         "mumbai": [
             ("Practo", "https://www.practo.com", "Mobile-friendly, video & clinic consults"),
             ("Apollo 24|7", "https://www.apollo247.com", "Telehealth + medicine delivery"),
             ("MFine", "https://www.mfine.co", "AI-driven video consults"),
         ],
-        "bangalore": [
+        "bengaluru": [
             ("Practo", "https://www.practo.com/bangalore", "Top Bangalore doctors"),
             ("MFine", "https://www.mfine.co", "Teleconsult & fast support"),
             ("DocPrime", "https://www.docprime.com", "24/7 video consults"),
@@ -73,59 +76,6 @@ def get_platforms_by_location(city):
     ])
 
 
-def geocode_location(location):
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        "q": location,
-        "format": "json",
-        "limit": 1
-    }
-    headers = {
-        "User-Agent": "ParmatmaHealthApp/1.0 (+https://yourdomain.com/contact)"
-    }
-    response = requests.get(url, params=params, headers=headers)
-    if response.status_code == 200 and response.json():
-        result = response.json()[0]
-        return float(result["lat"]), float(result["lon"])
-    else:
-        return None, None
-
-
-def get_nearby_hospitals(lat, lon, radius=5000):
-    overpass_query = f"""
-    [out:json];
-    node["amenity"="hospital"](around:{radius},{lat},{lon});
-    out body;
-    """
-    overpass_url = "https://overpass-api.de/api/interpreter"
-    response = requests.post(overpass_url, data={"data": overpass_query})
-    if response.status_code == 200:
-        data = response.json()
-        hospitals = []
-        for element in data.get("elements", []):
-            name = element.get("tags", {}).get("name", "Unnamed Hospital")
-            hospital_lat = element.get("lat")
-            hospital_lon = element.get("lon")
-            hospitals.append({
-                "name": name,
-                "lat": hospital_lat,
-                "lon": hospital_lon
-            })
-        return hospitals
-    else:
-        return []
-
-
-def display_hospitals_map(hospitals, center_lat, center_lon):
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=13)
-    for hos in hospitals:
-        folium.Marker(
-            [hos['lat'], hos['lon']],
-            popup=hos['name']
-        ).add_to(m)
-    st_folium(m, width=700, height=450)
-
-
 def home():
     st.title("Welcome to Parmatma 🧘")
     with st.form("profile_form"):
@@ -369,7 +319,7 @@ def mental_health_chat():
 
 def doctor_appointments():
     st.header("Doctor Appointment Booking")
-    city = st.text_input("Enter your city or area")
+    city = location_input("Enter your city or area", key="doctor_city")
     specialty = st.selectbox("Select Specialization", ["General Physician", "Cardiologist", "Dermatologist", "Pediatrician", "Gynecologist", "Other"])
 
     # Mock example to simulate live appointment availability (replace with real API calls)
@@ -401,26 +351,6 @@ def doctor_appointments():
 
 def emergency_support():
     st.title("Parmatma Emergency Support")
-    st.write("Find hospitals near your location based on OpenStreetMap data.")
-    location = st.text_input("Enter your city or address")
-    if st.button("Find Hospitals"):
-        if not location.strip():
-            st.error("Please enter a valid location.")
-            return
-        lat, lon = geocode_location(location)
-        if lat is None or lon is None:
-            st.error("Failed to find coordinates for the location. Please try another location.")
-            return
-        st.success(f"Location found: Latitude {lat:.5f}, Longitude {lon:.5f}")
-        hospitals = get_nearby_hospitals(lat, lon)
-        if hospitals:
-            st.success(f"Found {len(hospitals)} hospitals within 5 km of {location}:")
-            for hos in hospitals[:10]:
-                st.write(f"- **{hos['name']}** (Lat: {hos['lat']:.5f}, Lon: {hos['lon']:.5f})")
-            display_hospitals_map(hospitals, lat, lon)
-        else:
-            st.warning(f"No hospitals found within 5 km of {location}.")
-
     st.info(
         """
         Emergency Numbers in India: \n
@@ -429,6 +359,41 @@ def emergency_support():
         In case of emergency, please call these numbers immediately.
         """
     )
+    st.write("Find hospitals near your location based on OpenStreetMap data.")
+    location = location_input("Enter your city or address", key="emergency_location")
+    col1, col2 = st.columns(2)
+    emergency_only = col1.checkbox("Emergency department only")
+    open_24_7 = col2.checkbox("Open 24/7")
+    lightweight_map = st.checkbox("Lightweight map (for slow connections)")
+    if st.button("Find Hospitals"):
+        if not location.strip():
+            st.error("Please enter a valid location.")
+            return
+        with st.spinner("Searching local data, OpenStreetMap and the web..."):
+            result = emergency_lookup(location, api_key=st.secrets.get("GOOGLE_API_KEY"),
+                                      emergency_only=emergency_only, open_24_7=open_24_7)
+        if result["lat"] is None and "geocoding" not in result["pending"]:
+            st.error("Failed to find coordinates for the location. Please try another location.")
+        elif result["lat"] is not None:
+            st.success(f"Location found: Latitude {result['lat']:.5f}, Longitude {result['lon']:.5f}")
+        hospitals = result["hospitals"]
+        if hospitals:
+            st.success(f"The {len(hospitals)} nearest hospitals to {location}, "
+                       f"up to {hospitals[-1]['distance_m'] / 1000:.1f} km away:")
+            if result["expansions"]:
+                st.caption(f"Search radius widened {result['expansions']} times to find them.")
+            for hos in hospitals:
+                st.write(f"- **{hos['name']}** — {hos['distance_m'] / 1000:.1f} km, "
+                         f"about {hos['eta_minutes']:.0f} min by road")
+            display_hospitals_map(hospitals, result["lat"], result["lon"], lightweight=lightweight_map)
+        elif result["lat"] is not None:
+            st.warning(f"No hospitals found near {location} yet.")
+        if result["advice"]:
+            with st.expander("More emergency options from the web"):
+                st.markdown(result["advice"])
+        if result["pending"]:
+            st.caption(f"Still waiting on: {', '.join(result['pending'])}. Search again in a moment for fuller results.")
+
     if st.button("Call Ambulance (108)"):
         st.write("Please call 108 immediately for ambulance services in India.")
 
@@ -0,0 +1,10 @@
+-- Lets supabase_outbox retry a batch whose response was lost without inserting it twice:
+-- entries are upserted with on_conflict=idempotency_key and ignore_duplicates.
+alter table symptom_entries add column if not exists idempotency_key text;
+create unique index if not exists symptom_entries_idempotency_key on symptom_entries (idempotency_key);
+
+alter table mental_health_chats add column if not exists idempotency_key text;
+create unique index if not exists mental_health_chats_idempotency_key on mental_health_chats (idempotency_key);
+
+alter table appointments add column if not exists idempotency_key text;
+create unique index if not exists appointments_idempotency_key on appointments (idempotency_key);
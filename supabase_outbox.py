@@ -0,0 +1,239 @@
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+import supabase_store
+
+# Durable write-behind queue for Supabase inserts. Tables with a unique `idempotency_key` text
+# column (supabase/migrations/20261019000000_outbox_idempotency_key.sql) are upserted on it, so a
+# batch retried after a lost response is not inserted twice; tables without it get plain inserts.
+OUTBOX_PATH = "supabase_outbox.db"
+FLUSH_BATCH_SIZE = 200
+FLUSH_INTERVAL_SECONDS = 2
+MAX_BACKOFF_SECONDS = 300
+# With backoff capped at MAX_BACKOFF_SECONDS this is roughly an hour of retries before an entry is
+# parked for review (see parked_entries / requeue_parked) instead of retried.
+MAX_ATTEMPTS = 20
+# A table found without the idempotency_key column is probed again after this long, so applying
+# the migration takes effect without a restart.
+IDEMPOTENCY_RECHECK_SECONDS = 300
+
+logger = logging.getLogger(__name__)
+
+_wake = threading.Event()
+_worker_lock = threading.Lock()
+_worker_started = False
+_idempotency_columns = {}
+
+
+def _connect():
+    conn = sqlite3.connect(OUTBOX_PATH, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def init_outbox():
+    conn = _connect()
+    conn.execute("""
+                 CREATE TABLE IF NOT EXISTS outbox
+                 (
+                     seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                     idempotency_key TEXT NOT NULL UNIQUE,
+                     table_name TEXT NOT NULL,
+                     user_id INTEGER,
+                     payload TEXT NOT NULL,
+                     attempts INTEGER NOT NULL DEFAULT 0,
+                     next_attempt_at REAL NOT NULL DEFAULT 0,
+                     last_error TEXT,
+                     parked_at REAL
+                 )
+                 """)
+    if "parked_at" not in [row["name"] for row in conn.execute("PRAGMA table_info(outbox)")]:
+        conn.execute("ALTER TABLE outbox ADD COLUMN parked_at REAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_user ON outbox (user_id, seq)")
+    conn.commit()
+    conn.close()
+
+
+def enqueue(table, data):
+    idempotency_key = str(uuid.uuid4())
+    conn = _connect()
+    conn.execute(
+        "INSERT INTO outbox (idempotency_key, table_name, user_id, payload) VALUES (?, ?, ?, ?)",
+        (idempotency_key, table, data.get("user_id"),
+         json.dumps({**data, "idempotency_key": idempotency_key}, default=str))
+    )
+    conn.commit()
+    conn.close()
+    _wake.set()
+    return idempotency_key
+
+
+def pending_count(user_id=None):
+    conn = _connect()
+    if user_id is None:
+        count = conn.execute("SELECT COUNT(*) FROM outbox WHERE parked_at IS NULL").fetchone()[0]
+    else:
+        count = conn.execute(
+            "SELECT COUNT(*) FROM outbox WHERE user_id = ? AND parked_at IS NULL", (user_id,)
+        ).fetchone()[0]
+    conn.close()
+    return count
+
+
+def parked_entries(user_id=None):
+    conn = _connect()
+    if user_id is None:
+        rows = conn.execute("SELECT * FROM outbox WHERE parked_at IS NOT NULL ORDER BY seq").fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM outbox WHERE parked_at IS NOT NULL AND user_id = ? ORDER BY seq", (user_id,)
+        ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def requeue_parked(seq=None, user_id=None):
+    # Gives parked entries (all, one seq, or one user's) a fresh set of attempts.
+    conn = _connect()
+    cursor = conn.execute(
+        "UPDATE outbox SET parked_at = NULL, attempts = 0, next_attempt_at = 0 "
+        "WHERE parked_at IS NOT NULL AND (? IS NULL OR seq = ?) AND (? IS NULL OR user_id = ?)",
+        (seq, seq, user_id, user_id)
+    )
+    conn.commit()
+    conn.close()
+    _wake.set()
+    return cursor.rowcount
+
+
+def _has_idempotency_key(table):
+    # Feature-detected per table, so the outbox also works before the migration is applied. Only a
+    # present column is cached for good; a missing one is looked up again later.
+    present = _idempotency_columns.get(table)
+    if present is True or (present is not None and time.time() < present):
+        return present is True
+    try:
+        supabase_store.get_client().table(table).select("idempotency_key").limit(1).execute()
+    except Exception as e:
+        if "idempotency_key" not in str(e):
+            raise
+        _idempotency_columns[table] = time.time() + IDEMPOTENCY_RECHECK_SECONDS
+        return False
+    _idempotency_columns[table] = True
+    return True
+
+
+def _send(table, rows):
+    payloads = [json.loads(row["payload"]) for row in rows]
+    query = supabase_store.get_client().table(table)
+    if _has_idempotency_key(table):
+        query.upsert(payloads, on_conflict="idempotency_key", ignore_duplicates=True).execute()
+    else:
+        query.insert([{key: value for key, value in payload.items() if key != "idempotency_key"}
+                      for payload in payloads]).execute()
+
+
+def _record_failure(conn, row, error):
+    attempts = row["attempts"] + 1
+    conn.execute(
+        "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ?, parked_at = ? WHERE seq = ?",
+        (attempts, time.time() + min(MAX_BACKOFF_SECONDS, 2 ** row["attempts"]), str(error),
+         time.time() if attempts >= MAX_ATTEMPTS else None, row["seq"])
+    )
+    conn.commit()
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE):
+    # FIFO per user, not globally: an entry that is backing off only holds back later entries of
+    # the same user, and once parked it holds back nothing.
+    conn = _connect()
+    rows = conn.execute(
+        """
+        SELECT * FROM outbox o
+        WHERE o.parked_at IS NULL AND NOT EXISTS (
+            SELECT 1 FROM outbox b
+            WHERE b.user_id IS o.user_id AND b.seq <= o.seq AND b.parked_at IS NULL AND b.next_attempt_at > ?
+        )
+        ORDER BY o.seq
+        LIMIT ?
+        """,
+        (time.time(), batch_size)
+    ).fetchall()
+    flushed = 0
+    blocked = set()
+    for table, group in itertools.groupby(rows, key=lambda row: row["table_name"]):
+        pending = [row for row in group if row["user_id"] not in blocked]
+        delivered, failed = [], False
+        while pending:
+            try:
+                _send(table, pending)
+            except Exception:
+                # Find the culprit from the front: the head alone either goes through, and the rest
+                # is retried, or it is the failing entry and only its user waits.
+                head = pending[0]
+                try:
+                    _send(table, [head])
+                except Exception as e:
+                    _record_failure(conn, head, e)
+                    blocked.add(head["user_id"])
+                    failed = True
+                    break
+                delivered.append(head)
+                pending = [row for row in pending[1:] if row["user_id"] not in blocked]
+            else:
+                delivered += pending
+                break
+        conn.executemany("DELETE FROM outbox WHERE seq = ?", [(row["seq"],) for row in delivered])
+        conn.commit()
+        for user_id in {row["user_id"] for row in delivered}:
+            supabase_store.invalidate_history(user_id)
+        flushed += len(delivered)
+        if failed:
+            # Possibly an outage rather than one bad entry: leave the rest for the next pass.
+            break
+    conn.close()
+    return flushed
+
+
+def _flush_loop():
+    while True:
+        _wake.wait(FLUSH_INTERVAL_SECONDS)
+        _wake.clear()
+        try:
+            while flush():
+                pass
+        except Exception:
+            # Entries stay queued; the next wake-up tries again.
+            logger.exception("Flushing the Supabase outbox failed")
+
+
+def start_outbox_worker():
+    global _worker_started
+    with _worker_lock:
+        if _worker_started:
+            return
+        _worker_started = True
+    init_outbox()
+    threading.Thread(target=_flush_loop, name="supabase-outbox", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Run next to the app; its worker picks requeued entries up on the next pass.
+    if sys.argv[1:] == ["parked"]:
+        init_outbox()
+        for entry in parked_entries():
+            print(f"{entry['seq']}: {entry['table_name']} user {entry['user_id']}, {entry['attempts']} attempts, "
+                  f"last error: {entry['last_error']}")
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "requeue":
+        init_outbox()
+        print(f"Requeued {requeue_parked(int(sys.argv[2]) if len(sys.argv) == 3 else None)} entries.")
+    else:
+        sys.exit("usage: python supabase_outbox.py parked | requeue [seq]")
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+HISTORY_TABLES = ["symptom_entries", "mental_health_chats", "appointments"]
+# The sidebar reloads history on every rerun; a short TTL absorbs bursts of reruns per user.
+HISTORY_TTL_SECONDS = 30
+HISTORY_PAGE_SIZE = 5
+
+# List views never need the long AI responses; those are loaded per record on demand.
+LIST_COLUMNS = {
+    "symptom_entries": "id, user_id, created_at, symptoms",
+    "mental_health_chats": "id, user_id, created_at, user_text, sentiment",
+    "appointments": "id, user_id, created_at, specialty, location, date, time, status",
+}
+BODY_COLUMNS = {
+    "symptom_entries": "id, response",
+    "mental_health_chats": "id, bot_response",
+}
+BODY_CACHE_SIZE = 2000
+# Rows per multi-row insert for bulk imports; keeps each request body well under PostgREST limits.
+INSERT_BATCH_SIZE = 500
+# History fetches are pure network waits; four per cache miss, so size for ~8 concurrent misses.
+HISTORY_FETCH_WORKERS = 32
+
+_client = None
+_executor = ThreadPoolExecutor(max_workers=HISTORY_FETCH_WORKERS, thread_name_prefix="supabase-history")
+_history_lock = threading.Lock()
+_history_cache = {}
+_history_versions = {}
+_body_lock = threading.Lock()
+_body_cache = OrderedDict()
+
+
+class PartialSaveError(Exception):
+    # A bulk insert failed after its first `saved` rows had already been written.
+    def __init__(self, error, saved):
+        super().__init__(str(error))
+        self.saved = saved
+
+
+def configure(client):
+    global _client
+    _client = client
+
+
+def get_client():
+    if _client is None:
+        raise RuntimeError("supabase_store.configure(client) must be called before use.")
+    return _client
+
+
+def save_record(table, data):
+    response = get_client().table(table).insert(data).execute()
+    record_id = response.data[0]["id"] if response.data else None
+    invalidate_history(record_id if table == "users" else data.get("user_id"))
+    return record_id
+
+
+def save_records(table, rows, batch_size=INSERT_BATCH_SIZE):
+    # Bulk inserts of new rows; nothing cached can refer to them yet, so no invalidation. Each
+    # batch commits on its own, so a failure says how many leading rows are already stored.
+    record_ids = []
+    for start in range(0, len(rows), batch_size):
+        try:
+            response = get_client().table(table).insert(rows[start:start + batch_size]).execute()
+        except Exception as e:
+            raise PartialSaveError(e, start) from e
+        record_ids.extend(row["id"] for row in response.data or [])
+    return record_ids
+
+
+def fetch_records(table, user_id, limit=None, cursor=None, columns=None):
+    query = (get_client().table(table).select(columns or LIST_COLUMNS.get(table, "*")).eq("user_id", user_id)
+             .order("created_at", desc=True).order("id", desc=True))
+    if cursor is not None:
+        # Keyset on (created_at, id): rows strictly older than the last row of the previous page.
+        created_at, record_id = cursor
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{record_id})')
+    if limit:
+        query = query.limit(limit)
+    response = query.execute()
+    return response.data if response.data else []
+
+
+def iter_records_since(table, user_id, after_id=None, chunk_size=500):
+    # Full rows in insert order, after `after_id`, used to extend report snapshots. The id is
+    # assigned by the server; created_at is set by the client and outbox rows can arrive long
+    # after it, so it would skip them.
+    while True:
+        query = get_client().table(table).select("*").eq("user_id", user_id).order("id").limit(chunk_size)
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        rows = query.execute().data or []
+        if rows:
+            yield rows
+            after_id = rows[-1]["id"]
+        if len(rows) < chunk_size:
+            return
+
+
+def next_cursor(rows, limit=HISTORY_PAGE_SIZE):
+    if not limit or len(rows) < limit:
+        return None
+    return rows[-1]["created_at"], rows[-1]["id"]
+
+
+def fetch_record_bodies(table, record_ids):
+    # Bodies never change after insert, so they are cached until evicted by size.
+    with _body_lock:
+        bodies = {record_id: _body_cache[(table, record_id)] for record_id in record_ids
+                  if (table, record_id) in _body_cache}
+    missing = [record_id for record_id in record_ids if record_id not in bodies]
+    if missing:
+        rows = get_client().table(table).select(BODY_COLUMNS[table]).in_("id", missing).execute().data or []
+        with _body_lock:
+            for row in rows:
+                bodies[row["id"]] = _body_cache[(table, row["id"])] = row
+                _body_cache.move_to_end((table, row["id"]))
+            while len(_body_cache) > BODY_CACHE_SIZE:
+                _body_cache.popitem(last=False)
+    return bodies
+
+
+def fetch_user(user_id):
+    res = get_client().table("users").select("*").eq("id", user_id).single().execute()
+    return res.data
+
+
+def invalidate_history(user_id):
+    if user_id is None:
+        return
+    with _history_lock:
+        _history_cache.pop(user_id, None)
+        _history_versions[user_id] = _history_versions.get(user_id, 0) + 1
+
+
+def history_version(user_id):
+    # Bumped whenever the user's cached history is dropped, so callers can reset derived state.
+    with _history_lock:
+        return _history_versions.get(user_id, 0)
+
+
+def get_user_history(user_id):
+    with _history_lock:
+        cached = _history_cache.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        version = _history_versions.get(user_id, 0)
+    # One round trip of wall time instead of four: the user row and each table load in parallel.
+    user_future = _executor.submit(fetch_user, user_id)
+    record_futures = [_executor.submit(fetch_records, table, user_id, HISTORY_PAGE_SIZE) for table in HISTORY_TABLES]
+    history = (user_future.result(), *[future.result() for future in record_futures])
+    with _history_lock:
+        # A save that landed while we were fetching makes this result stale; don't cache it.
+        if _history_versions.get(user_id, 0) == version:
+            _history_cache[user_id] = (time.monotonic() + HISTORY_TTL_SECONDS, history)
+    return history
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parmatma_db  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # A fresh unsharded database per test; sharded tests raise SHARD_COUNT and call init_db() again.
+    monkeypatch.setattr(parmatma_db, "DB_PATH", str(tmp_path / "parmatma.db"))
+    monkeypatch.setattr(parmatma_db, "SHARD_COUNT", 1)
+    parmatma_db._user_shards.clear()
+    parmatma_db.init_db()
+    yield parmatma_db
+    parmatma_db._user_shards.clear()
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+import parmatma_db
+
+PROFILE = {"name": "Asha", "age": 30, "gender": "Female", "height": 160.0, "weight": 55.0}
+
+
+class _Stop(Exception):
+    pass
+
+
+def _backdate(table, days):
+    conn = parmatma_db.get_connection()
+    conn.execute(f"UPDATE {table} SET timestamp = datetime('now', ?)", (f"-{days} days",))
+    conn.commit()
+    conn.close()
+
+
+def test_archived_entries_stay_in_history_and_rollups(db):
+    user_id = db.save_personal_details_to_db(PROFILE)
+    db.save_symptom_entry(user_id, "cough", "rest")
+    db.save_mental_health_entry(user_id, "old", 0.4, "")
+    _backdate("symptom_entries", 120)
+    _backdate("mental_health_entries", 120)
+    db.rebuild_sentiment_rollups(user_id)
+    db.save_mental_health_entry(user_id, "new", -0.2, "")
+
+    assert db.archive_old_entries() == 2
+    assert db.storage_report()["archived_rows"] == 2
+    symptoms, mental = db.load_user_history(user_id)
+    assert symptoms == [] and [row["mood_note"] for row in mental] == ["new"]
+    symptoms, mental = db.load_user_history(user_id, include_archived=True)
+    assert all(type(row) is dict for row in symptoms + mental)
+    assert [row["symptoms"] for row in symptoms] == ["cough"]
+    assert [row["mood_note"] for row in mental] == ["new", "old"]
+
+    db.rebuild_sentiment_rollups(user_id)
+    assert sum(bucket["count"] for bucket in db.load_sentiment_trend(user_id)) == 2
+    exported = [row for chunk in db.iter_user_history_chunks(user_id, chunk_size=1) for row in chunk]
+    assert sorted(row["record_type"] for row in exported) == [
+        "mental_health_entries", "mental_health_entries", "symptom_entries"]
+
+
+def test_schema_setup_runs_once_per_file(db):
+    conn = db.get_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    # Would be cleared by the legacy-key migration if it ran again.
+    conn.execute("INSERT INTO users (name, user_key) VALUES ('Legacy', 'legacy|male')")
+    conn.commit()
+    conn.close()
+    db.init_db()
+    conn = db.get_connection()
+    assert conn.execute("SELECT user_key FROM users WHERE name = 'Legacy'").fetchone()[0] == "legacy|male"
+    conn.close()
+
+
+def test_existing_file_is_vacuumed_only_on_request(db, tmp_path, monkeypatch):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, user_key TEXT)")
+    conn.execute("INSERT INTO users (name, user_key) VALUES ('Rahul', 'rahul|male')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.init_db()
+    conn = db.get_connection()
+    assert conn.execute("SELECT user_key FROM users").fetchone()[0] is None
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    conn.close()
+    assert db.enable_incremental_vacuum() == 1
+    assert db.enable_incremental_vacuum() == 0
+
+
+def test_archive_loop_survives_a_failed_run(monkeypatch):
+    calls = []
+
+    def archive():
+        calls.append(None)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return 0
+
+    def sleep(seconds):
+        if len(calls) == 2:
+            raise _Stop
+
+    monkeypatch.setattr(parmatma_db, "archive_old_entries", archive)
+    monkeypatch.setattr(parmatma_db.time, "sleep", sleep)
+    with pytest.raises(_Stop):
+        parmatma_db._archive_loop(0)
+    assert len(calls) == 2
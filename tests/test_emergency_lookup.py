@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+import emergency_lookup  # noqa: E402
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    monkeypatch.setattr(emergency_lookup, "_recent", {})
+    calls = {"gemini": 0, "live": 0}
+    gemini_done = threading.Event()
+
+    def grounded_search(location, api_key):
+        calls["gemini"] += 1
+        gemini_done.wait(5)
+        return "Call 108."
+
+    def nearest_hospitals(lat, lon, k, emergency_only=False, open_24_7=False):
+        calls["live"] += 1
+        return [], 0
+
+    monkeypatch.setattr(emergency_lookup, "grounded_search", grounded_search)
+    monkeypatch.setattr(emergency_lookup, "geocode_location", lambda location: (19.0, 73.0))
+    monkeypatch.setattr(emergency_lookup, "nearest_hospitals", nearest_hospitals)
+    monkeypatch.setattr(emergency_lookup.hospital_index, "facilities_within", lambda *args: [])
+    monkeypatch.setattr(emergency_lookup, "cached_facilities", lambda *args: [])
+    return calls, gemini_done
+
+
+def test_retry_collects_the_answer_that_missed_the_deadline(sources):
+    calls, gemini_done = sources
+    first = emergency_lookup.emergency_lookup("Pune", api_key="key", deadline=0.2)
+    assert first["pending"] == ["Gemini search"] and first["advice"] is None
+    gemini_done.set()
+    second = emergency_lookup.emergency_lookup(" pune, India", api_key="key", deadline=0.2)
+    assert second["advice"] == "Call 108." and second["pending"] == []
+    assert calls == {"gemini": 1, "live": 1}
+
+
+def test_reused_calls_expire(sources, monkeypatch):
+    calls, gemini_done = sources
+    gemini_done.set()
+    monkeypatch.setattr(emergency_lookup, "EMERGENCY_REUSE_SECONDS", 0)
+    emergency_lookup.emergency_lookup("Pune", api_key="key")
+    emergency_lookup.emergency_lookup("Pune", api_key="key")
+    assert calls == {"gemini": 2, "live": 2}
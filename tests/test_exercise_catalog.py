@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exercise_catalog import facet_values, find_exercises  # noqa: E402
+from workout_program import generate_program  # noqa: E402
+
+
+def _names(exercises):
+    return {exercise["name"] for exercise in exercises}
+
+
+def test_no_filters_returns_the_whole_catalog():
+    assert len(find_exercises()) == sum(1 for _ in find_exercises(equipment=facet_values("equipment")))
+
+
+def test_facets_intersect_and_values_within_a_facet_union():
+    core = find_exercises("male", ["core"])
+    beginner_core = find_exercises("male", ["core"], difficulty="beginner")
+    assert _names(beginner_core) < _names(core)
+    assert all(exercise["difficulty"] == "beginner" for exercise in beginner_core)
+    both = find_exercises("male", ["core"], difficulty=["beginner", "intermediate"])
+    assert _names(beginner_core) < _names(both) <= _names(core)
+
+
+def test_body_part_aliases_expand_to_catalog_parts():
+    upper = find_exercises("female", ["Upper Body"])
+    assert _names(upper) == _names(find_exercises("female", ["arms", "chest", "back", "shoulders"]))
+
+
+def test_equipment_filter_keeps_bodyweight_moves():
+    core = find_exercises("male", ["core"], equipment=["dumbbell"])
+    assert {exercise["equipment"] for exercise in core} <= {"dumbbell", "bodyweight"}
+    assert any(exercise["equipment"] == "bodyweight" for exercise in core)
+    assert not _names(find_exercises("male", ["core"], equipment=["barbell"])) - _names(
+        find_exercises("male", ["core"], equipment=["barbell", "bodyweight"]))
+
+
+def test_max_minutes_bounds_the_duration():
+    short = find_exercises("other", ["cardio"], max_minutes=10)
+    assert short and all(exercise["duration_minutes"] <= 10 for exercise in short)
+
+
+def test_machine_full_body_program_has_sessions():
+    program = generate_program("female", "Normal", "General fitness", ["Full Body"], equipment=("machine",),
+                               weeks=1)
+    days = [day for day in program[0]["days"] if not day["rest"]]
+    assert days and all(len(day["exercises"]) > 1 for day in days)
+    assert {item["equipment"] for day in days for item in day["exercises"]} <= {"machine", "bodyweight"}
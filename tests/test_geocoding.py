@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import geocoding  # noqa: E402
+
+
+@pytest.fixture
+def fetches(tmp_path, monkeypatch):
+    monkeypatch.setattr(geocoding, "GEOCODE_CACHE_PATH", str(tmp_path / "geocode.db"))
+    monkeypatch.setattr(geocoding, "_local", threading.local())
+    monkeypatch.setattr(geocoding, "_last_request_at", 0.0)
+    monkeypatch.setattr(geocoding.time, "sleep", lambda seconds: None)
+    calls = []
+    results = {"mg road, bengaluru": (12.97, 77.6), "nowhere, kerala": (None, None)}
+
+    def fetch(query_key):
+        calls.append(query_key)
+        if query_key not in results:
+            raise requests.ConnectionError("offline")
+        return results[query_key]
+
+    monkeypatch.setattr(geocoding, "_fetch", fetch)
+    return calls
+
+
+def test_normalize_query_folds_aliases_punctuation_and_country():
+    assert geocoding.normalize_query("  M.G. Road,  Bangalore , India") == "m g road, bengaluru"
+    assert geocoding.normalize_query("Bombay") == "mumbai"
+    assert geocoding.normalize_query("India") == "india"
+
+
+def test_known_places_skip_nominatim(fetches):
+    assert geocoding.geocode_location("Poona") == geocoding.geocode_location("Pune")
+    assert fetches == []
+
+
+def test_spellings_of_one_query_share_a_cache_entry(fetches):
+    assert geocoding.geocode_location("MG Road, Bangalore") == (12.97, 77.6)
+    assert geocoding.geocode_location("mg road, Bengaluru, India") == (12.97, 77.6)
+    assert fetches == ["mg road, bengaluru"]
+
+
+def test_not_found_is_cached_but_network_errors_are_not(fetches):
+    assert geocoding.geocode_location("Nowhere, Kerala") == (None, None)
+    assert geocoding.geocode_location("Nowhere, Kerala") == (None, None)
+    assert geocoding.geocode_location("Offline Town") == (None, None)
+    assert geocoding.geocode_location("Offline Town") == (None, None)
+    assert fetches == ["nowhere, kerala", "offline town", "offline town"]
+
+
+def test_expired_entries_are_fetched_again(fetches, monkeypatch):
+    geocoding.geocode_location("Nowhere, Kerala")
+    now = geocoding.time.time()
+    monkeypatch.setattr(geocoding.time, "time", lambda: now + geocoding.GEOCODE_NEGATIVE_TTL_SECONDS + 1)
+    geocoding.geocode_location("Nowhere, Kerala")
+    assert fetches == ["nowhere, kerala", "nowhere, kerala"]
+
+
+def test_misses_are_spaced_by_the_rate_limit(fetches, monkeypatch):
+    waits = []
+    monkeypatch.setattr(geocoding.time, "sleep", waits.append)
+    geocoding.geocode_location("MG Road, Bangalore")
+    geocoding.geocode_location("Nowhere, Kerala")
+    assert len(waits) == 1 and 0 < waits[0] <= geocoding.NOMINATIM_MIN_INTERVAL_SECONDS
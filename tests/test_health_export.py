@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import health_export  # noqa: E402
+from local_postgrest import LocalPostgrestClient  # noqa: E402
+
+COLUMNS = [("record_type", "str"), ("id", "int"), ("note", "str")]
+CHUNKS = [
+    [{"record_type": "mental_health_entries", "id": 1, "note": "calm"}],
+    [{"record_type": "mental_health_entries", "id": 2, "note": "tired, but ok"}],
+]
+
+
+def _as_download(data):
+    # The conversion st.download_button applies to non-callable data.
+    download_data_util = pytest.importorskip("streamlit.runtime.download_data_util")
+    return download_data_util.convert_data_to_bytes_and_infer_mime(data, unsupported_error=TypeError())[0]
+
+
+def test_csv_export_round_trips():
+    data = health_export.export_bytes(iter(CHUNKS), "csv", COLUMNS)
+    assert isinstance(data, bytes)
+    rows = list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+    assert [(row["id"], row["note"]) for row in rows] == [("1", "calm"), ("2", "tired, but ok")]
+
+
+def test_jsonl_export_round_trips():
+    data = health_export.export_bytes(iter(CHUNKS), "jsonl", COLUMNS)
+    assert [json.loads(line) for line in data.decode("utf-8").splitlines()] == [row for chunk in CHUNKS
+                                                                                 for row in chunk]
+
+
+def test_export_spilled_to_disk_reads_back_whole(monkeypatch):
+    monkeypatch.setattr(health_export, "EXPORT_SPOOL_BYTES", 64)
+    chunks = [[{"record_type": "symptom_entries", "id": i, "note": "x" * 50}] for i in range(100)]
+    data = health_export.export_bytes(iter(chunks), "jsonl", COLUMNS)
+    assert [json.loads(line)["id"] for line in data.decode("utf-8").splitlines()] == list(range(100))
+
+
+def test_parquet_export_round_trips():
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = health_export.export_bytes(iter(CHUNKS), "parquet", COLUMNS)
+    assert pq.read_table(io.BytesIO(data)).column("note").to_pylist() == ["calm", "tired, but ok"]
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        health_export.export_bytes(iter(CHUNKS), "xml", COLUMNS)
+
+
+def test_postgrest_chunks_page_through_every_row(tmp_path):
+    client = LocalPostgrestClient(str(tmp_path / "supabase.db"))
+    client.table("symptom_entries").insert([{"user_id": user_id, "symptoms": str(i)}
+                                            for i in range(7) for user_id in (1, 2)]).execute()
+    chunks = list(health_export.iter_postgrest_chunks(client, "symptom_entries", 1, chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [row["symptoms"] for chunk in chunks for row in chunk] == [str(i) for i in range(7)]
+    assert {row["record_type"] for chunk in chunks for row in chunk} == {"symptom_entries"}
+
+
+def test_csv_export_is_accepted_by_download_button():
+    data = _as_download(health_export.export_bytes(iter(CHUNKS), "csv", COLUMNS))
+    assert data.decode("utf-8").splitlines()[0] == "record_type,id,note"
+
+
+def test_spooled_file_is_not_download_data():
+    with health_export.export_history(iter(CHUNKS), "csv", COLUMNS) as fileobj:
+        with pytest.raises(TypeError):
+            _as_download(fileobj)
@@ -0,0 +1,40 @@
+import pytest
+
+import health_report
+import supabase_store
+from local_postgrest import LocalPostgrestClient
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    client = LocalPostgrestClient(str(tmp_path / "supabase.db"))
+    monkeypatch.setattr(supabase_store, "_client", client)
+    monkeypatch.setattr(health_report, "_snapshots", health_report.OrderedDict())
+    monkeypatch.setattr(health_report, "_user_locks", {})
+    client.table("users").insert({"name": "Asha", "age": 30, "gender": "Female", "height": 160,
+                                  "weight": 55}).execute()
+    return client
+
+
+def _symptom(client, text, created_at):
+    client.table("symptom_entries").insert({"user_id": 1, "symptoms": text, "response": "",
+                                            "created_at": created_at}).execute()
+
+
+def test_rows_synced_late_still_reach_the_report(client):
+    _symptom(client, "fever", "2026-05-02T10:00:00")
+    assert "fever" in health_report.build_report(1, "Markdown")
+    # Written offline on May 1st and delivered by the outbox after the first report was built.
+    _symptom(client, "headache", "2026-05-01T08:00:00")
+    report = health_report.build_report(1, "Markdown")
+    assert report.index("headache") < report.index("fever")
+    _symptom(client, "cough", "2026-05-03T09:00:00")
+    report = health_report.build_report(1, "Markdown")
+    assert report.index("headache") < report.index("fever") < report.index("cough")
+
+
+def test_profile_edits_invalidate_the_cached_report(client):
+    assert "Age 30" in health_report.build_report(1, "Text")
+    client.table("users").upsert({"id": 1, "name": "Asha", "age": 31, "gender": "Female", "height": 160,
+                                  "weight": 54}, on_conflict="id").execute()
+    assert "Age 31" in health_report.build_report(1, "Text")
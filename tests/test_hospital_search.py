@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+import hospital_search  # noqa: E402
+
+
+@pytest.fixture
+def overpass(monkeypatch):
+    monkeypatch.setattr(hospital_search, "_tiles", hospital_search.OrderedDict())
+    monkeypatch.setattr(hospital_search, "_inflight", {})
+    state = {"calls": [], "release": threading.Event(), "fail": False}
+    state["release"].set()
+
+    def fetch(tiles):
+        state["calls"].append(sorted(tiles))
+        if len(state["calls"]) == 1:
+            state["release"].wait(5)
+        if state["fail"]:
+            return None
+        return {tile: [{"name": tile, "kind": "hospital"}] for tile in tiles}
+
+    monkeypatch.setattr(hospital_search, "fetch_overpass_tiles", fetch)
+    return state
+
+
+def _names(facilities):
+    return sorted(facility["name"] for facility in facilities)
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_overlapping_searches_fetch_each_tile_once(overpass):
+    overpass["release"].clear()
+    results = {}
+    first = threading.Thread(target=lambda: results.update(a=hospital_search.tile_facilities(["t1", "t2"])))
+    first.start()
+    _wait_for(lambda: overpass["calls"])
+    second = threading.Thread(target=lambda: results.update(b=hospital_search.tile_facilities(["t2", "t3"])))
+    third = threading.Thread(target=lambda: results.update(c=hospital_search.tile_facilities(["t1"])))
+    second.start()
+    third.start()
+    _wait_for(lambda: len(overpass["calls"]) == 2)
+    time.sleep(0.05)
+    overpass["release"].set()
+    for thread in (first, second, third):
+        thread.join(5)
+    assert overpass["calls"] == [["t1", "t2"], ["t3"]]
+    assert (_names(results["a"]), _names(results["b"]), _names(results["c"])) == (
+        ["t1", "t2"], ["t2", "t3"], ["t1"])
+    assert hospital_search._inflight == {}
+
+
+def test_cached_tiles_are_not_fetched_again(overpass):
+    hospital_search.tile_facilities(["t1", "t2"])
+    assert _names(hospital_search.tile_facilities(["t2", "t3"])) == ["t2", "t3"]
+    assert overpass["calls"] == [["t1", "t2"], ["t3"]]
+
+
+def test_failed_fetch_is_not_cached(overpass):
+    overpass["fail"] = True
+    assert hospital_search.tile_facilities(["t1"]) == []
+    overpass["fail"] = False
+    assert _names(hospital_search.tile_facilities(["t1"])) == ["t1"]
+    assert hospital_search._inflight == {}
+
+
+ORIGIN = (19.0, 73.0)
+
+
+def _hospital(osm_id, km_north, **tags):
+    return {"osm_type": "node", "osm_id": osm_id, "kind": "hospital", "name": f"H{osm_id}",
+            "lat": ORIGIN[0] + km_north / 111.2, "lon": ORIGIN[1], "phone": None, "address": None,
+            "emergency": tags.get("emergency"), "opening_hours": None}
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    import hospital_index
+
+    monkeypatch.setattr(hospital_index, "HOSPITAL_INDEX_PATH", str(tmp_path / "hospitals.db"))
+    monkeypatch.setattr(hospital_index, "_local", threading.local())
+    hospital_index.upsert_facilities([_hospital(1, 1), _hospital(2, 3, emergency="yes"), _hospital(3, 7),
+                                      _hospital(4, 30)])
+    return hospital_index
+
+
+@pytest.mark.parametrize("k, names, expansions", [
+    (1, ["H1"], 0),
+    (2, ["H1", "H2"], 1),
+    (3, ["H1", "H2", "H3"], 2),
+    (5, ["H1", "H2", "H3", "H4"], 5),
+])
+def test_nearest_hospitals_widen_until_k_are_inside(index, overpass, k, names, expansions):
+    hospitals, used = hospital_search.nearest_hospitals(*ORIGIN, k=k)
+    assert [hospital["name"] for hospital in hospitals] == names
+    assert used == expansions
+    assert [hospital["distance_m"] for hospital in hospitals] == sorted(h["distance_m"] for h in hospitals)
+    assert overpass["calls"] == []
+
+
+def test_nearest_hospitals_respect_max_radius_and_filters(index, overpass):
+    hospitals, used = hospital_search.nearest_hospitals(*ORIGIN, k=5, max_radius=5000)
+    assert [hospital["name"] for hospital in hospitals] == ["H1", "H2"] and used == 2
+    hospitals, _ = hospital_search.nearest_hospitals(*ORIGIN, k=1, emergency_only=True)
+    assert [hospital["name"] for hospital in hospitals] == ["H2"]
+
+
+def test_unindexed_area_falls_back_to_live_tiles(tmp_path, monkeypatch, overpass):
+    import hospital_index
+
+    monkeypatch.setattr(hospital_index, "HOSPITAL_INDEX_PATH", str(tmp_path / "empty.db"))
+    monkeypatch.setattr(hospital_index, "_local", threading.local())
+    monkeypatch.setattr(hospital_search, "fetch_overpass_tiles", lambda tiles: {
+        tile: [_hospital(9, 1)] if tile == hospital_search.geohash(ORIGIN[0] + 1 / 111.2, ORIGIN[1]) else []
+        for tile in tiles})
+    hospitals, used = hospital_search.nearest_hospitals(*ORIGIN, k=1)
+    assert [hospital["name"] for hospital in hospitals] == ["H9"] and used == 0
@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+import hospital_index  # noqa: E402
+import hospital_updater  # noqa: E402
+
+FEED = "https://example.org/updates"
+
+
+class _Stop(Exception):
+    pass
+
+
+def _osc(*actions):
+    return ("<osmChange version='0.6'>" + "".join(actions) + "</osmChange>").encode("utf-8")
+
+
+def _hospital_node(osm_id, name="City Hospital", lat=19.0, lon=73.0, action="create", amenity="hospital"):
+    return (f"<{action}><node id='{osm_id}' lat='{lat}' lon='{lon}'><tag k='amenity' v='{amenity}'/>"
+            f"<tag k='name' v='{name}'/></node></{action}>")
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(hospital_index, "HOSPITAL_INDEX_PATH", str(tmp_path / "hospitals.db"))
+    monkeypatch.setattr(hospital_index, "_local", threading.local())
+    monkeypatch.setattr(hospital_updater, "_resolve_centers", lambda elements: pytest.fail("asked Overpass"))
+    return hospital_index
+
+
+def test_creates_modifies_and_deletes_facilities(index):
+    hospital_updater.apply_osc(_osc(_hospital_node(1), _hospital_node(2, "Old Clinic", amenity="clinic")))
+    assert index.facility_count() == 2
+    hospital_updater.apply_osc(_osc(
+        _hospital_node(1, "City Hospital", lat=19.5, action="modify"),
+        "<delete><node id='2' lat='19.0' lon='73.0'/></delete>",
+        "<delete><node id='3' lat='19.0' lon='73.0'/></delete>",
+    ))
+    assert index.get_facility("node", 1)["lat"] == 19.5
+    assert index.get_facility("node", 2) is None
+    assert index.facility_count() == 1
+
+
+def test_losing_hospital_tags_removes_an_indexed_facility(index):
+    hospital_updater.apply_osc(_osc(_hospital_node(1)))
+    hospital_updater.apply_osc(_osc("<modify><node id='1' lat='19.0' lon='73.0'><tag k='shop' v='chemist'/>"
+                                    "</node></modify>"))
+    assert index.facility_count() == 0
+
+
+def test_ways_are_placed_from_diff_nodes_or_their_indexed_centre(index):
+    hospital_updater.apply_osc(_osc(
+        "<create><node id='10' lat='19.0' lon='73.0'/><node id='11' lat='19.2' lon='73.2'/>"
+        "<way id='5'><nd ref='10'/><nd ref='11'/><tag k='amenity' v='hospital'/></way></create>"))
+    assert (index.get_facility("way", 5)["lat"], index.get_facility("way", 5)["lon"]) == pytest.approx((19.1, 73.1))
+    # A tag-only edit lists node refs that are not in the diff.
+    hospital_updater.apply_osc(_osc("<modify><way id='5'><nd ref='10'/><nd ref='11'/><tag k='amenity' v='hospital'/>"
+                                    "<tag k='name' v='Renamed'/></way></modify>"))
+    assert index.get_facility("way", 5)["name"] == "Renamed"
+    assert index.get_facility("way", 5)["lat"] == pytest.approx(19.1)
+
+
+def test_unplaced_ways_are_resolved_through_overpass(index, monkeypatch):
+    monkeypatch.setattr(hospital_updater, "_resolve_centers", lambda elements: [
+        hospital_index.facility_from_element({**element, "center": {"lat": 18.0, "lon": 72.0}})
+        for element in elements])
+    hospital_updater.apply_osc(_osc("<create><way id='6'><nd ref='99'/><tag k='amenity' v='clinic'/></way></create>"))
+    assert index.get_facility("way", 6)["lat"] == 18.0
+
+
+def test_update_applies_diffs_in_order_and_keeps_the_checkpoint_on_failure(index, monkeypatch):
+    diffs = {11: _osc(_hospital_node(1)), 12: _osc(_hospital_node(2)), 13: b"<osmChange><create>"}
+    monkeypatch.setattr(hospital_updater, "remote_sequence", lambda base_url: 13)
+    monkeypatch.setattr(hospital_updater, "download_diff", lambda sequence, base_url: diffs[sequence])
+    hospital_updater.init_checkpoint(10, FEED)
+    with pytest.raises(Exception):
+        hospital_updater.update(FEED)
+    assert index.replication_sequence(FEED) == 12
+    assert index.facility_count() == 2
+    diffs[13] = _osc(_hospital_node(1, action="delete"))
+    assert hospital_updater.update(FEED) == 1
+    assert index.replication_sequence(FEED) == 13 and index.facility_count() == 1
+
+
+def test_update_without_a_checkpoint_does_nothing(index, monkeypatch):
+    monkeypatch.setattr(hospital_updater, "remote_sequence", lambda base_url: pytest.fail("contacted the feed"))
+    assert hospital_updater.update(FEED) == 0
+
+
+@pytest.mark.parametrize("error", [sqlite3.OperationalError("database is locked"), KeyError("lat")])
+def test_update_loop_survives_any_error(monkeypatch, error):
+    calls = []
+
+    def update():
+        calls.append(None)
+        raise error
+
+    def sleep(seconds):
+        if len(calls) == 2:
+            raise _Stop
+
+    monkeypatch.setattr(hospital_updater, "update", update)
+    monkeypatch.setattr(hospital_updater.time, "sleep", sleep)
+    with pytest.raises(_Stop):
+        hospital_updater._update_loop()
+    assert len(calls) == 2
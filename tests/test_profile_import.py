@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+pytest.importorskip("pandas")
+
+import profile_import  # noqa: E402
+
+CSV = """Name,Age,Gender,Height (cm),Weight (kg),Contact
+Asha,30,F,160,55,asha@x.com
+,,,,,
+Ravi,abc,Male,170,70,
+Meera,40,female,150,80,
+Kiran,25,m,180,75,kiran@x.com
+"""
+
+
+class SaveError(Exception):
+    def __init__(self, **attributes):
+        super().__init__("disk full")
+        self.__dict__.update(attributes)
+
+
+def _import(save_batch, chunk_size=10):
+    return profile_import.import_profiles(io.StringIO(CSV), "profiles.csv", save_batch, chunk_size=chunk_size)
+
+
+def test_validation_rejects_bad_rows_and_skips_blank_ones():
+    batches = []
+    summary = _import(batches.append)
+    assert summary["rows"] == 5
+    assert (summary["imported"], summary["rejected"]) == (3, 1)
+    assert summary["errors"][0]["row"] == 4
+    assert "age" in summary["errors"][0]["error"]
+    assert [(record["name"], record["gender"]) for record in batches[0]] == [
+        ("Asha", "Female"), ("Meera", "Female"), ("Kiran", "Male")]
+    assert summary["categories"]["Obese"] == 1
+
+
+@pytest.mark.parametrize("error, saved_names", [
+    (RuntimeError("disk full"), []),
+    (SaveError(saved=1), ["Asha"]),
+    (SaveError(saved_positions=[0, 2]), ["Asha", "Kiran"]),
+])
+def test_failed_save_reports_only_unsaved_rows(error, saved_names):
+    def save_batch(records):
+        raise error
+
+    summary = _import(save_batch)
+    not_saved = [entry["name"] for entry in summary["errors"] if entry["error"].startswith("not saved")]
+    assert summary["imported"] == len(saved_names)
+    assert sorted(not_saved + saved_names) == ["Asha", "Kiran", "Meera"]
+    assert summary["rejected"] == 1 + len(not_saved)
+
+
+def test_sharded_import_counts_rows_saved_before_a_shard_failed(db, monkeypatch):
+    monkeypatch.setattr(db, "SHARD_COUNT", 3)
+    db.init_db()
+    broken = db.shard_for_key("asha@x.com")
+    conn = db.get_connection(db.shard_path(broken))
+    conn.execute("DROP TABLE user_measurements")
+    conn.close()
+
+    summary = _import(db.save_personal_details_batch)
+    stored = []
+    for path in db.database_paths():
+        conn = db.get_connection(path)
+        stored += [row[0] for row in conn.execute("SELECT name FROM users")]
+        conn.close()
+    not_saved = [entry["name"] for entry in summary["errors"] if entry["error"].startswith("not saved")]
+    assert "Asha" in not_saved
+    assert summary["imported"] == len(stored)
+    assert sorted(stored + not_saved) == ["Asha", "Kiran", "Meera"]
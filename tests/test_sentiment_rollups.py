@@ -0,0 +1,52 @@
+import pytest
+
+import parmatma_db
+
+PROFILE = {"name": "Asha", "age": 30, "gender": "Female", "height": 160.0, "weight": 55.0}
+
+
+def _add_entry(user_id, sentiment, timestamp):
+    conn = parmatma_db.get_connection()
+    conn.execute("INSERT INTO mental_health_entries (user_id, mood_note, sentiment, response, timestamp) "
+                 "VALUES (?, '', ?, '', ?)", (user_id, sentiment, timestamp))
+    conn.commit()
+    conn.close()
+
+
+def test_saved_entries_update_the_day_and_week_buckets(db):
+    user_id = db.save_personal_details_to_db(PROFILE)
+    db.save_mental_health_entry(user_id, "good", 0.5, "")
+    db.save_mental_health_entry(user_id, "bad", -0.5, "")
+    db.save_mental_health_entry(user_id, "no score", None, "")
+    for period in db.ROLLUP_PERIODS:
+        [bucket] = db.load_sentiment_trend(user_id, period)
+        assert (bucket["count"], bucket["mean"], bucket["min"], bucket["max"]) == (2, 0.0, -0.5, 0.5)
+        assert bucket["ewma"] == pytest.approx(0.3 * -0.5 + 0.7 * 0.5)
+
+
+def test_rebuild_buckets_by_day_and_monday_week(db):
+    user_id = db.save_personal_details_to_db(PROFILE)
+    # 2026-03-01 is a Sunday; the other two days fall in the following week.
+    for sentiment, timestamp in ((0.2, "2026-03-01 09:00:00"), (0.4, "2026-03-02 09:00:00"),
+                                 (0.6, "2026-03-03 09:00:00")):
+        _add_entry(user_id, sentiment, timestamp)
+    db.rebuild_sentiment_rollups(user_id)
+    days = db.load_sentiment_trend(user_id, "day")
+    weeks = db.load_sentiment_trend(user_id, "week")
+    assert [day["bucket"] for day in days] == ["2026-03-01", "2026-03-02", "2026-03-03"]
+    assert [(week["bucket"], week["count"]) for week in weeks] == [("2026-02-23", 1), ("2026-03-02", 2)]
+    assert weeks[-1]["mean"] == pytest.approx(0.5)
+
+
+def test_rebuild_matches_incremental_rollups(db):
+    user_id = db.save_personal_details_to_db(PROFILE)
+    for sentiment in (0.1, -0.3, 0.8):
+        db.save_mental_health_entry(user_id, "", sentiment, "")
+    incremental = db.load_sentiment_trend(user_id)
+    db.rebuild_sentiment_rollups(user_id)
+    assert db.load_sentiment_trend(user_id) == incremental
+
+
+def test_unknown_period_is_rejected(db):
+    with pytest.raises(ValueError):
+        db.load_sentiment_trend(1, "month")
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+import parmatma_db
+
+PROFILE = {"name": "Asha", "age": 30, "gender": "Female", "height": 160.0, "weight": 55.0}
+
+
+def _tables(path):
+    conn = parmatma_db.get_connection(path)
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    conn.close()
+    return tables
+
+
+def _count(table):
+    total = 0
+    for path in parmatma_db.database_paths():
+        conn = parmatma_db.get_connection(path)
+        total += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        conn.close()
+    return total
+
+
+def _populate(db, users=6):
+    user_ids = []
+    for i in range(users):
+        user_id = db.save_personal_details_to_db({**PROFILE, "contact": f"user{i}@x.com"})
+        db.save_symptom_entry(user_id, f"symptom {i}", "rest")
+        db.save_mental_health_entry(user_id, f"mood {i}", 0.1 * i, "")
+        db.save_personal_details_to_db({**PROFILE, "weight": 60.0, "contact": f"user{i}@x.com"})
+        user_ids.append(user_id)
+    db.find_duplicate_users()
+    return user_ids
+
+
+@pytest.fixture
+def sharded(db, monkeypatch):
+    monkeypatch.setattr(db, "SHARD_COUNT", 3)
+    db.init_db()
+    return db
+
+
+def test_users_spread_over_shard_files(sharded):
+    user_ids = _populate(sharded)
+    assert len(set(user_ids)) == len(user_ids)
+    assert all(os.path.exists(path) for path in sharded.database_paths())
+    assert len({sharded._user_path(user_id) for user_id in user_ids}) > 1
+    for user_id in user_ids:
+        symptoms, mental = sharded.load_user_history(user_id)
+        assert len(symptoms) == len(mental) == 1
+        assert [row["weight"] for row in sharded.load_user_measurements(user_id)] == [55.0, 60.0]
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_iter_all_rows_covers_every_table(db, monkeypatch, shards):
+    monkeypatch.setattr(db, "SHARD_COUNT", shards)
+    db.init_db()
+    _populate(db)
+    for table in _tables(db.database_paths()[0]):
+        rows = [row for chunk in db.iter_all_rows(table, chunk_size=2) for row in chunk]
+        assert len(rows) == _count(table), table
+        assert {row["shard"] for row in rows} <= set(range(shards))
+    rollups = [row for chunk in db.iter_all_rows("sentiment_rollups", chunk_size=1) for row in chunk]
+    assert len({(row["user_id"], row["period"], row["bucket"]) for row in rollups}) == len(rollups) > 0
+
+
+def test_rebalance_keeps_every_user_and_row(db, monkeypatch):
+    user_ids = _populate(db)
+    before = {table: _count(table) for table in ("users", "symptom_entries", "mental_health_entries",
+                                                 "user_measurements", "sentiment_rollups")}
+    assert db.rebalance_shards(3) == len(user_ids)
+    monkeypatch.setattr(db, "SHARD_COUNT", 3)
+    assert {table: _count(table) for table in before} == before
+    for i, user_id in enumerate(user_ids):
+        assert db._user_path(user_id) == db.shard_path(db.shard_for_key(f"user{i}@x.com"))
+        assert db.save_personal_details_to_db({**PROFILE, "contact": f"user{i}@x.com"}) == user_id
+        assert len(db.load_user_history(user_id)[0]) == 1
+    new_id = db.save_personal_details_to_db({**PROFILE, "contact": "new@x.com"})
+    assert new_id not in user_ids
+
+
+def test_failed_shard_in_batch_reports_saved_rows(sharded):
+    contacts = [f"user{i}@x.com" for i in range(12)]
+    broken = sharded.shard_for_key(contacts[0])
+    conn = sharded.get_connection(sharded.shard_path(broken))
+    conn.execute("DROP TABLE user_measurements")
+    conn.close()
+    records = [{**PROFILE, "contact": contact} for contact in contacts] + [PROFILE] * 6
+
+    with pytest.raises(sharded.PartialSaveError) as error:
+        sharded.save_personal_details_batch(records)
+    saved = error.value.saved_positions
+    assert 0 not in saved
+    assert [i for i in saved if i < len(contacts)] == [
+        i for i, contact in enumerate(contacts) if sharded.shard_for_key(contact) != broken]
+    assert _count("users") == len(saved)
+
+    # The broken shard wrote nothing, and its anonymous users left no directory rows behind.
+    conn = sharded.get_connection()
+    anonymous = conn.execute("SELECT shard FROM user_shards WHERE user_key LIKE 'anon:%'").fetchall()
+    conn.close()
+    assert broken not in {row["shard"] for row in anonymous}
+    assert len(anonymous) == len([i for i in saved if i >= len(contacts)])
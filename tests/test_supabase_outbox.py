@@ -0,0 +1,137 @@
+import pytest
+
+import supabase_outbox
+import supabase_store
+from local_postgrest import LocalPostgrestClient, LocalPostgrestError, LocalQuery
+
+
+class _Stop(Exception):
+    pass
+
+
+class FlakyQuery(LocalQuery):
+    def execute(self):
+        if self._action == "insert" and any(row.get("symptoms") in self._client.bad for row in self._rows):
+            raise LocalPostgrestError("rejected")
+        if self._action == "select" and self._columns != "*":
+            # PostgREST rejects unknown columns; the SQLite stand-in would read them as literals.
+            existing = self._client._columns(self._client._connection(), self._table)
+            for column in self._columns.split(","):
+                if existing and column.strip() not in existing:
+                    raise LocalPostgrestError(f"column {self._table}.{column.strip()} does not exist")
+        return super().execute()
+
+
+class FlakyClient(LocalPostgrestClient):
+    def __init__(self, path):
+        super().__init__(path)
+        self.bad = set()
+
+    def table(self, name):
+        return FlakyQuery(self, name)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    client = FlakyClient(str(tmp_path / "supabase.db"))
+    monkeypatch.setattr(supabase_store, "_client", client)
+    monkeypatch.setattr(supabase_outbox, "OUTBOX_PATH", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(supabase_outbox, "_idempotency_columns", {})
+    supabase_outbox.init_outbox()
+    return client
+
+
+def _symptoms(client, user_id=None):
+    query = client.table("symptom_entries").select("symptoms").order("id")
+    if user_id is not None:
+        query = query.eq("user_id", user_id)
+    return [row["symptoms"] for row in query.execute().data]
+
+
+def _retry_now():
+    conn = supabase_outbox._connect()
+    conn.execute("UPDATE outbox SET next_attempt_at = 0")
+    conn.commit()
+    conn.close()
+
+
+def test_flush_delivers_in_order_and_empties_the_outbox(client):
+    for i in range(5):
+        supabase_outbox.enqueue("symptom_entries", {"user_id": 1, "symptoms": str(i)})
+    assert supabase_outbox.pending_count(1) == 5
+    assert supabase_outbox.flush(batch_size=2) == 2
+    assert supabase_outbox.flush() == 3
+    assert _symptoms(client) == ["0", "1", "2", "3", "4"]
+    assert supabase_outbox.pending_count() == 0
+
+
+def test_failing_entry_only_holds_back_its_own_user(client):
+    client.bad.add("bad")
+    supabase_outbox.enqueue("symptom_entries", {"user_id": 1, "symptoms": "bad"})
+    supabase_outbox.enqueue("symptom_entries", {"user_id": 1, "symptoms": "after bad"})
+    supabase_outbox.enqueue("symptom_entries", {"user_id": 2, "symptoms": "other user"})
+    supabase_outbox.flush()
+    supabase_outbox.flush()
+    assert _symptoms(client) == ["other user"]
+    assert supabase_outbox.pending_count(1) == 2
+
+
+def test_entries_park_after_max_attempts_and_can_be_requeued(client, monkeypatch):
+    monkeypatch.setattr(supabase_outbox, "MAX_ATTEMPTS", 2)
+    client.bad.add("bad")
+    supabase_outbox.enqueue("symptom_entries", {"user_id": 1, "symptoms": "bad"})
+    supabase_outbox.enqueue("symptom_entries", {"user_id": 1, "symptoms": "next"})
+    for _ in range(2):
+        supabase_outbox.flush()
+        _retry_now()
+    assert [entry["attempts"] for entry in supabase_outbox.parked_entries(1)] == [2]
+    # A parked entry no longer holds back the rest of its user's queue.
+    supabase_outbox.flush()
+    assert _symptoms(client) == ["next"]
+
+    client.bad.clear()
+    assert supabase_outbox.requeue_parked(user_id=2) == 0
+    assert supabase_outbox.requeue_parked(user_id=1) == 1
+    supabase_outbox.flush()
+    assert _symptoms(client) == ["next", "bad"]
+    assert supabase_outbox.parked_entries() == []
+
+
+def test_resent_batch_is_not_inserted_twice(client):
+    supabase_outbox.enqueue("symptom_entries", {"user_id": 1, "symptoms": "once"})
+    client.table("symptom_entries").insert({"user_id": 0, "symptoms": "seed", "idempotency_key": "seed"}).execute()
+    conn = supabase_outbox._connect()
+    rows = conn.execute("SELECT * FROM outbox").fetchall()
+    conn.close()
+    # As if the response to the first send was lost and the batch went out again.
+    supabase_outbox._send("symptom_entries", rows)
+    supabase_outbox._send("symptom_entries", rows)
+    assert _symptoms(client, 1) == ["once"]
+
+
+def test_missing_idempotency_column_is_checked_again(client, monkeypatch):
+    client.table("appointments").insert({"user_id": 1}).execute()
+    assert supabase_outbox._has_idempotency_key("appointments") is False
+    client.table("appointments").insert({"user_id": 1, "idempotency_key": "k"}).execute()
+    assert supabase_outbox._has_idempotency_key("appointments") is False
+    monkeypatch.setattr(supabase_outbox.time, "time", lambda: float("inf"))
+    assert supabase_outbox._has_idempotency_key("appointments") is True
+    assert supabase_outbox._idempotency_columns["appointments"] is True
+
+
+def test_flush_loop_survives_errors(monkeypatch):
+    calls = []
+
+    def flush():
+        calls.append(None)
+        raise RuntimeError("connection reset")
+
+    def wait(timeout):
+        if len(calls) == 2:
+            raise _Stop
+
+    monkeypatch.setattr(supabase_outbox, "flush", flush)
+    monkeypatch.setattr(supabase_outbox._wake, "wait", wait)
+    with pytest.raises(_Stop):
+        supabase_outbox._flush_loop()
+    assert len(calls) == 2
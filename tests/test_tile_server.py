@@ -0,0 +1,37 @@
+import sqlite3
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+import tile_server  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(tile_server, "TILE_CACHE_PATH", str(tmp_path / "tiles.db"))
+    monkeypatch.setattr(tile_server, "_local", threading.local())
+    monkeypatch.setattr(tile_server, "TILE_UPSTREAM_URL", None)
+    return tmp_path
+
+
+@pytest.mark.parametrize("upstream", [None, "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+                                      "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"])
+def test_seed_refuses_without_a_bulk_friendly_upstream(cache, monkeypatch, upstream):
+    monkeypatch.setattr(tile_server, "TILE_UPSTREAM_URL", upstream)
+    monkeypatch.setattr(tile_server, "_fetch", lambda *tile: pytest.fail("fetched a tile"))
+    with pytest.raises(ValueError):
+        tile_server.seed()
+
+
+def test_imported_mbtiles_are_served_without_an_upstream(cache):
+    source = sqlite3.connect(str(cache / "city.mbtiles"))
+    source.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    source.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", [(2, 1, 0, b"south"), (3, 5, 5, b"z3")])
+    source.commit()
+    source.close()
+    assert tile_server.import_mbtiles(str(cache / "city.mbtiles"), zooms=range(0, 3)) == 1
+    assert tile_server.get_tile(2, 1, 3) == b"south"
+    assert tile_server.get_tile(3, 5, 2) is None
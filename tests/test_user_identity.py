@@ -0,0 +1,91 @@
+import pytest
+
+import parmatma_db
+
+RAHUL = {"name": "Rahul", "age": 30, "gender": "Male", "height": 175.0, "weight": 70.0}
+
+
+def _user(user_id):
+    conn = parmatma_db.get_connection(parmatma_db._user_path(user_id))
+    row = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def _shard(db, monkeypatch, count):
+    monkeypatch.setattr(db, "SHARD_COUNT", count)
+    db.init_db()
+
+
+def test_contact_normalization():
+    assert parmatma_db.make_user_key(" R@X.com ") == "r@x.com"
+    assert parmatma_db.make_user_key("+91 98765-43210") == "tel:919876543210"
+    assert parmatma_db.make_user_key("") is None
+
+
+def test_same_name_without_contact_is_two_users(db):
+    assert db.save_personal_details_to_db(RAHUL) != db.save_personal_details_to_db(RAHUL)
+
+
+def test_same_contact_updates_one_user(db):
+    user_id = db.save_personal_details_to_db({**RAHUL, "contact": "r@x.com"})
+    assert db.save_personal_details_to_db({**RAHUL, "weight": 72.0, "contact": "R@x.com"}) == user_id
+    assert _user(user_id)["weight"] == 72.0
+    assert [row["weight"] for row in db.load_user_measurements(user_id)] == [70.0, 72.0]
+
+
+def test_session_row_is_not_rekeyed_to_another_contact(db):
+    first = db.save_personal_details_to_db({**RAHUL, "contact": "r@x.com"})
+    second = db.save_personal_details_to_db({**RAHUL, "contact": "other@x.com"}, first)
+    assert second != first
+    assert _user(first)["user_key"] == "r@x.com"
+    assert _user(second)["user_key"] == "other@x.com"
+
+
+def test_session_row_without_contact_adopts_one(db):
+    user_id = db.save_personal_details_to_db(RAHUL)
+    assert db.save_personal_details_to_db({**RAHUL, "contact": "r@x.com"}, user_id) == user_id
+    assert db.save_personal_details_to_db({**RAHUL, "contact": "r@x.com"}) == user_id
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_batch_save_matches_contacts(db, monkeypatch, shards):
+    _shard(db, monkeypatch, shards)
+    user_id = db.save_personal_details_to_db({**RAHUL, "contact": "r@x.com"})
+    ids = db.save_personal_details_batch([{**RAHUL, "contact": "r@x.com"}, RAHUL, {**RAHUL, "contact": "9876543210"}])
+    assert ids[0] == user_id
+    assert len(set(ids)) == 3
+    assert db.save_personal_details_to_db({**RAHUL, "contact": "98765 43210"}) == ids[2]
+
+
+def test_duplicate_review_merge_and_undo(db):
+    target = db.save_personal_details_to_db(RAHUL)
+    source = db.save_personal_details_to_db(RAHUL)
+    other = db.save_personal_details_to_db({**RAHUL, "age": 31})
+    db.save_mental_health_entry(source, "fine", 0.5, "")
+    assert db.find_duplicate_users() == 1
+    assert [(c["source_id"], c["target_id"]) for c in db.load_merge_candidates()] == [(source, target)]
+
+    db.merge_users(source, target)
+    assert _user(source) is None
+    assert len(db.load_user_history(target)[1]) == 1
+    assert db.load_sentiment_trend(target)[0]["count"] == 1
+
+    db.undo_user_merge(source, target)
+    assert _user(source)["name"] == "Rahul"
+    assert len(db.load_user_history(source)[1]) == 1
+    assert db.load_user_history(target)[1] == []
+    assert db.load_sentiment_trend(target) == []
+    assert [c["status"] for c in db.load_merge_candidates("undone")] == ["undone"]
+    assert _user(other) is not None
+
+
+def test_rejected_pair_is_not_proposed_again(db):
+    target = db.save_personal_details_to_db(RAHUL)
+    source = db.save_personal_details_to_db(RAHUL)
+    db.find_duplicate_users()
+    db.reject_user_merge(source, target)
+    assert db.find_duplicate_users() == 0
+    assert db.load_merge_candidates() == []
+    with pytest.raises(ValueError):
+        db.undo_user_merge(source, target)
@@ -0,0 +1,251 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import gazetteer
+from hospital_index import bounding_box
+
+# Optional local, disk-backed cache (one SQLite file, MBTiles-style) for the folium map tiles,
+# enabled with PARMATMA_TILE_URL. It is filled from an MBTiles file (`import`) and/or from the
+# tile server in PARMATMA_TILE_UPSTREAM; misses are fetched upstream once, stale tiles are served
+# when upstream is unreachable, and the cache is LRU-bounded by size.
+TILE_CACHE_PATH = "tile_cache.db"
+PUBLIC_TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+# No default: the OSM tile policy forbids proxying at scale and bulk downloads from its servers,
+# so the upstream has to be a provider (or self-hosted server) chosen for this.
+TILE_UPSTREAM_URL = os.environ.get("PARMATMA_TILE_UPSTREAM")
+OSM_TILE_HOST = "tile.openstreetmap.org"
+TILE_HEADERS = {
+    "User-Agent": "ParmatmaHealthApp/1.0 (+https://yourdomain.com/contact)"
+}
+TILE_TIMEOUT_SECONDS = 10
+TILE_TTL_SECONDS = 30 * 24 * 60 * 60
+TILE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# The OSM tile policy allows only a couple of parallel connections per application.
+TILE_UPSTREAM_CONNECTIONS = 2
+TILE_MAX_ZOOM = 19
+TILE_ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+
+TILE_SERVER_HOST = "127.0.0.1"
+TILE_SERVER_PORT = int(os.environ.get("PARMATMA_TILE_PORT", "8765"))
+# What the browser requests. The public OSM tiles work wherever the app is browsed from; the local
+# cache is only used when PARMATMA_TILE_URL points at it, e.g.
+# http://localhost:8765/tiles/{z}/{x}/{y}.png when browsing on the server host, or a reverse proxy
+# in front of the tile server otherwise.
+LOCAL_TILES_ENABLED = bool(os.environ.get("PARMATMA_TILE_URL"))
+TILE_URL = os.environ.get("PARMATMA_TILE_URL") or PUBLIC_TILE_URL
+
+SEED_CITIES = ["Mumbai", "Delhi", "Bengaluru", "Hyderabad", "Chennai", "Kolkata", "Pune", "Ahmedabad"]
+SEED_RADIUS_M = 15_000
+SEED_ZOOMS = range(10, 15)
+EVICT_EVERY_INSERTS = 100
+
+_TILE_PATH = re.compile(r"^/tiles/(\d+)/(\d+)/(\d+)\.png$")
+
+_local = threading.local()
+_upstream = threading.BoundedSemaphore(TILE_UPSTREAM_CONNECTIONS)
+_inserts_lock = threading.Lock()
+_inserts = 0
+_server_lock = threading.Lock()
+_server_started = False
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(TILE_CACHE_PATH, timeout=30)
+        # Must be set before the first table exists; evicted tiles are then returned to the
+        # filesystem by incremental_vacuum.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+                     CREATE TABLE IF NOT EXISTS tiles
+                     (
+                         zoom INTEGER NOT NULL,
+                         x INTEGER NOT NULL,
+                         y INTEGER NOT NULL,
+                         data BLOB NOT NULL,
+                         fetched_at REAL NOT NULL,
+                         last_used REAL NOT NULL,
+                         PRIMARY KEY (zoom, x, y)
+                     )
+                     """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tiles_last_used ON tiles (last_used)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def tile_for(lat, lon, zoom):
+    n = 2 ** zoom
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _fetch(zoom, x, y):
+    if not TILE_UPSTREAM_URL:
+        return None
+    with _upstream:
+        try:
+            response = requests.get(TILE_UPSTREAM_URL.format(z=zoom, x=x, y=y), headers=TILE_HEADERS,
+                                    timeout=TILE_TIMEOUT_SECONDS)
+        except requests.RequestException:
+            return None
+    return response.content if response.status_code == 200 else None
+
+
+def _evict():
+    conn = _connection()
+    excess = conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM tiles").fetchone()[0] - TILE_CACHE_MAX_BYTES
+    if excess <= 0:
+        return
+    victims = []
+    for zoom, x, y, size in conn.execute("SELECT zoom, x, y, LENGTH(data) FROM tiles ORDER BY last_used"):
+        victims.append((zoom, x, y))
+        excess -= size
+        if excess <= 0:
+            break
+    conn.executemany("DELETE FROM tiles WHERE zoom = ? AND x = ? AND y = ?", victims)
+    conn.commit()
+    conn.execute("PRAGMA incremental_vacuum")
+
+
+def _store(zoom, x, y, data):
+    global _inserts
+    now = time.time()
+    conn = _connection()
+    conn.execute("INSERT OR REPLACE INTO tiles (zoom, x, y, data, fetched_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                 (zoom, x, y, data, now, now))
+    conn.commit()
+    with _inserts_lock:
+        _inserts += 1
+        due = _inserts % EVICT_EVERY_INSERTS == 0
+    if due:
+        _evict()
+
+
+def get_tile(zoom, x, y):
+    conn = _connection()
+    row = conn.execute("SELECT data, fetched_at, last_used FROM tiles WHERE zoom = ? AND x = ? AND y = ?",
+                       (zoom, x, y)).fetchone()
+    now = time.time()
+    if row is not None and row[1] + TILE_TTL_SECONDS > now:
+        # Recency only needs to be roughly right for LRU; skip the write on hot tiles.
+        if row[2] < now - 3600:
+            conn.execute("UPDATE tiles SET last_used = ? WHERE zoom = ? AND x = ? AND y = ?", (now, zoom, x, y))
+            conn.commit()
+        return row[0]
+    data = _fetch(zoom, x, y)
+    if data is None:
+        # Upstream unreachable: an expired tile is better than a grey square.
+        return row[0] if row is not None else None
+    _store(zoom, x, y, data)
+    return data
+
+
+def seed(cities=SEED_CITIES, zooms=SEED_ZOOMS, radius_m=SEED_RADIUS_M):
+    if not TILE_UPSTREAM_URL or OSM_TILE_HOST in TILE_UPSTREAM_URL:
+        raise ValueError("Seeding needs PARMATMA_TILE_UPSTREAM set to a tile server that allows bulk downloads; "
+                         "the OpenStreetMap tile servers do not. Use `import` with an MBTiles file instead.")
+    fetched = 0
+    for city in cities:
+        place = gazetteer.lookup(city)
+        if place is None:
+            continue
+        south, west, north, east = bounding_box(place["lat"], place["lon"], radius_m)
+        for zoom in zooms:
+            min_x, min_y = tile_for(north, west, zoom)
+            max_x, max_y = tile_for(south, east, zoom)
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    if get_tile(zoom, x, y) is not None:
+                        fetched += 1
+    return fetched
+
+
+def import_mbtiles(path, zooms=None):
+    # MBTiles rows count y from the south (TMS); the cache uses the XYZ scheme of the tile URLs.
+    source = sqlite3.connect(path)
+    conn = _connection()
+    imported = 0
+    now = time.time()
+    rows = source.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles")
+    while True:
+        batch = rows.fetchmany(1000)
+        if not batch:
+            break
+        tiles = [(zoom, x, 2 ** zoom - 1 - y, data, now, now) for zoom, x, y, data in batch
+                 if zooms is None or zoom in zooms]
+        conn.executemany(
+            "INSERT OR REPLACE INTO tiles (zoom, x, y, data, fetched_at, last_used) VALUES (?, ?, ?, ?, ?, ?)", tiles)
+        conn.commit()
+        imported += len(tiles)
+    source.close()
+    _evict()
+    return imported
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path)
+        if not match:
+            self.send_error(404)
+            return
+        zoom, x, y = (int(part) for part in match.groups())
+        if zoom > TILE_MAX_ZOOM or x >= 2 ** zoom or y >= 2 ** zoom:
+            self.send_error(404)
+            return
+        data = get_tile(zoom, x, y)
+        if data is None:
+            self.send_error(502)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "public, max-age=86400")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_tile_server():
+    global _server_started
+    if not LOCAL_TILES_ENABLED:
+        return
+    with _server_lock:
+        if _server_started:
+            return
+        _server_started = True
+    try:
+        server = ThreadingHTTPServer((TILE_SERVER_HOST, TILE_SERVER_PORT), TileHandler)
+    except OSError:
+        # Port taken: another app process (or a standalone `serve`) is already serving tiles.
+        return
+    threading.Thread(target=server.serve_forever, name="tile-server", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["seed"]:
+        try:
+            print(f"Cached {seed()} tiles in {TILE_CACHE_PATH}.")
+        except ValueError as e:
+            sys.exit(str(e))
+    elif len(sys.argv) == 3 and sys.argv[1] == "import":
+        print(f"Imported {import_mbtiles(sys.argv[2])} tiles into {TILE_CACHE_PATH}.")
+    elif sys.argv[1:] == ["serve"]:
+        print(f"Serving tiles on http://{TILE_SERVER_HOST}:{TILE_SERVER_PORT}/tiles/{{z}}/{{x}}/{{y}}.png")
+        ThreadingHTTPServer((TILE_SERVER_HOST, TILE_SERVER_PORT), TileHandler).serve_forever()
+    else:
+        sys.exit("usage: python tile_server.py seed | import <tiles.mbtiles> | serve")
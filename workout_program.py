@@ -0,0 +1,141 @@
+import functools
+
+from exercise_catalog import BODY_PART_ALIASES, DIFFICULTIES, SECONDS_PER_REP, find_exercises, prescription
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+# Training days spread through the week so no muscle group trains on consecutive heavy days.
+TRAINING_DAYS = {
+    2: (0, 3),
+    3: (0, 2, 4),
+    4: (0, 1, 3, 4),
+    5: (0, 1, 2, 4, 5),
+    6: (0, 1, 2, 3, 4, 5),
+}
+GOALS = {
+    "General fitness": {"rest_seconds": 60, "volume": 1.0, "extra_sets": 0, "cardio": False},
+    "Lose weight": {"rest_seconds": 45, "volume": 1.2, "extra_sets": 0, "cardio": True},
+    "Build strength": {"rest_seconds": 90, "volume": 0.8, "extra_sets": 1, "cardio": False},
+    "Build endurance": {"rest_seconds": 30, "volume": 1.4, "extra_sets": 0, "cardio": True},
+}
+# Hardest catalog difficulty offered per BMI category, and whether a cardio finisher is added.
+BMI_LIMITS = {
+    "Underweight": {"max_difficulty": "advanced", "cardio": False},
+    "Normal": {"max_difficulty": "advanced", "cardio": None},
+    "Overweight": {"max_difficulty": "intermediate", "cardio": True},
+    "Obese": {"max_difficulty": "beginner", "cardio": True},
+}
+EXERCISES_PER_DAY = 5
+DEFAULT_WEEKS = 4
+DEFAULT_DAYS_PER_WEEK = 3
+# Volume grows each week and drops back every DELOAD_EVERY-th week to recover.
+WEEKLY_PROGRESSION = 0.1
+DELOAD_EVERY = 4
+DELOAD_FACTOR = 0.7
+
+
+def _difficulties(level, bmi_category):
+    limit = BMI_LIMITS.get(bmi_category, BMI_LIMITS["Normal"])["max_difficulty"]
+    top = min(DIFFICULTIES.index(level), DIFFICULTIES.index(limit))
+    return DIFFICULTIES[:top + 1]
+
+
+def _rotation(exercises, body_parts):
+    # Round-robin across the chosen body parts so consecutive picks hit different muscles.
+    parts = [part for value in body_parts for part in BODY_PART_ALIASES.get(value, (value,))]
+    groups = [[exercise for exercise in exercises if part in exercise["body_parts"]] for part in parts]
+    groups = [group for group in groups if group] or [exercises]
+    ordered, seen = [], set()
+    for i in range(max(len(group) for group in groups)):
+        for group in groups:
+            if i < len(group) and group[i]["id"] not in seen:
+                seen.add(group[i]["id"])
+                ordered.append(group[i])
+    return ordered
+
+
+def _week_factor(week):
+    factor = 1 + WEEKLY_PROGRESSION * week
+    return factor * DELOAD_FACTOR if (week + 1) % DELOAD_EVERY == 0 else factor
+
+
+def _prescribe(exercise, goal, factor):
+    sides = 2 if exercise["per_side"] else 1
+    if exercise["minutes"]:
+        minutes = max(5, round(exercise["minutes"] * factor))
+        return {**exercise, "minutes": minutes, "work_seconds": minutes * 60, "rest_seconds": 0}
+    sets = exercise["sets"] + goal["extra_sets"]
+    item = {**exercise, "sets": sets, "rest_seconds": goal["rest_seconds"]}
+    if exercise["seconds"]:
+        item["seconds"] = max(10, 5 * round(exercise["seconds"] * goal["volume"] * factor / 5))
+        item["work_seconds"] = item["seconds"] * sides
+    else:
+        item["reps"] = max(4, round(exercise["reps"] * goal["volume"] * factor))
+        item["work_seconds"] = item["reps"] * SECONDS_PER_REP * sides
+    return item
+
+
+def _session_minutes(items):
+    return round(sum((item["sets"] or 1) * (item["work_seconds"] + item["rest_seconds"]) for item in items) / 60)
+
+
+@functools.lru_cache(maxsize=256)
+def _build(gender, bmi_category, goal_name, body_parts, equipment, level, weeks, days_per_week):
+    goal = GOALS[goal_name]
+    difficulty = _difficulties(level, bmi_category)
+    cardio_finisher = BMI_LIMITS.get(bmi_category, BMI_LIMITS["Normal"])["cardio"]
+    if cardio_finisher is None:
+        cardio_finisher = goal["cardio"]
+    pool = find_exercises(gender, body_parts, equipment=equipment, difficulty=difficulty)
+    # Exercises timed in minutes are a session block of their own: at most one per day, next to the set-based picks.
+    timed = [exercise for exercise in pool if exercise["minutes"]]
+    rotation = _rotation([exercise for exercise in pool if not exercise["minutes"]], body_parts)
+    cardio = [exercise for exercise in find_exercises(gender, ["cardio"], equipment=equipment, difficulty=difficulty)
+              if exercise["minutes"]]
+    if cardio_finisher and not cardio:
+        # The equipment filter left no timed cardio; fall back to one that needs nothing.
+        bodyweight = find_exercises(gender, ["cardio"], equipment="bodyweight", difficulty=difficulty)
+        cardio = [exercise for exercise in bodyweight if exercise["minutes"]] or bodyweight
+    per_day = EXERCISES_PER_DAY - bool(timed)
+    program, session = [], 0
+    for week in range(weeks):
+        factor = _week_factor(week)
+        days = []
+        for weekday, day_name in enumerate(WEEKDAYS):
+            if weekday not in TRAINING_DAYS[days_per_week]:
+                days.append({"day": day_name, "rest": True, "exercises": [], "minutes": 0})
+                continue
+            picks = []
+            if rotation:
+                start = session * per_day % len(rotation)
+                count = min(per_day, len(rotation))
+                picks = [rotation[(start + i) % len(rotation)] for i in range(count)]
+            if timed:
+                picks.append(timed[session % len(timed)])
+            elif cardio and (cardio_finisher or not picks):
+                picks.append(cardio[session % len(cardio)])
+            items = [_prescribe(exercise, goal, factor) for exercise in picks]
+            days.append({"day": day_name, "rest": False, "exercises": items, "minutes": _session_minutes(items)})
+            session += 1
+        program.append({"week": week + 1, "deload": (week + 1) % DELOAD_EVERY == 0, "days": days})
+    return program
+
+
+def generate_program(gender, bmi_category, goal, body_parts, equipment=(), level="beginner", weeks=DEFAULT_WEEKS,
+                     days_per_week=DEFAULT_DAYS_PER_WEEK):
+    # Cached per profile; the returned structure is shared, so callers must not mutate it.
+    return _build((gender or "other").casefold(), bmi_category, goal,
+                  tuple(sorted({part.casefold() for part in body_parts})), tuple(sorted(equipment)), level.casefold(),
+                  weeks, days_per_week)
+
+
+def program_summary(program):
+    lines = []
+    for week in program:
+        lines.append(f"Week {week['week']}{' (deload)' if week['deload'] else ''}:")
+        for day in week["days"]:
+            if day["rest"]:
+                lines.append(f"  {day['day']}: rest")
+            else:
+                lines.append(f"  {day['day']}: " + "; ".join(f"{item['name']} {prescription(item)}"
+                                                             for item in day["exercises"]))
+    return "\n".join(lines)
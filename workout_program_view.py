@@ -0,0 +1,124 @@
+import json
+import time
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from exercise_catalog import DIFFICULTIES, facet_values, prescription
+from workout_program import (
+    DEFAULT_DAYS_PER_WEEK, DEFAULT_WEEKS, DELOAD_EVERY, GOALS, TRAINING_DAYS, generate_program, program_summary,
+)
+
+BODY_PARTS = ["Arms", "Legs", "Core", "Back", "Chest", "Shoulders", "Glutes", "Full Body", "Cardio"]
+TIMER_HEIGHT = 40
+
+# Counts down in the browser from an absolute end time, so a 20-minute set holds no script thread
+# and a rerun (another click) picks up where the countdown is instead of restarting it.
+_COUNTDOWN_HTML = """
+<div id="timer" style="font-family: sans-serif;"></div>
+<script>
+const endsAt = {ends_at}, label = {label}, done = {done};
+const el = document.getElementById("timer");
+function tick() {{
+    const left = Math.ceil((endsAt - Date.now()) / 1000);
+    if (left > 0) {{
+        el.textContent = label + ": " + left + " seconds left";
+        setTimeout(tick, 250);
+    }} else {{
+        el.textContent = done;
+    }}
+}}
+tick();
+</script>
+"""
+
+
+def _start_timer(state_key, item):
+    st.session_state[state_key] = (item["name"], time.time() + item["work_seconds"], item["rest_seconds"])
+
+
+def _countdown(timer):
+    name, ends_at, rest_seconds = timer
+    done = "Done! Take a short break." if not rest_seconds else f"Done! Rest {rest_seconds} seconds."
+    # Exercise names end up inside a <script>; "</" is escaped so one can never close it.
+    label, done = (json.dumps(text).replace("</", "<\\/") for text in (name, done))
+    components.html(_COUNTDOWN_HTML.format(ends_at=int(ends_at * 1000), label=label, done=done), height=TIMER_HEIGHT)
+
+
+def _personalize(program, gender, bmi_category, goal, weeks, api_call):
+    with st.spinner("Personalizing your program..."):
+        user_prompt = (f"Rewrite this {weeks}-week program for a {gender} user (BMI category {bmi_category}, "
+                       f"goal: {goal}) as short, motivating notes with form cues. Keep every exercise, set, "
+                       f"rep and time exactly as given.\n\n{program_summary(program)}")
+        payload = {
+            "contents": [{"parts": [{"text": user_prompt}]}],
+            "systemInstruction": {"parts": [
+                {"text": "Reply as a professional trainer. Use markdown."}
+            ]}
+        }
+        response = api_call(
+            model="gemini-2.5-flash-preview-05-20",
+            endpoint="generateContent",
+            payload=payload
+        )
+        if response and response.get('candidates'):
+            st.markdown("### Coaching Notes")
+            st.markdown(response['candidates'][0]['content']['parts'][0]['text'])
+        else:
+            st.error("Failed to personalize the program.")
+
+
+def workout_program_section(profile, bmi_category, api_call, key):
+    gender = profile.get("gender", "Other")
+    goal = st.selectbox("Your fitness goal:", list(GOALS), key=f"{key}_goal")
+    level = st.selectbox("Experience level:", [difficulty.capitalize() for difficulty in DIFFICULTIES],
+                         key=f"{key}_level")
+    body_parts = st.multiselect("Select body parts to train:", BODY_PARTS, key=f"{key}_body_parts")
+    equipment = st.multiselect("Equipment available (leave empty for any):", facet_values("equipment"),
+                               key=f"{key}_equipment")
+    col1, col2 = st.columns(2)
+    with col1:
+        weeks = st.slider("Weeks", min_value=2, max_value=12, value=DEFAULT_WEEKS, key=f"{key}_weeks")
+    with col2:
+        days_per_week = st.slider("Training days per week", min_value=min(TRAINING_DAYS),
+                                  max_value=max(TRAINING_DAYS), value=DEFAULT_DAYS_PER_WEEK, key=f"{key}_days")
+
+    if not body_parts:
+        st.info("Select at least one body part to train.")
+        return None
+    program = generate_program(gender, bmi_category, goal, body_parts, equipment=equipment, level=level,
+                               weeks=weeks, days_per_week=days_per_week)
+    if not any(day['exercises'] for day in program[0]['days']):
+        st.warning("No exercises match these choices. Add equipment or another body part.")
+        return None
+
+    st.markdown(f"### Your {weeks}-Week Program")
+    st.caption(f"Built for BMI category *{bmi_category}*. Volume rises each week; "
+               f"every {DELOAD_EVERY}th week is a lighter recovery week.")
+    for week in program:
+        title = f"Week {week['week']}" + (" (recovery week)" if week['deload'] else "")
+        with st.expander(title, expanded=week['week'] == 1):
+            for day in week['days']:
+                if day['rest']:
+                    st.markdown(f"**{day['day']}** - Rest day")
+                    continue
+                st.markdown(f"**{day['day']}** - about {day['minutes']} min")
+                for item in day['exercises']:
+                    rest = f", rest {item['rest_seconds']} sec between sets" if item['rest_seconds'] else ""
+                    st.markdown(f"- {item['name']} - {prescription(item)}{rest}")
+
+    st.markdown("### Fitness Timer")
+    sessions = [(week, day) for week in program for day in week['days'] if not day['rest']]
+    week, day = st.selectbox("Workout:", sessions, key=f"{key}_session",
+                             format_func=lambda session: f"Week {session[0]['week']}, {session[1]['day']}")
+    timer_key = f"{key}_timer"
+    for i, item in enumerate(day['exercises']):
+        st.button(f"Start {item['name']} Timer ({item['work_seconds']} sec)", key=f"{key}_start_{i}",
+                  on_click=_start_timer, args=(timer_key, item))
+    timer = st.session_state.get(timer_key)
+    if timer is not None:
+        _countdown(timer)
+
+    if st.button("Personalize Wording", key=f"{key}_personalize"):
+        _personalize(program, gender, bmi_category, goal, weeks, api_call)
+    return program